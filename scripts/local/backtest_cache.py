@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+回测结果缓存
+以 策略源码 + 配置 + 时间范围 + K线数据文件 + freqtrade版本/额外参数 + 策略环境开关 的哈希作为键，
+保存freqtrade导出的结果zip和解析后的指标。输入完全相同时直接返回缓存结果，不再重复回测。
+
+缓存目录: user_data/backtest_cache/<key>/ (result.zip + metrics.json + meta.json)
+数据文件的哈希按 (路径, 大小, 修改时间) 记忆，未变化的文件不会重复读取。
+
+使用示例:
+    # 命中缓存时直接恢复结果，否则运行freqtrade并写入缓存
+    python scripts/local/backtest_cache.py run --config config/eightpm_backtest.json \\
+        --strategy EightPMHighLowStrategy --timerange 20240701-20241231
+
+    # 查看缓存条目 / 单个条目详情
+    python scripts/local/backtest_cache.py list
+    python scripts/local/backtest_cache.py inspect 3f2a9c
+
+    # 按大小和时间淘汰
+    python scripts/local/backtest_cache.py evict --max-size-mb 500 --max-age-days 30
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from backtest_results import (
+    RESULTS_DIR, latest_result_file, load_backtest_result, summary_metrics,
+)
+from freqtrade_data import (
+    PROJECT_ROOT, STRATEGY_DIR, config_pairs, exchange_data_dir, load_config,
+    pair_to_filename, strategy_files,
+)
+
+
+CACHE_DIR = PROJECT_ROOT / 'user_data' / 'backtest_cache'
+HASH_INDEX = '.file_hashes.json'
+CACHE_VERSION = 1
+
+# 会改变策略执行路径的环境开关（压缩、增量重算、并行、内核），取值不同的回测不共用缓存；
+# 只决定输出位置的开关（FT_STRATEGY_METRICS_FILE、FT_STRATEGY_CHECKPOINT_DIR 等）不参与
+ENV_TOGGLES = ('FT_STRATEGY_COMPACT', 'FT_STRATEGY_TAIL', 'FT_STRATEGY_PARALLEL',
+               'FT_STRATEGY_WORKERS', 'FT_KERNELS')
+
+IMPORT_RE = re.compile(r"^\s*(?:from|import)\s+(\w+)", re.MULTILINE)
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileHasher:
+    """带记忆的文件哈希，(大小, 修改时间) 不变时复用上次结果"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.path = Path(cache_dir) / HASH_INDEX
+        self._index = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                self._index = json.loads(self.path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                self._index = {}
+
+    def hash(self, path):
+        path = Path(path).resolve()
+        stat = path.stat()
+        key = str(path)
+        cached = self._index.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = _sha256_file(path)
+        self._index[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        self._dirty = True
+        return digest
+
+    def save(self):
+        if self._dirty:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self._index), encoding='utf-8')
+            self._dirty = False
+
+
+def strategy_sources(strategy, strategy_dir=STRATEGY_DIR):
+    """策略文件及其导入的同目录辅助模块（递归）"""
+    strategy_dir = Path(strategy_dir)
+    files = strategy_files(strategy, strategy_dir)
+    if not files:
+        raise ValueError(f"未在 {strategy_dir} 中找到策略类: {strategy}")
+
+    sources, pending = [], [files[0]]
+    while pending:
+        path = pending.pop()
+        if path in sources:
+            continue
+        sources.append(path)
+        for module in IMPORT_RE.findall(path.read_text(encoding='utf-8')):
+            helper = strategy_dir / f"{module}.py"
+            if helper.exists():
+                pending.append(helper)
+    return sorted(sources)
+
+
+def data_files(config, pairs=None, datadir=None):
+    """交易对在数据目录中的全部K线文件（所有时间框架，含informative使用的）"""
+    root = exchange_data_dir(config, datadir)
+    dirs = [root, root / 'futures']
+    files = []
+    for pair in pairs or config_pairs(config):
+        prefix = f"{pair_to_filename(pair)}-"
+        for d in dirs:
+            if d.is_dir():
+                files.extend(p for p in d.iterdir() if p.is_file() and p.name.startswith(prefix))
+    return sorted(set(files))
+
+
+def freqtrade_version():
+    try:
+        from importlib.metadata import version
+        return version('freqtrade')
+    except Exception:
+        return 'unknown'
+
+
+def cache_inputs(strategy, config_path, timerange, pairs=None, datadir=None,
+                 extra_args=(), hasher=None):
+    """缓存键的全部输入，返回 (key, inputs)"""
+    hasher = hasher or FileHasher()
+    config = load_config(config_path)
+
+    def rel(path):
+        path = Path(path).resolve()
+        return str(path.relative_to(PROJECT_ROOT)) if path.is_relative_to(PROJECT_ROOT) else str(path)
+
+    inputs = {
+        'cache_version': CACHE_VERSION,
+        'strategy': strategy,
+        'strategy_files': {rel(p): hasher.hash(p) for p in strategy_sources(strategy)},
+        # 配置按规范化后的json计算，只改格式/缩进不影响键
+        'config': hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest(),
+        'timerange': timerange or '',
+        'data_files': {rel(p): hasher.hash(p) for p in data_files(config, pairs, datadir)},
+        'extra_args': list(extra_args),
+        'freqtrade': freqtrade_version(),
+        'env': {name: os.environ[name] for name in ENV_TOGGLES if os.environ.get(name)},
+    }
+    hasher.save()
+    key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+    return key, inputs
+
+
+def _entry_dir(key, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / key
+
+
+def _read_meta(entry):
+    with open(entry / 'meta.json', 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_meta(entry, meta):
+    (entry / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def lookup(key, cache_dir=CACHE_DIR):
+    """命中时返回 (条目目录, meta) 并刷新最近使用时间，否则返回None"""
+    entry = _entry_dir(key, cache_dir)
+    if not (entry / 'meta.json').exists():
+        return None
+    meta = _read_meta(entry)
+    if not (entry / meta['result_file']).exists():
+        return None
+    meta['last_used'] = time.time()
+    meta['hits'] = meta.get('hits', 0) + 1
+    _write_meta(entry, meta)
+    return entry, meta
+
+
+def store(key, inputs, result_path, cache_dir=CACHE_DIR):
+    """把freqtrade导出的结果文件写入缓存"""
+    result_path = Path(result_path)
+    result = load_backtest_result(result_path)
+    entry = _entry_dir(key, cache_dir)
+    tmp = entry.with_name(entry.name + '.tmp')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    result_file = 'result' + ''.join(result_path.suffixes[-1:])
+    shutil.copyfile(result_path, tmp / result_file)
+    metrics = summary_metrics(result, inputs['strategy'])
+    (tmp / 'metrics.json').write_text(json.dumps(metrics, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    now = time.time()
+    _write_meta(tmp, {
+        'key': key,
+        'strategy': inputs['strategy'],
+        'timerange': inputs['timerange'],
+        'source_name': result_path.name,
+        'result_file': result_file,
+        'created': now,
+        'last_used': now,
+        'hits': 0,
+        'inputs': inputs,
+    })
+    shutil.rmtree(entry, ignore_errors=True)
+    tmp.rename(entry)
+    return entry
+
+
+def restore(entry, meta, results_dir=RESULTS_DIR):
+    """把缓存的结果复制回结果目录，并按freqtrade约定更新 .last_result.json"""
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    target = results_dir / meta['source_name']
+    # 不保留原修改时间，使"按修改时间取最新结果"的脚本能找到它
+    shutil.copyfile(entry / meta['result_file'], target)
+    (results_dir / '.last_result.json').write_text(
+        json.dumps({'latest_backtest': target.name}), encoding='utf-8')
+    return target
+
+
+def entries(cache_dir=CACHE_DIR):
+    """[(条目目录, meta, 字节数)]，按最近使用时间从新到旧"""
+    items = []
+    for entry in Path(cache_dir).glob('*'):
+        if not entry.is_dir() or entry.name.endswith('.tmp') or not (entry / 'meta.json').exists():
+            continue
+        size = sum(p.stat().st_size for p in entry.iterdir() if p.is_file())
+        items.append((entry, _read_meta(entry), size))
+    return sorted(items, key=lambda item: item[1].get('last_used', 0), reverse=True)
+
+
+def evict(max_size_mb=None, max_age_days=None, cache_dir=CACHE_DIR):
+    """先删除超过最大时长未使用的条目，再按最近最少使用删除到总大小以内"""
+    removed = []
+    now = time.time()
+    kept = []
+    for entry, meta, size in entries(cache_dir):
+        if max_age_days is not None and now - meta.get('last_used', 0) > max_age_days * 86400:
+            shutil.rmtree(entry)
+            removed.append(meta['key'])
+        else:
+            kept.append((entry, meta, size))
+
+    if max_size_mb is not None:
+        total = sum(size for _, _, size in kept)
+        limit = max_size_mb * 1024 * 1024
+        while kept and total > limit:
+            entry, meta, size = kept.pop()
+            shutil.rmtree(entry)
+            removed.append(meta['key'])
+            total -= size
+    return removed
+
+
+def find_entry(prefix, cache_dir=CACHE_DIR):
+    matches = [item for item in entries(cache_dir) if item[1]['key'].startswith(prefix)]
+    if len(matches) != 1:
+        raise SystemExit(f"❌ 键前缀 {prefix} 匹配到 {len(matches)} 个条目")
+    return matches[0]
+
+
+def run_freqtrade(strategy, config_path, timerange, extra_args, results_dir=RESULTS_DIR, log_path=None):
+    """运行freqtrade回测，返回新生成的结果文件；指定log_path时输出写入该文件"""
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    cmd = ['freqtrade', 'backtesting', '--config', str(config_path), '--strategy', strategy,
+           '--export', 'trades', '--backtest-directory', str(results_dir)]
+    if timerange:
+        cmd += ['--timerange', timerange]
+    cmd += list(extra_args)
+
+    started = time.time()
+    if log_path is None:
+        subprocess.run(cmd, check=True)
+    else:
+        with open(log_path, 'w', encoding='utf-8') as log:
+            subprocess.run(cmd, check=True, stdout=log, stderr=subprocess.STDOUT)
+    result = latest_result_file(results_dir)
+    if result is None or result.stat().st_mtime < started - 1:
+        raise RuntimeError("freqtrade回测没有生成新的结果文件")
+    return result
+
+
+def print_metrics(metrics):
+    for name, value in metrics.items():
+        print(f"  {name:<22}{value}")
+
+
+def _key_args(parser):
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--timerange', help='时间范围 YYYYMMDD-YYYYMMDD')
+    parser.add_argument('--pairs', nargs='+', help='参与哈希的交易对，默认使用配置白名单')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+
+
+def _resolve_key(args, extra_args=()):
+    strategy = args.strategy or load_config(args.config)['strategy']
+    key, inputs = cache_inputs(strategy, args.config, args.timerange, args.pairs,
+                               args.datadir, extra_args)
+    return strategy, key, inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回测结果缓存')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('run', help='命中缓存则恢复结果，否则运行freqtrade并写入缓存')
+    _key_args(p)
+    p.add_argument('--results-dir', default=str(RESULTS_DIR), help='结果目录')
+    p = sub.add_parser('key', help='打印缓存键')
+    _key_args(p)
+    p = sub.add_parser('store', help='把已有的回测结果写入缓存')
+    _key_args(p)
+    p.add_argument('--result', required=True, help='freqtrade结果文件或结果目录（取最新）')
+    sub.add_parser('list', help='列出缓存条目')
+    p = sub.add_parser('inspect', help='查看缓存条目详情')
+    p.add_argument('key', help='缓存键（可用前缀）')
+    p = sub.add_parser('evict', help='按大小/时间淘汰缓存')
+    p.add_argument('--max-size-mb', type=float, help='缓存总大小上限(MB)')
+    p.add_argument('--max-age-days', type=float, help='超过该天数未使用的条目将被删除')
+    sub.add_parser('clear', help='清空缓存')
+
+    # 未识别的参数（如 --dry-run-wallet 1000）传给freqtrade，同时参与缓存键
+    args, extra = parser.parse_known_args()
+    if extra and args.command not in ('run', 'key', 'store'):
+        parser.error(f"无法识别的参数: {' '.join(extra)}")
+
+    if args.command == 'run':
+        strategy, key, inputs = _resolve_key(args, extra)
+        hit = lookup(key)
+        if hit:
+            entry, meta = hit
+            target = restore(entry, meta, args.results_dir)
+            print(f"✅ 命中回测缓存 {key[:12]} -> {target}")
+            print_metrics(json.loads((entry / 'metrics.json').read_text(encoding='utf-8')))
+            return
+        print(f"💨 缓存未命中 {key[:12]}，运行freqtrade回测 ...")
+        result = run_freqtrade(strategy, args.config, args.timerange, extra, args.results_dir)
+        store(key, inputs, result)
+        print(f"📦 已写入缓存 {key[:12]}")
+
+    elif args.command == 'key':
+        print(_resolve_key(args, extra)[1])
+
+    elif args.command == 'store':
+        _, key, inputs = _resolve_key(args, extra)
+        result = Path(args.result)
+        if result.is_dir():
+            result = latest_result_file(result)
+        if result is None:
+            sys.exit(f"❌ 未找到回测结果: {args.result}")
+        store(key, inputs, result)
+        print(f"📦 已写入缓存 {key[:12]} <- {result}")
+
+    elif args.command == 'list':
+        items = entries()
+        print(f"{'键':<14}{'策略':<26}{'时间范围':<20}{'命中':>6}{'大小KB':>10}  最近使用")
+        for _, meta, size in items:
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(meta.get('last_used', 0)))
+            print(f"{meta['key'][:12]:<14}{meta['strategy']:<26}{meta['timerange']:<20}"
+                  f"{meta.get('hits', 0):>6}{size / 1024:>10.1f}  {used}")
+        print(f"\n共 {len(items)} 个条目, {sum(s for _, _, s in items) / 1024 / 1024:.1f} MB")
+
+    elif args.command == 'inspect':
+        entry, meta, size = find_entry(args.key)
+        print(json.dumps(meta, ensure_ascii=False, indent=2))
+        print(f"\n条目目录: {entry} ({size / 1024:.1f} KB)")
+        print("指标:")
+        print_metrics(json.loads((entry / 'metrics.json').read_text(encoding='utf-8')))
+
+    elif args.command == 'evict':
+        if args.max_size_mb is None and args.max_age_days is None:
+            parser.error('evict 需要 --max-size-mb 或 --max-age-days')
+        removed = evict(args.max_size_mb, args.max_age_days)
+        print(f"🧹 删除 {len(removed)} 个缓存条目")
+
+    elif args.command == 'clear':
+        removed = evict(max_size_mb=0)
+        print(f"🧹 删除 {len(removed)} 个缓存条目")
+
+
+if __name__ == "__main__":
+    main()
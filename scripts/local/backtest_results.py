@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+回测结果读取与指标计算
+兼容freqtrade导出的 zip / json 结果文件，并为本地引擎的交易列表计算同口径指标
+"""
+
+import json
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+RESULTS_DIR = Path(__file__).resolve().parents[2] / 'user_data' / 'backtest_results'
+
+
+def _is_result_json(name):
+    return name.endswith('.json') and not name.endswith(('_config.json', '.meta.json'))
+
+
+def latest_result_file(results_dir=RESULTS_DIR):
+    """按freqtrade的 .last_result.json 约定找到最新结果，找不到时取最新修改的文件"""
+    results_dir = Path(results_dir)
+    marker = results_dir / '.last_result.json'
+    if marker.exists():
+        with open(marker, 'r', encoding='utf-8') as f:
+            latest = json.load(f).get('latest_backtest')
+        if latest and (results_dir / latest).exists():
+            return results_dir / latest
+
+    candidates = [p for p in results_dir.glob('*') if p.suffix == '.zip' or _is_result_json(p.name)]
+    candidates = [p for p in candidates if not p.name.startswith('.')]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda p: p.stat().st_mtime)
+
+
+def load_backtest_result(path):
+    """读取freqtrade回测结果（zip / json / 结果目录）"""
+    path = Path(path)
+    if path.is_dir():
+        path = latest_result_file(path)
+        if path is None:
+            raise FileNotFoundError(f"目录中没有回测结果: {path}")
+
+    if path.suffix == '.zip':
+        with zipfile.ZipFile(path) as zf:
+            names = [n for n in zf.namelist() if _is_result_json(n)]
+            if not names:
+                raise ValueError(f"zip中未找到结果json: {path}")
+            with zf.open(names[0]) as f:
+                return json.load(f)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def strategy_section(result, strategy_name=None):
+    """取出某个策略的结果段，不指定时取第一个"""
+    strategies = result.get('strategy', {})
+    if not strategies:
+        raise ValueError("结果中没有策略数据")
+    if strategy_name is None:
+        strategy_name = next(iter(strategies))
+    if strategy_name not in strategies:
+        raise ValueError(f"结果中没有策略 {strategy_name}，可选: {', '.join(strategies)}")
+    return strategies[strategy_name]
+
+
+def trades_dataframe(section):
+    """freqtrade交易列表 -> DataFrame（时间列转换为UTC时间）"""
+    trades = pd.DataFrame(section.get('trades', []))
+    if trades.empty:
+        return trades
+    for col in ('open_date', 'close_date'):
+        trades[col] = pd.to_datetime(trades[col], utc=True)
+    return trades
+
+
+def summary_metrics(result, strategy_name=None):
+    """与CI脚本相同口径的汇总指标（来自 strategy_comparison）"""
+    rows = result.get('strategy_comparison', [])
+    if strategy_name is not None:
+        rows = [r for r in rows if r.get('key') == strategy_name]
+    if not rows:
+        return {}
+    keys = ['profit_total_pct', 'winrate', 'trades', 'wins', 'losses',
+            'max_drawdown_account', 'profit_factor', 'expectancy']
+    return {k: rows[0].get(k) for k in keys}
+
+
+def max_drawdown(profits, starting_balance):
+    """按平仓顺序累计收益计算账户最大回撤（比例）"""
+    if len(profits) == 0:
+        return 0.0
+    equity = starting_balance + np.cumsum(np.asarray(profits, dtype='float64'))
+    equity = np.concatenate([[starting_balance], equity])
+    peak = np.maximum.accumulate(equity)
+    return float(np.max((peak - equity) / peak))
+
+
+def compute_metrics(trades, starting_balance):
+    """
+    交易列表 -> 指标字典
+    trades 需要包含 pair / close_date / profit_ratio / profit_abs 列
+    """
+    if trades is None or len(trades) == 0:
+        return {'trades': 0, 'wins': 0, 'losses': 0, 'winrate': 0.0,
+                'profit_total_abs': 0.0, 'profit_total_pct': 0.0,
+                'max_drawdown_account': 0.0, 'profit_factor': 0.0}
+
+    trades = trades.sort_values('close_date')
+    profit_abs = trades['profit_abs'].to_numpy(dtype='float64')
+    wins = int((profit_abs > 0).sum())
+    gross_win = profit_abs[profit_abs > 0].sum()
+    gross_loss = -profit_abs[profit_abs < 0].sum()
+
+    return {
+        'trades': int(len(trades)),
+        'wins': wins,
+        'losses': int(len(trades) - wins),
+        'winrate': wins / len(trades),
+        'profit_total_abs': float(profit_abs.sum()),
+        'profit_total_pct': float(profit_abs.sum() / starting_balance * 100),
+        'max_drawdown_account': max_drawdown(profit_abs, starting_balance),
+        'profit_factor': float(gross_win / gross_loss) if gross_loss > 0 else 0.0,
+    }
+
+
+def metrics_per_pair(trades, starting_balance, pairs=None):
+    """按交易对分组计算指标，pairs指定时保证每个交易对都有一行"""
+    pairs = list(pairs) if pairs else sorted(trades['pair'].unique()) if len(trades) else []
+    rows = {}
+    for pair in pairs:
+        subset = trades[trades['pair'] == pair] if len(trades) else trades
+        rows[pair] = compute_metrics(subset, starting_balance)
+    rows['TOTAL'] = compute_metrics(trades, starting_balance)
+    return rows
+
+
+def format_metrics_table(rows, title=None):
+    """打印用的指标表格"""
+    lines = []
+    if title:
+        lines.append(f"\n=== {title} ===")
+    lines.append(f"{'交易对':<18}{'交易数':>8}{'收益%':>10}{'胜率':>9}{'最大回撤':>10}{'盈利因子':>10}")
+    for pair, m in rows.items():
+        lines.append(
+            f"{pair:<18}{m['trades']:>8}{m['profit_total_pct']:>10.2f}"
+            f"{m['winrate']:>9.1%}{m['max_drawdown_account']:>10.2%}{m['profit_factor']:>10.2f}"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,185 @@
+"""
+跨交易对批量指标计算（只用于离线测量）
+
+把同一时间网格上的一组交易对堆叠为 (时间 × 交易对) 的二维数组，一次向量化计算所有交易对的指标，
+每个交易对取对应的列（结果数组按列存储，交给DataFrame时不复制）。
+指标与TA-Lib的算法一致（SMA滑动平均；RSI/ATR先取周期内均值为初值，再按Wilder平滑递推），
+Wilder递推有scipy时用 scipy.signal.lfilter 沿时间轴一次完成，否则按64行分块展开（块间逐块传递）。
+
+与TA-Lib对比（batch_report.py，TA-Lib 0.8.2 + scipy，100个交易对 x 2年1h）: 逐个TA-Lib约150毫秒，
+批量约650毫秒（0.2-0.3倍）。TA-Lib的C实现每个指标每个交易对只需几十微秒，逐个计算的耗时主要是
+abstract接口和DataFrame的调用开销，批量的NumPy/scipy多趟数组运算比它慢，因此策略不使用批量计算。
+eightpm_engine.py 的向量化回测使用这里的 rsi。
+
+对比耗时与结果: python scripts/local/batch_report.py
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# TA-Lib 判断分母为0的阈值（TA_IS_ZERO）
+TALIB_EPSILON = 1e-8
+# 没有scipy时Wilder递推的分块行数（块内展开的幂 decay^-块长 不能过大）
+RECURRENCE_BLOCK = 64
+
+
+def _empty(shape):
+    return np.full(shape, np.nan, order='F')
+
+
+def sma(values, period):
+    """按列的简单移动平均，前 period-1 行为NaN（与 TA-Lib SMA 一致）"""
+    out = _empty(values.shape)
+    if period < 1 or len(values) < period:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(values, period, axis=0)
+    out[period - 1:] = windows.mean(axis=-1)
+    return out
+
+
+def wilder(values, period, start):
+    """
+    Wilder平滑: 第start行为 values[start-period+1 .. start] 的均值，
+    之后 y[i] = (y[i-1] * (period-1) + values[i]) / period，start之前为NaN
+    """
+    out = _empty(values.shape)
+    if len(values) <= start:
+        return out
+    seed = values[start - period + 1:start + 1].mean(axis=0)
+    out[start] = seed
+    rest = values[start + 1:]
+    if not len(rest):
+        return out
+    if lfilter is not None:
+        decay = (period - 1) / period
+        out[start + 1:] = lfilter([1.0 / period], [1.0, -decay], rest, axis=0, zi=(decay * seed)[None, :])[0]
+        return out
+    out[start + 1:] = _recurrence(rest, (period - 1) / period, 1.0 / period, seed)
+    return out
+
+
+def _recurrence(values, decay, gain, initial):
+    """
+    y[i] = decay * y[i-1] + gain * values[i]，y[-1] = initial（没有scipy时使用）
+    按RECURRENCE_BLOCK行分块：块内用 decay 的幂展开为前缀和一次算完，块之间逐块传递末值
+    """
+    rows, columns = values.shape
+    blocks = -(-rows // RECURRENCE_BLOCK)
+    padded = np.zeros((blocks * RECURRENCE_BLOCK, columns))
+    padded[:rows] = values
+    padded = padded.reshape(blocks, RECURRENCE_BLOCK, columns)
+    steps = np.arange(RECURRENCE_BLOCK)
+    # 块内第j行: decay^(j+1) * 上一块末值 + gain * Σ_{m<=j} decay^(j-m) * values[m]
+    inner = gain * decay ** steps[:, None] * np.cumsum(padded * decay ** -steps[:, None], axis=1)
+    carry = decay ** (steps + 1)[:, None]
+    out = np.empty_like(padded)
+    previous = np.asarray(initial, dtype='float64')
+    for block in range(blocks):
+        out[block] = carry * previous + inner[block]
+        previous = out[block, -1]
+    return out.reshape(-1, columns)[:rows]
+
+
+def rsi(close, period):
+    """TA-Lib RSI：涨跌幅的Wilder平均，前period行为NaN"""
+    delta = np.empty_like(close, order='F')
+    delta[0] = np.nan
+    delta[1:] = np.diff(close, axis=0)
+    gain = wilder(np.where(delta > 0, delta, 0.0), period, period)
+    loss = wilder(np.where(delta < 0, -delta, 0.0), period, period)
+    total = gain + loss
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.where(np.abs(total) < TALIB_EPSILON, 0.0, 100.0 * gain / total)
+    out[:period] = np.nan
+    return np.asfortranarray(out)
+
+
+def true_range(high, low, close):
+    """TA-Lib TRANGE，第一行为NaN"""
+    out = _empty(close.shape)
+    previous = close[:-1]
+    out[1:] = np.maximum.reduce([high[1:] - low[1:], np.abs(high[1:] - previous), np.abs(low[1:] - previous)])
+    return out
+
+
+def atr(high, low, close, period):
+    """TA-Lib ATR：真实波幅的Wilder平均，前period行为NaN"""
+    return wilder(true_range(high, low, close), period, period)
+
+
+class CrossSection:
+    """同一时间网格上的一组交易对：堆叠的OHLCV和批量计算的指标"""
+
+    def __init__(self, pairs, frames):
+        self.pairs = list(pairs)
+        self.index = {pair: j for j, pair in enumerate(self.pairs)}
+        self.dates = _dates(frames[0])
+        self.arrays = {}
+        for column in OHLCV_COLUMNS:
+            stacked = np.empty((len(self.dates), len(self.pairs)), order='F')
+            for j, frame in enumerate(frames):
+                stacked[:, j] = frame[column].to_numpy(dtype='float64')
+            self.arrays[column] = stacked
+        self.results = {}
+
+    def compute(self, spec):
+        """按spec计算全部交易对的指标，相同的 (算子, 列, 周期) 只算一次"""
+        memo = {}
+
+        def indicator(op, column, period):
+            key = (op, column, period)
+            if key not in memo:
+                if op == 'sma':
+                    memo[key] = sma(self.arrays[column], period)
+                elif op == 'ratio':
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        memo[key] = self.arrays[column] / indicator('sma', column, period)
+                elif op == 'rsi':
+                    memo[key] = rsi(self.arrays[column], period)
+                elif op == 'atr':
+                    memo[key] = atr(self.arrays['high'], self.arrays['low'], self.arrays['close'], period)
+                else:
+                    raise ValueError(f"不支持的批量指标: {op}")
+            return memo[key]
+
+        self.results = {name: indicator(*definition) for name, definition in spec.items()}
+
+    def columns(self, pair, index):
+        """交易对的指标列（共享批量数组内存的Series）"""
+        j = self.index[pair]
+        return {name: pd.Series(values[:, j], index=index, copy=False) for name, values in self.results.items()}
+
+
+def _dates(frame):
+    # 带时区的date列用 .values 取datetime64数组（to_numpy() 会得到Timestamp对象数组）
+    return frame['date'].values
+
+
+def grid_key(frame):
+    """时间网格: (K线数, 首根时间, 末根时间)"""
+    if frame is None or frame.empty:
+        return None
+    return len(frame), frame['date'].iloc[0], frame['date'].iloc[-1]
+
+
+def talib_reference(dataframe, spec):
+    """用TA-Lib逐个计算spec中的指标（对比基准）"""
+    import talib.abstract as ta
+
+    reference = {}
+    for name, (op, column, period) in spec.items():
+        if op == 'sma':
+            reference[name] = ta.SMA(dataframe[column], timeperiod=period)
+        elif op == 'ratio':
+            reference[name] = dataframe[column] / ta.SMA(dataframe[column], timeperiod=period)
+        elif op == 'rsi':
+            reference[name] = ta.RSI(dataframe[column], timeperiod=period)
+        elif op == 'atr':
+            reference[name] = ta.ATR(dataframe, timeperiod=period)
+    return reference
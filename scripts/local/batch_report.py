@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+跨交易对批量指标对比
+对同一时间网格上的一组交易对，对比逐个计算（有TA-Lib时用TA-Lib，否则逐个交易对调用同样的numpy实现）
+与 batch_indicators.py 的批量计算（同一时间网格的交易对堆叠为二维数组一次计算）：总耗时、
+每个交易对的结果是否一致、取出的列是否与批量数组共享内存。--synthetic N 生成N个模拟交易对，
+观察耗时随交易对数的变化。指标为 EightPMHighLowStrategy 逐个计算的那组。
+
+安装TA-Lib时批量计算比逐个TA-Lib慢（100个交易对 x 2年1h约0.2-0.3倍），策略不使用批量计算。
+
+使用示例:
+    python scripts/local/batch_report.py --config config/eightpm_backtest.json --timerange 20240101-20241231
+
+    # 200个模拟交易对，每个两年1h K线
+    python scripts/local/batch_report.py --config config/eightpm_backtest.json --synthetic 200 --fixture 730
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from batch_indicators import CrossSection, grid_key, talib_reference
+from freqtrade_data import LocalDataProvider, config_pairs, load_config
+
+# EightPMHighLowStrategy.populate_indicators 中逐个计算的TA-Lib指标 (算子, 输入列, 周期)
+EIGHTPM_SPEC = {
+    'sma_20': ('sma', 'close', 20),
+    'volume_sma': ('sma', 'volume', 20),
+    'volume_ratio': ('ratio', 'volume', 20),
+    'rsi': ('rsi', 'close', 14),
+    'atr': ('atr', 'close', 14),
+}
+
+
+def per_pair(frames, spec):
+    """逐个交易对计算，返回 ({交易对: {列名: ndarray}}, 耗时秒, 基准名称)"""
+    try:
+        import talib  # noqa: F401
+        compute, baseline = (lambda pair, df: talib_reference(df, spec)), 'TA-Lib'
+    except ImportError:
+        def compute(pair, df):
+            section = CrossSection([pair], [df])
+            section.compute(spec)
+            return {name: values[:, 0] for name, values in section.results.items()}
+        baseline = '逐个numpy'
+
+    started = time.perf_counter()
+    results = {pair: compute(pair, df) for pair, df in frames.items()}
+    return results, time.perf_counter() - started, baseline
+
+
+def batched(frames, spec):
+    """同一时间网格的交易对一起批量计算，返回 ({交易对: {列名: Series}}, 耗时秒, 网格数, 共享内存的列数)"""
+    started = time.perf_counter()
+    grids = {}
+    for pair, df in frames.items():
+        grids.setdefault(grid_key(df), []).append(pair)
+    results = {}
+    for pairs in grids.values():
+        section = CrossSection(pairs, [frames[pair] for pair in pairs])
+        section.compute(spec)
+        for pair in pairs:
+            results[pair] = section.columns(pair, frames[pair].index)
+    elapsed = time.perf_counter() - started
+    shared = sum(values.to_numpy().base is not None for columns in results.values() for values in columns.values())
+    return results, elapsed, len(grids), shared
+
+
+def main():
+    parser = argparse.ArgumentParser(description='跨交易对批量指标对比')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--timerange', help='时间范围，如 20240101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--fixture', type=int, metavar='DAYS', help='使用指定天数的模拟K线')
+    parser.add_argument('--synthetic', type=int, metavar='N', help='使用N个模拟交易对（需要 --fixture）')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    spec = EIGHTPM_SPEC
+    timeframe = config.get('timeframe', '1h')
+    if args.synthetic:
+        if not args.fixture:
+            parser.error('--synthetic 需要同时指定 --fixture')
+        pairs = [f"SYN{i:03d}/USDT" for i in range(args.synthetic)]
+    else:
+        pairs = args.pairs or config_pairs(config)
+    if args.fixture:
+        from benchmark_fixtures import FixtureDataProvider
+        provider = FixtureDataProvider(pairs, timeframe, args.fixture)
+    else:
+        provider = LocalDataProvider(config, pairs, args.datadir, args.timerange)
+    frames = {pair: provider.get_pair_dataframe(pair, timeframe) for pair in pairs}
+    frames = {pair: df for pair, df in frames.items() if not df.empty}
+    if not frames:
+        print('❌ 没有K线数据')
+        sys.exit(1)
+
+    expected, single_s, baseline = per_pair(frames, spec)
+    results, batch_s, grids, shared = batched(frames, spec)
+
+    rows = sum(len(df) for df in frames.values())
+    print(f"🧮 {len(frames)} 个交易对, {rows:,} 行, 指标: {', '.join(spec)}")
+    print(f"{'方式':<12}{'耗时ms':>10}{'每交易对ms':>12}")
+    print(f"{baseline:<12}{single_s * 1000:>10.1f}{single_s * 1000 / len(frames):>12.2f}")
+    print(f"{'批量':<12}{batch_s * 1000:>10.1f}{batch_s * 1000 / len(frames):>12.2f}"
+          f"   加速 {single_s / max(batch_s, 1e-9):.1f}x")
+
+    failed = []
+    for pair, columns in results.items():
+        for name, values in columns.items():
+            if not np.allclose(values.to_numpy(), np.asarray(expected[pair][name], dtype='float64'),
+                               rtol=1e-9, atol=1e-12, equal_nan=True):
+                failed.append(f"{pair} {name}")
+    total = sum(len(columns) for columns in results.values())
+    print(f"时间网格 {grids} 个, 共享内存的列 {shared}/{total}")
+    if failed:
+        print(f"❌ 与{baseline}不一致: {', '.join(failed[:10])}")
+        sys.exit(1)
+    print(f"✅ 全部 {total} 列与{baseline}一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+策略分析热点基准测试
+在标准模拟K线上测量各策略 populate_indicators / populate_entry_trend /
+populate_exit_trend / custom_exit 以及本地 FinalOptimizedStrategy 流程的耗时与峰值内存，
+结果保存为json，可与之前提交的结果对比并按阈值判定性能回退。
+
+使用示例:
+    # 默认矩阵
+    python scripts/local/benchmark.py
+
+    # 只测8PM策略的5年数据，并与基线对比（耗时增加超过15%视为回退）
+    python scripts/local/benchmark.py --strategies EightPMHighLowStrategy --durations 5Y \\
+        --compare user_data/benchmarks/benchmark-abc1234.json --threshold 0.15
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from benchmark_fixtures import (
+    FIXTURE_DURATIONS, FixtureDataProvider, synthetic_ohlcv, to_local_format,
+)
+from freqtrade_data import PROJECT_ROOT, load_strategy
+from prescreen_backtest import overridden_callbacks
+
+
+BENCHMARK_DIR = PROJECT_ROOT / 'user_data' / 'benchmarks'
+
+# 每个策略的代表交易对、时间框架和默认测试时长
+BENCH_STRATEGIES = {
+    'EightPMHighLowStrategy': {'pair': 'ETH/USDT:USDT', 'timeframe': '1h', 'durations': ['1M', '1Y', '5Y']},
+    'OneFiveTrendHTF': {'pair': 'SOL/USDT', 'timeframe': '5m', 'durations': ['1M', '1Y']},
+    'SimplifiedArbitrage': {'pair': 'ETH/USDT', 'timeframe': '1m', 'durations': ['1M', '6M']},
+    'TriangularArbitrageOKX': {'pair': 'ETH/USDT', 'timeframe': '1m', 'durations': ['1M']},
+}
+
+LOCAL_PIPELINE = {'name': 'FinalOptimizedStrategy', 'timeframe': '1h', 'durations': ['1Y', '5Y']}
+
+CUSTOM_EXIT_CALLS = 1000
+DEFAULT_THRESHOLD = 0.15
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def measure(prepare, run, repeat, memory=True):
+    """
+    重复执行取耗时，prepare的开销不计入
+    峰值内存用tracemalloc单独跑一次测量，避免影响计时
+    """
+    times = []
+    for _ in range(repeat):
+        args = prepare()
+        started = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - started)
+
+    result = {
+        'seconds_min': min(times),
+        'seconds_median': statistics.median(times),
+        'repeat': repeat,
+    }
+    if memory:
+        args = prepare()
+        tracemalloc.start()
+        run(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_mem_mb'] = peak / 1024 / 1024
+    return result
+
+
+def bench_strategy(name, spec, duration, repeat, memory):
+    """单个策略在一个时长下的各阶段基准"""
+    pair, timeframe = spec['pair'], spec['timeframe']
+    days = FIXTURE_DURATIONS[duration]
+    provider = FixtureDataProvider([pair], timeframe, days)
+    strategy = load_strategy(name, provider.config, provider)
+    metadata = {'pair': pair}
+    base = provider.get_pair_dataframe(pair, timeframe)
+    rows = len(base)
+    prefix = f"{name}/{timeframe}/{duration}"
+    results = {}
+
+    results[f"{prefix}/populate_indicators"] = measure(
+        lambda: (base.copy(),),
+        lambda df: strategy.populate_indicators(df, metadata),
+        repeat, memory)
+
+    indicators = strategy.populate_indicators(base.copy(), metadata)
+    results[f"{prefix}/populate_entry_trend"] = measure(
+        lambda: (indicators.copy(),),
+        lambda df: strategy.populate_entry_trend(df, metadata),
+        repeat, memory)
+
+    entries = strategy.populate_entry_trend(indicators.copy(), metadata)
+    results[f"{prefix}/populate_exit_trend"] = measure(
+        lambda: (entries.copy(),),
+        lambda df: strategy.populate_exit_trend(df, metadata),
+        repeat, memory)
+
+    analyzed = strategy.populate_exit_trend(entries.copy(), metadata)
+    provider.set_analyzed_dataframe(pair, timeframe, analyzed)
+
+    if 'custom_exit' in overridden_callbacks(strategy):
+        open_date = analyzed['date'].iloc[-1].to_pydatetime() - timedelta(hours=48)
+        trade = SimpleNamespace(pair=pair, is_short=False, open_date_utc=open_date, open_rate=1.0)
+
+        def call_custom_exit():
+            now = open_date
+            for i in range(CUSTOM_EXIT_CALLS):
+                now = now + timedelta(minutes=1)
+                strategy.custom_exit(pair, trade, now, 1.0, (i % 50) / 1000)
+
+        results[f"{prefix}/custom_exit"] = measure(lambda: (), call_custom_exit, repeat, memory)
+        results[f"{prefix}/custom_exit"]['calls'] = CUSTOM_EXIT_CALLS
+
+    for item in results.values():
+        item['rows'] = rows
+    return results
+
+
+def bench_local_pipeline(duration, repeat, memory):
+    """本地 FinalOptimizedStrategy: analyze_data + backtest"""
+    from final_optimized_strategy import FinalOptimizedStrategy
+
+    days = FIXTURE_DURATIONS[duration]
+    data = to_local_format(synthetic_ohlcv('1h', days, 'ETH/USDT'))
+    prefix = f"{LOCAL_PIPELINE['name']}/1h/{duration}"
+    results = {}
+
+    results[f"{prefix}/analyze_data"] = measure(
+        lambda: (FinalOptimizedStrategy(), data),
+        lambda strategy, df: strategy.analyze_data(df),
+        repeat, memory)
+
+    analyzed = FinalOptimizedStrategy().analyze_data(data)
+
+    def run_backtest(strategy, df):
+        # 本地回测逐笔打印交易，计时时屏蔽输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            strategy.backtest(df)
+
+    results[f"{prefix}/backtest"] = measure(
+        lambda: (FinalOptimizedStrategy(), analyzed),
+        run_backtest, repeat, memory)
+
+    for item in results.values():
+        item['rows'] = len(data)
+    return results
+
+
+def compare_results(current, baseline, threshold):
+    """返回 [(用例, 当前耗时, 基线耗时, 比值, 是否回退)]"""
+    rows = []
+    for case, item in current['results'].items():
+        base = baseline.get('results', {}).get(case)
+        if base is None:
+            continue
+        ratio = item['seconds_min'] / base['seconds_min'] if base['seconds_min'] > 0 else float('inf')
+        rows.append((case, item['seconds_min'], base['seconds_min'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def print_results(results):
+    print(f"\n{'用例':<58}{'行数':>10}{'最短(s)':>10}{'中位(s)':>10}{'峰值内存MB':>12}")
+    for case, item in results.items():
+        mem = item.get('peak_mem_mb')
+        mem_text = f"{mem:>12.1f}" if mem is not None else f"{'-':>12}"
+        print(f"{case:<58}{item['rows']:>10}{item['seconds_min']:>10.4f}"
+              f"{item['seconds_median']:>10.4f}{mem_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='策略分析热点基准测试')
+    parser.add_argument('--strategies', nargs='+',
+                        help=f"要测试的策略，可选: {', '.join(list(BENCH_STRATEGIES) + [LOCAL_PIPELINE['name']])}")
+    parser.add_argument('--durations', nargs='+', choices=list(FIXTURE_DURATIONS),
+                        help='覆盖默认测试时长')
+    parser.add_argument('--repeat', type=int, default=3, help='每个用例重复次数')
+    parser.add_argument('--no-memory', action='store_true', help='跳过峰值内存测量')
+    parser.add_argument('--output', help='结果json路径，默认 user_data/benchmarks/benchmark-<commit>.json')
+    parser.add_argument('--compare', help='基线结果json，用于回退检测')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='耗时增加超过该比例视为回退 (默认0.15)')
+    args = parser.parse_args()
+
+    selected = args.strategies or list(BENCH_STRATEGIES) + [LOCAL_PIPELINE['name']]
+    memory = not args.no_memory
+    results = {}
+
+    for name in selected:
+        if name == LOCAL_PIPELINE['name']:
+            for duration in args.durations or LOCAL_PIPELINE['durations']:
+                print(f"⏱️  {name} {duration} ...")
+                results.update(bench_local_pipeline(duration, args.repeat, memory))
+            continue
+
+        spec = BENCH_STRATEGIES.get(name)
+        if spec is None:
+            print(f"❌ 未知策略: {name}")
+            continue
+        for duration in args.durations or spec['durations']:
+            print(f"⏱️  {name} {spec['timeframe']} {duration} ...")
+            try:
+                results.update(bench_strategy(name, spec, duration, args.repeat, memory))
+            except ImportError as e:
+                print(f"⚠️  跳过 {name}: 缺少依赖 ({e})，请先安装freqtrade和TA-Lib")
+                break
+
+    current = {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+    print_results(results)
+
+    output = Path(args.output) if args.output else BENCHMARK_DIR / f"benchmark-{current['meta']['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare_results(current, baseline, args.threshold)
+        print(f"\n=== 与基线对比 ({baseline.get('meta', {}).get('commit', '?')}, 阈值 +{args.threshold:.0%}) ===")
+        for case, now, base, ratio, regressed in rows:
+            mark = '❌' if regressed else '✅'
+            print(f"{mark} {case:<58}{base:>10.4f} -> {now:>10.4f}  ({ratio:.2f}x)")
+        regressions = [r for r in rows if r[4]]
+        if regressions:
+            print(f"\n❌ {len(regressions)} 个用例出现性能回退")
+            sys.exit(1)
+        print("\n✅ 没有性能回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+基准测试用的标准模拟K线数据
+同一 (交易对, 时间框架, 时长) 总是生成完全相同的数据，便于不同提交之间对比耗时。
+价格模型与本地策略的模拟数据一致：晚上18-22点波动放大，成交量随波动放大。
+"""
+
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from freqtrade_data import LocalDataProvider, timeframe_to_seconds
+
+
+FIXTURE_START = '2020-01-01'
+
+# 标准时长（天）
+FIXTURE_DURATIONS = {
+    '1M': 30,
+    '6M': 182,
+    '1Y': 365,
+    '2Y': 730,
+    '5Y': 1825,
+}
+
+FIXTURE_TIMEFRAMES = ['1m', '5m', '15m', '1h', '4h']
+
+# 各币种的起始价格，保持三角关系 BTC/USDT * ETH/BTC ≈ ETH/USDT
+BASE_PRICES = {
+    'BTC': 40000.0,
+    'ETH': 2400.0,
+    'ETH/BTC': 0.06,
+    'SOL': 100.0,
+    'AVAX': 35.0,
+    'ADA': 0.5,
+    'DOT': 7.0,
+    'LINK': 15.0,
+    'MATIC': 0.8,
+}
+
+
+def fixture_seed(pair, timeframe):
+    return zlib.crc32(f"{pair}|{timeframe}".encode('utf-8'))
+
+
+def base_price(pair):
+    if pair.startswith('ETH/BTC'):
+        return BASE_PRICES['ETH/BTC']
+    return BASE_PRICES.get(pair.split('/')[0], 100.0)
+
+
+def synthetic_ohlcv(timeframe='1h', days=30, pair='ETH/USDT', start=FIXTURE_START):
+    """生成freqtrade格式的模拟K线（date列为UTC时间）"""
+    seconds = timeframe_to_seconds(timeframe)
+    n = int(days * 86400 // seconds)
+    rng = np.random.default_rng(fixture_seed(pair, timeframe))
+
+    dates = pd.date_range(start=start, periods=n, freq=pd.Timedelta(seconds=seconds), tz='UTC')
+    hours = dates.hour.to_numpy()
+    step_vol = 0.012 * np.sqrt(seconds / 3600)
+    vol = np.where((hours >= 18) & (hours <= 22), step_vol * 1.6, step_vol)
+
+    returns = rng.normal(0.0, 1.0, n) * vol
+    close = base_price(pair) * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0.0, 0.6, n)) * vol * close
+    high = np.maximum(open_, close) + spread * 0.5
+    low = np.minimum(open_, close) - spread * 0.5
+    volume = 8000 * (1 + np.abs(returns) * 40) * rng.uniform(0.5, 2.0, n)
+
+    return pd.DataFrame({
+        'date': dates,
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+    })
+
+
+def to_local_format(df):
+    """freqtrade格式 -> 本地独立策略使用的格式（时间索引 + Open/High/Low/Close/Volume）"""
+    local = df.set_index(df['date'].dt.tz_localize(None))[['open', 'high', 'low', 'close', 'volume']]
+    local.index.name = None
+    return local.rename(columns=str.capitalize)
+
+
+class FixtureDataProvider(LocalDataProvider):
+    """按需生成模拟数据的数据提供者，任意交易对/时间框架都有相同时长的数据"""
+
+    def __init__(self, pairs, timeframe, days):
+        super().__init__({'timeframe': timeframe, 'exchange': {'pair_whitelist': list(pairs)}},
+                         pairs=pairs)
+        self.days = days
+
+    def _load(self, pair, timeframe):
+        key = (pair, timeframe)
+        if key not in self._cache:
+            self._cache[key] = synthetic_ohlcv(timeframe, self.days, pair)
+        return self._cache[key]
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+分块信号计算（有界内存）
+1m策略（TriangularArbitrageOKX、SimplifiedArbitrage）两年约100万根K线/交易对，整段分析时
+连同informative交易对和几十个float64派生列全部驻留内存。分块模式把时间范围切成重叠窗口
+（重叠 = 指标回看长度），逐块分析后只把本块的信号追加写入磁盘，峰值内存只与块大小有关。
+
+- K线从列式存储（ohlcv_store.py）按位置读取，窗口外的数据不会读入内存
+- 窗口保留整段运行时的行号作为索引，informative交易对同时间框架按位置切片，
+  与freqtrade按索引对齐的赋值（dataframe["x"] = other["close"]）结果一致
+- EMA/RSI/ATR等递归指标没有严格的回看长度，默认重叠取 startup_candle_count 的 5 倍，
+  使截断带来的残差低于float64精度；--verify 与整段运行逐行对比信号
+- 每次运行在独立子进程中执行，报告该进程的峰值RSS
+
+使用示例:
+    # 分块计算信号并与整段运行对比，报告两者的峰值RSS
+    python scripts/local/chunked_analysis.py --config config/backtest.json \\
+        --strategy SimplifiedArbitrage --timerange 20230101-20241231 --chunk-rows 50000 --verify
+
+    # 无本地数据时用两年的模拟1m K线
+    python scripts/local/chunked_analysis.py --config config/backtest.json \\
+        --strategy TriangularArbitrageOKX --fixture 730 --verify
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from freqtrade_data import (
+    OHLCV_COLUMNS, PROJECT_ROOT, STRATEGY_DIR, LocalDataProvider, analyze_pair, candle_type_of,
+    config_pairs, dates_to_ms, exchange_data_dir, load_config, load_strategy, parse_timerange,
+    timeframe_to_ms,
+)
+from ohlcv_store import COLUMN_FILES, VALUE_COLUMNS, ColumnarSeries, series_dir
+
+
+OUTPUT_DIR = PROJECT_ROOT / 'user_data' / 'signals'
+DEFAULT_CHUNK_ROWS = 100_000
+
+# 默认重叠 = startup_candle_count * OVERLAP_FACTOR（递归指标的残差按指数衰减）
+OVERLAP_FACTOR = 5
+
+SIGNAL_COLUMNS = ['enter_long', 'exit_long', 'enter_short', 'exit_short']
+TAG_COLUMNS = ['enter_tag', 'exit_tag']
+
+
+def reset_peak_rss():
+    """
+    清零峰值RSS（Linux）：子进程fork后exec会继承父进程的峰值，
+    不清零时每次运行的峰值至少是主进程生成模拟数据时的内存
+    """
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存(MB)：优先读取 /proc 的VmHWM，否则用getrusage（Linux为KB，macOS为字节）"""
+    try:
+        for line in Path('/proc/self/status').read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def open_series(config, datadir, pair, timeframe, candle_type):
+    """列式序列，json比列式数据新时先重新转换；没有该时间框架时从基础时间框架派生"""
+    from resample import base_series, derive_series
+
+    series = base_series(datadir, pair, timeframe, candle_type)
+    if series is not None:
+        return series
+    base = config.get('timeframe')
+    if base and timeframe != base and timeframe_to_ms(timeframe) > timeframe_to_ms(base) \
+            and timeframe_to_ms(timeframe) % timeframe_to_ms(base) == 0:
+        series, _ = derive_series(datadir, pair, timeframe, base, candle_type)
+    return series
+
+
+class SeriesWindow:
+    """
+    单个 (交易对, 时间框架) 的K线，按位置切出窗口；位置即整段运行时的行号
+    窗口数据用带偏移的文件读取，不经过memmap：memmap访问过的页会一直计入RSS，
+    逐块读完整个序列后常驻内存仍与序列长度成正比
+    """
+
+    def __init__(self, series, start_ms=None, end_ms=None):
+        self.path = series.path
+        # 时间戳memmap只用于二分查找，只会访问少量页
+        self.ts = series.arrays()['date']
+        self.offset = int(np.searchsorted(self.ts, start_ms, 'left')) if start_ms is not None else 0
+        end = int(np.searchsorted(self.ts, end_ms, 'left')) if end_ms is not None else len(self.ts)
+        self.ts = self.ts[self.offset:end]
+
+    def __len__(self):
+        return len(self.ts)
+
+    def position(self, ms, side='left'):
+        return int(np.searchsorted(self.ts, ms, side))
+
+    def read(self, col, lo, hi):
+        name, dtype = COLUMN_FILES[col]
+        return np.fromfile(self.path / name, dtype=dtype, count=hi - lo,
+                           offset=(self.offset + lo) * dtype.itemsize)
+
+    def timestamp(self, i):
+        return int(self.read('date', i, i + 1)[0])
+
+    def frame(self, lo, hi):
+        """行 [lo, hi) 的DataFrame，索引保留行号"""
+        hi = max(lo, min(hi, len(self)))
+        columns = {'date': pd.to_datetime(self.read('date', lo, hi), unit='ms', utc=True)}
+        columns.update({col: self.read(col, lo, hi) for col in VALUE_COLUMNS})
+        return pd.DataFrame(columns, index=pd.RangeIndex(lo, hi))
+
+
+class ChunkedDataProvider(LocalDataProvider):
+    """
+    只提供当前窗口数据的DataProvider
+    主时间框架的交易对按窗口行号切片；其他时间框架按时间切片，并向前多取overlap根用于预热
+    """
+
+    def __init__(self, config, pairs=None, datadir=None, timerange=None, startup_candles=0,
+                 overlap=0):
+        super().__init__(config, pairs, datadir, timerange, startup_candles)
+        self.timeframe = config.get('timeframe')
+        self.overlap = overlap
+        self.rows = None
+        self._windows = {}
+
+    def window(self, pair, timeframe=None):
+        timeframe = timeframe or self.timeframe
+        key = (pair, timeframe)
+        if key not in self._windows:
+            series = open_series(self.config, self.datadir, pair, timeframe, self.candle_type)
+            if series is None:
+                self._windows[key] = None
+            else:
+                start_ms, end_ms = parse_timerange(self.timerange)
+                if start_ms is not None:
+                    start_ms -= self.startup_candles * timeframe_to_ms(timeframe)
+                self._windows[key] = SeriesWindow(series, start_ms, end_ms)
+        return self._windows[key]
+
+    def set_rows(self, pair, lo, hi):
+        """设置当前窗口：主交易对的行 [lo, hi)"""
+        self.rows = (pair, lo, hi)
+
+    def get_pair_dataframe(self, pair, timeframe=None, candle_type=''):
+        timeframe = timeframe or self.timeframe
+        source = self.window(pair, timeframe)
+        if source is None:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        main_pair, lo, hi = self.rows
+        if timeframe == self.timeframe:
+            return source.frame(min(lo, len(source)), hi)
+        # 高时间框架：窗口最后一根K线之前开始的K线，前面多留overlap根
+        main = self.window(main_pair)
+        first_ms, last_ms = main.timestamp(lo), main.timestamp(hi - 1)
+        start = max(0, source.position(first_ms) - self.overlap)
+        return source.frame(start, source.position(last_ms, 'right'))
+
+
+class SignalWriter:
+    """把有信号的行追加写入csv：pair,date(ms),信号列,标签列"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, 'w', encoding='utf-8', newline='')
+        self.file.write(','.join(['pair', 'date'] + SIGNAL_COLUMNS + TAG_COLUMNS) + '\n')
+        self.rows = 0
+        self.signals = 0
+
+    def write(self, pair, df):
+        out = pd.DataFrame({'pair': pair, 'date': dates_to_ms(df['date'])})
+        for col in SIGNAL_COLUMNS:
+            values = df[col] if col in df.columns else 0
+            out[col] = pd.Series(values, index=df.index).fillna(0).astype('int8').to_numpy()
+        for col in TAG_COLUMNS:
+            values = df[col] if col in df.columns else None
+            out[col] = pd.Series(values, index=df.index, dtype=object).fillna('').astype(str).to_numpy()
+        mask = (out[SIGNAL_COLUMNS] != 0).any(axis=1) | (out[TAG_COLUMNS] != '').any(axis=1)
+        out.loc[mask].to_csv(self.file, header=False, index=False)
+        self.rows += len(out)
+        self.signals += int(mask.sum())
+
+    def close(self):
+        self.file.close()
+
+
+def run_analysis(options):
+    """
+    在当前进程中计算全部交易对的信号并写入csv
+    options['chunk_rows'] 为None时整段分析（单个窗口），返回运行统计
+    """
+    reset_peak_rss()
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    config = load_config(options['config'])
+    pairs = options['pairs'] or config_pairs(config)
+    provider = ChunkedDataProvider(config, pairs, options['datadir'], options['timerange'])
+    strategy = load_strategy(options['strategy'], config, provider,
+                             options.get('strategy_dir') or STRATEGY_DIR)
+    startup = int(getattr(strategy, 'startup_candle_count', 0) or 0)
+    provider.startup_candles = startup
+    overlap = options['overlap'] if options['overlap'] is not None else startup * OVERLAP_FACTOR
+    provider.overlap = overlap
+    start_ms, _ = parse_timerange(options['timerange'])
+
+    writer = SignalWriter(options['output'])
+    chunks = 0
+    try:
+        for pair in pairs:
+            source = provider.window(pair)
+            if source is None or len(source) == 0:
+                continue
+            n = len(source)
+            # 与freqtrade一致：时间范围之前的启动K线只用于预热，不输出信号
+            first = source.position(start_ms) if start_ms is not None else min(startup, n)
+            step = options['chunk_rows'] or n
+            for c0 in range(first, n, step):
+                c1 = min(c0 + step, n)
+                lo = 0 if options['chunk_rows'] is None else max(0, c0 - overlap)
+                provider.set_rows(pair, lo, c1)
+                df = analyze_pair(strategy, source.frame(lo, c1), pair)
+                writer.write(pair, df.iloc[c0 - lo:])
+                chunks += 1
+                del df
+    finally:
+        writer.close()
+
+    return {
+        'mode': 'whole' if options['chunk_rows'] is None else 'chunked',
+        'chunks': chunks,
+        'rows': writer.rows,
+        'signals': writer.signals,
+        'overlap': overlap,
+        'seconds': time.perf_counter() - started,
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': peak_rss_mb(),
+        'output': str(writer.path),
+    }
+
+
+def run_isolated(options):
+    """在新的子进程中运行，峰值RSS只包含这一次运行"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_analysis, options).result()
+
+
+def compare_signals(path_a, path_b):
+    """逐行对比两个信号文件，返回 (不一致行数, 首个不一致行)"""
+    read = dict(dtype={'pair': str, 'date': 'int64', **{c: str for c in TAG_COLUMNS}},
+                keep_default_na=False)
+    a, b = pd.read_csv(path_a, **read), pd.read_csv(path_b, **read)
+    merged = a.merge(b, on=['pair', 'date'], how='outer', suffixes=('_a', '_b'), indicator=True)
+    differs = merged['_merge'] != 'both'
+    for col in SIGNAL_COLUMNS + TAG_COLUMNS:
+        differs |= merged[f"{col}_a"].astype(str) != merged[f"{col}_b"].astype(str)
+    if not differs.any():
+        return 0, None
+    row = merged.loc[differs].iloc[0]
+    first = f"{row['pair']} {pd.Timestamp(int(row['date']), unit='ms', tz='UTC')}"
+    return int(differs.sum()), first
+
+
+def write_fixture(config, days, pairs, datadir):
+    """模拟K线写入临时目录的列式存储，供无本地数据时运行"""
+    from benchmark_fixtures import synthetic_ohlcv
+
+    timeframe = config.get('timeframe')
+    candle_type = candle_type_of(config)
+    for pair in pairs:
+        df = synthetic_ohlcv(timeframe, days, pair)
+        values = {col: df[col].to_numpy('float64') for col in VALUE_COLUMNS}
+        ColumnarSeries(series_dir(datadir, pair, timeframe, candle_type)).write(
+            dates_to_ms(df['date']), values)
+
+
+def print_run(stats):
+    label = '整段' if stats['mode'] == 'whole' else '分块'
+    print(f"{label}: {stats['rows']:>10,} 行 {stats['chunks']:>5} 块  {stats['signals']:>7,} 行有信号  "
+          f"{stats['seconds']:>7.1f}秒  峰值RSS {stats['peak_rss_mb']:>7.0f}MB "
+          f"(启动后 {stats['baseline_rss_mb']:.0f}MB)")
+    print(f"      -> {stats['output']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分块信号计算（有界内存）')
+    parser.add_argument('--config', default='config/backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--strategy-path', help='策略目录，默认 user_data/strategies')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--timerange', help='时间范围，如 20230101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='每块输出的K线数')
+    parser.add_argument('--overlap', type=int,
+                        help=f'窗口重叠的K线数，默认 startup_candle_count x {OVERLAP_FACTOR}')
+    # --verify 需要分块和整段两次运行，与只运行整段的 --whole 互斥
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--whole', action='store_true', help='只运行整段分析（对照）')
+    mode.add_argument('--verify', action='store_true', help='同时运行整段分析并逐行对比信号')
+    parser.add_argument('--fixture', type=int, metavar='DAYS', help='使用指定天数的模拟K线')
+    parser.add_argument('--output-dir', default=str(OUTPUT_DIR), help='信号文件目录')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    strategy_name = args.strategy or config.get('strategy')
+    if not strategy_name:
+        parser.error('需要 --strategy 或配置中的strategy')
+    pairs = args.pairs or config_pairs(config)
+    output_dir = Path(args.output_dir)
+    base = {
+        'config': args.config,
+        'strategy': strategy_name,
+        'strategy_dir': args.strategy_path,
+        'pairs': pairs,
+        'timerange': args.timerange,
+        'datadir': args.datadir,
+        'overlap': args.overlap,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.fixture:
+            base['datadir'] = str(Path(tmp) / 'data')
+            write_fixture(config, args.fixture, pairs, exchange_data_dir(config, base['datadir']))
+            print(f"🧪 模拟数据: {len(pairs)} 个交易对 x {args.fixture} 天 {config.get('timeframe')}")
+        else:
+            # 先在主进程中完成json -> 列式转换，转换的内存开销不计入各次运行
+            datadir = exchange_data_dir(config, args.datadir)
+            for pair in pairs:
+                if open_series(config, datadir, pair, config.get('timeframe'), candle_type_of(config)) is None:
+                    print(f"⚠️  {pair}: 没有 {config.get('timeframe')} 数据")
+
+        runs = []
+        if not args.whole:
+            runs.append(dict(base, chunk_rows=args.chunk_rows,
+                             output=str(output_dir / f"{strategy_name}-chunked.csv")))
+        if args.whole or args.verify:
+            runs.append(dict(base, chunk_rows=None, output=str(output_dir / f"{strategy_name}-whole.csv")))
+
+        print(f"📊 {strategy_name}  块大小 {args.chunk_rows:,} 行")
+        results = [run_isolated(options) for options in runs]
+        for stats in results:
+            print_run(stats)
+
+    if args.verify:
+        chunked, whole = results
+        mismatched, first = compare_signals(chunked['output'], whole['output'])
+        saved = whole['peak_rss_mb'] - chunked['peak_rss_mb']
+        if mismatched:
+            print(f"❌ 信号不一致: {mismatched} 行，首个 {first}（可增大 --overlap，当前 {chunked['overlap']}）")
+            sys.exit(1)
+        print(f"✅ 信号完全一致 (重叠 {chunked['overlap']} 根)，峰值RSS减少 {saved:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+指标DataFrame压缩报告
+对每个交易对按 user_data/strategies/frame_compaction.py 的规则压缩分析结果
+（删除出入场逻辑未引用的中间列、派生列降精度），报告压缩前后的字节数，
+并检查压缩后重新计算的信号与float64整段分析逐行一致。
+
+使用示例:
+    python scripts/local/compact_report.py --config config/eightpm_backtest.json \\
+        --strategy EightPMHighLowStrategy --timerange 20240101-20241231
+
+    # 无本地数据时用两年的模拟K线
+    python scripts/local/compact_report.py --config config/backtest.json \\
+        --strategy SimplifiedArbitrage --fixture 730
+
+在freqtrade中启用: FT_STRATEGY_COMPACT=check freqtrade backtesting ...
+"""
+
+import argparse
+import os
+import sys
+
+from freqtrade_data import (
+    STRATEGY_DIR, LocalDataProvider, analyze_pair, config_pairs, load_config, load_strategy,
+)
+
+
+def compact_pair(strategy, df, pair):
+    """返回 (float64分析结果, 压缩后的分析结果, 压缩报告)"""
+    from frame_compaction import (
+        compact_frame, compact_signals, plan_compaction, referenced_columns,
+    )
+
+    metadata = {'pair': pair}
+    analyzed = analyze_pair(strategy, df.copy(), pair)
+    indicators = strategy.populate_indicators(df.copy(), metadata)
+    keep, exact = plan_compaction(strategy, indicators, metadata, referenced_columns(type(strategy)))
+    compacted, report = compact_frame(indicators, keep, exact)
+    compacted = strategy.populate_entry_trend(compacted, metadata)
+    compacted = compact_signals(strategy.populate_exit_trend(compacted, metadata))
+    return analyzed, compacted, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='指标DataFrame压缩报告')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--strategy-path', help='策略目录，默认 user_data/strategies')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--timerange', help='时间范围，如 20240101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--fixture', type=int, metavar='DAYS', help='使用指定天数的模拟K线')
+    parser.add_argument('--verbose', action='store_true', help='列出删除和降精度的列')
+    args = parser.parse_args()
+
+    # 报告需要未压缩的策略作为对照
+    os.environ.pop('FT_STRATEGY_COMPACT', None)
+    if str(STRATEGY_DIR) not in sys.path:
+        sys.path.insert(0, str(STRATEGY_DIR))
+    from frame_compaction import frame_bytes, signal_frame
+
+    config = load_config(args.config)
+    strategy_name = args.strategy or config.get('strategy')
+    if not strategy_name:
+        parser.error('需要 --strategy 或配置中的strategy')
+    pairs = args.pairs or config_pairs(config)
+    if args.fixture:
+        from benchmark_fixtures import FixtureDataProvider
+        provider = FixtureDataProvider(pairs, config.get('timeframe', '1h'), args.fixture)
+    else:
+        provider = LocalDataProvider(config, pairs, args.datadir, args.timerange)
+    strategy = load_strategy(strategy_name, config, provider, args.strategy_path or STRATEGY_DIR)
+    provider.startup_candles = getattr(strategy, 'startup_candle_count', 0)
+
+    print(f"📦 {strategy_name}")
+    print(f"{'交易对':<16}{'K线数':>10}{'压缩前MB':>11}{'压缩后MB':>11}{'比例':>8}"
+          f"{'删除':>6}{'降精度':>7}{'保持精度':>9}  信号")
+    total_before = total_after = 0
+    failed = False
+    for pair in pairs:
+        df = provider.get_pair_dataframe(pair, config.get('timeframe'))
+        if df.empty:
+            print(f"⚠️  {pair}: 没有数据")
+            continue
+        analyzed, compacted, report = compact_pair(strategy, df, pair)
+        before, after = frame_bytes(analyzed), frame_bytes(compacted)
+        total_before += before
+        total_after += after
+        same = signal_frame(analyzed).equals(signal_frame(compacted))
+        failed |= not same
+        print(f"{pair:<16}{len(df):>10,}{before / 1e6:>11.1f}{after / 1e6:>11.1f}{after / before:>8.0%}"
+              f"{len(report['dropped']):>6}{len(report['downcast']):>7}{len(report['exact']):>9}"
+              f"  {'✅ 一致' if same else '❌ 不一致'}")
+        if args.verbose:
+            print(f"     删除: {', '.join(map(str, report['dropped'])) or '-'}")
+            print(f"     降精度: {', '.join(f'{c}->{t}' for c, t in report['downcast'].items()) or '-'}")
+            print(f"     保持float64: {', '.join(report['exact']) or '-'}")
+
+    if total_before:
+        print(f"{'合计':<16}{'':>10}{total_before / 1e6:>11.1f}{total_after / 1e6:>11.1f}"
+              f"{total_after / total_before:>8.0%}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+8点多小时确认: 向量化与逐行循环对比
+user_data/strategies/eightpm_signals.py 把8点信号之后的价格确认从逐行循环改为按距离整列比较。
+本脚本保留原来的逐行循环作为参照，在同一份K线（默认5年小时线）上逐行核对确认结果并报告耗时:
+- AdvancedEightPMStrategy（strategies_archive/advanced_eightpm_strategy.py）: 第2根K线上动量与价格同时确认
+- EightPMHighLowStrategy: 下一根K线的1小时涨跌幅确认（基础信号按 eightpm_engine.py 的 v2.8 配置计算，
+  不需要freqtrade/TA-Lib）
+- 多根K线的确认窗口（any / all）: 与逐个8点信号检查窗口的朴素循环对比
+
+使用示例:
+    python scripts/local/confirmation_report.py
+
+    # 确认窗口 1~6 根K线，本地K线数据
+    python scripts/local/confirmation_report.py --candles 1 2 3 4 5 6 \\
+        --config config/eightpm_backtest.json --pairs ETH/USDT:USDT --timerange 20200101-20241231
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from eightpm_engine import ARCHIVE_DIR, VARIANTS, Indicators, eightpm_extremes, evaluate, load_data, load_reference
+from eightpm_signals import MODES, confirm_window, confirmation_lags, shift_rows
+
+# EightPMHighLowStrategy.confirmation_threshold
+EIGHTPM_THRESHOLD = 0.00025
+
+
+# ---------- 原逐行循环（参照） ----------
+
+def loop_advanced(df, base_long, base_short, strategy):
+    """AdvancedEightPMStrategy.analyze_data 原来的确认循环"""
+    df = df[['Close', 'momentum_3h']].copy()
+    df['price_confirm_long'] = False
+    df['price_confirm_short'] = False
+    for i in range(len(df)):
+        if i < strategy.confirmation_hours:
+            continue
+        if base_long.iloc[i - strategy.confirmation_hours]:
+            entry_price = df['Close'].iloc[i - strategy.confirmation_hours]
+            current_price = df['Close'].iloc[i]
+            momentum_confirm = df['momentum_3h'].iloc[i] > strategy.momentum_threshold
+            price_confirm = current_price > entry_price * 1.002
+            if momentum_confirm and price_confirm:
+                df.iloc[i, df.columns.get_loc('price_confirm_long')] = True
+        if base_short.iloc[i - strategy.confirmation_hours]:
+            entry_price = df['Close'].iloc[i - strategy.confirmation_hours]
+            current_price = df['Close'].iloc[i]
+            momentum_confirm = df['momentum_3h'].iloc[i] < -strategy.momentum_threshold
+            price_confirm = current_price < entry_price * 0.998
+            if momentum_confirm and price_confirm:
+                df.iloc[i, df.columns.get_loc('price_confirm_short')] = True
+    return df['price_confirm_long'].to_numpy(), df['price_confirm_short'].to_numpy()
+
+
+def loop_eightpm(dataframe, threshold):
+    """EightPMHighLowStrategy.populate_indicators 原来的确认循环"""
+    dataframe = dataframe.copy()
+    dataframe['confirmed_long'] = False
+    dataframe['confirmed_short'] = False
+    for i in range(1, len(dataframe)):
+        if dataframe['base_long'].iloc[i-1]:
+            if dataframe['price_change_1h'].iloc[i] > threshold:
+                dataframe.iloc[i, dataframe.columns.get_loc('confirmed_long')] = True
+        if dataframe['base_short'].iloc[i-1]:
+            if dataframe['price_change_1h'].iloc[i] < -threshold:
+                dataframe.iloc[i, dataframe.columns.get_loc('confirmed_short')] = True
+    return dataframe['confirmed_long'].to_numpy(), dataframe['confirmed_short'].to_numpy()
+
+
+def loop_window(base, row_passed, lags, mode):
+    """逐个8点信号检查确认窗口: row_passed(8点行, 确认行) -> bool"""
+    lags = sorted(lags)
+    n = len(base)
+    confirmed = np.zeros(n, dtype=bool)
+    for i in range(n):
+        if not base[i]:
+            continue
+        if mode == 'any':
+            for lag in lags:
+                if i + lag < n and row_passed(i, i + lag):
+                    confirmed[i + lag] = True
+                    break
+        elif i + lags[-1] < n and all(row_passed(i, i + lag) for lag in lags):
+            confirmed[i + lags[-1]] = True
+    return confirmed
+
+
+# ---------- 对比 ----------
+
+def timed(func, repeat=1):
+    """返回 (结果, 最短耗时秒)"""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def advanced_passed(close, momentum, threshold, sign):
+    """AdvancedEightPMStrategy 的确认条件 passed(lag)，与 analyze_data 中的写法一致"""
+    if sign > 0:
+        return lambda lag: (momentum > threshold) & (close > shift_rows(close, lag) * 1.002)
+    return lambda lag: (momentum < -threshold) & (close < shift_rows(close, lag) * 0.998)
+
+
+def advanced_row_passed(close, momentum, threshold, sign):
+    if sign > 0:
+        return lambda base_row, row: momentum[row] > threshold and close[row] > close[base_row] * 1.002
+    return lambda base_row, row: momentum[row] < -threshold and close[row] < close[base_row] * 0.998
+
+
+def report_line(label, base, vector, reference, loop_s, vector_s):
+    same = all(np.array_equal(v, r) for v, r in zip(vector, reference))
+    confirmed = sum(int(np.count_nonzero(v)) for v in vector)
+    print(f"{label:<28}{base:>7}{confirmed:>7}{loop_s:>10.3f}{vector_s * 1000:>10.2f}"
+          f"{loop_s / max(vector_s, 1e-9):>9.0f}x  {'✅ 一致' if same else '❌ 不一致'}")
+    return same
+
+
+def compare_pair(data, args):
+    ok = True
+    strategy = load_reference(ARCHIVE_DIR / 'advanced_eightpm_strategy.py', 'AdvancedEightPMStrategy')()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = strategy.analyze_data(data)
+    base_long = df['is_daily_low_at_8pm'] & df['volume_surge'] & df['high_volatility']
+    base_short = df['is_daily_high_at_8pm'] & df['volume_surge'] & df['high_volatility']
+    close = df['Close'].to_numpy()
+    momentum = df['momentum_3h'].to_numpy()
+    threshold = strategy.momentum_threshold
+    passed = [advanced_passed(close, momentum, threshold, sign) for sign in (1, -1)]
+    bases = [base_long.to_numpy(), base_short.to_numpy()]
+    n_base = int(base_long.sum() + base_short.sum())
+
+    # 1. 归档进阶版: analyze_data 的向量化结果 vs 原循环
+    lags = confirmation_lags(strategy.confirmation_hours)
+    reference, loop_s = timed(lambda: loop_advanced(df, base_long, base_short, strategy))
+    _, vector_s = timed(lambda: [confirm_window(b, p, lags) for b, p in zip(bases, passed)], args.repeat)
+    vector = (df['price_confirm_long'].to_numpy(), df['price_confirm_short'].to_numpy())
+    ok &= report_line('AdvancedEightPM (lag 2)', n_base, vector, reference, loop_s, vector_s)
+
+    # 2. freqtrade策略: 下一根K线的1小时涨跌幅
+    ind = Indicators(data)
+    variant = VARIANTS['v2.8']
+    low, high = eightpm_extremes(ind, variant.tolerance)
+    frame = pd.DataFrame({
+        'base_long': low & evaluate(ind, variant.long_filters),
+        'base_short': high & evaluate(ind, variant.short_filters),
+        'price_change_1h': ind['momentum_1'],
+    }, index=data.index)
+    change = frame['price_change_1h'].to_numpy()
+    reference, loop_s = timed(lambda: loop_eightpm(frame, EIGHTPM_THRESHOLD))
+    vector, vector_s = timed(lambda: (
+        confirm_window(frame['base_long'].to_numpy(), change > EIGHTPM_THRESHOLD, confirmation_lags(1)),
+        confirm_window(frame['base_short'].to_numpy(), change < -EIGHTPM_THRESHOLD, confirmation_lags(1)),
+    ), args.repeat)
+    n_eightpm = int(frame['base_long'].sum() + frame['base_short'].sum())
+    ok &= report_line('EightPMHighLow (lag 1)', n_eightpm, vector, reference, loop_s, vector_s)
+
+    # 3. 多根K线的确认窗口
+    row_passed = [advanced_row_passed(close, momentum, threshold, sign) for sign in (1, -1)]
+    for candles in args.candles:
+        lags = confirmation_lags(strategy.confirmation_hours, candles)
+        for mode in MODES:
+            reference, loop_s = timed(lambda: [loop_window(b, r, lags, mode) for b, r in zip(bases, row_passed)])
+            vector, vector_s = timed(
+                lambda: [confirm_window(b, p, lags, mode) for b, p in zip(bases, passed)], args.repeat)
+            label = f"窗口 lag {lags[0]}-{lags[-1]} {mode}"
+            ok &= report_line(label, n_base, vector, reference, loop_s, vector_s)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='8点多小时确认: 向量化与逐行循环对比')
+    parser.add_argument('--pairs', nargs='+', default=['ETH/USDT'], help='交易对')
+    parser.add_argument('--fixture', type=int, default=1825, metavar='DAYS',
+                        help='模拟K线天数（未指定 --config 时使用），默认5年')
+    parser.add_argument('--config', help='使用本地K线数据时的freqtrade配置文件')
+    parser.add_argument('--timerange', help='时间范围，如 20240101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--candles', nargs='+', type=int, default=[1, 2, 3, 4],
+                        help='对比的确认窗口K线数')
+    parser.add_argument('--repeat', type=int, default=3, help='向量化重复次数，取最短耗时')
+    args = parser.parse_args()
+
+    ok = True
+    for pair in args.pairs:
+        data = load_data(args, pair)
+        if data is None:
+            print(f"⚠️  {pair} 无 1h 数据，跳过")
+            continue
+        source = '本地数据' if args.config else f'模拟K线 {args.fixture} 天'
+        print(f"\n📊 {pair}  {len(data):,} 行 ({source})")
+        print(f"{'场景':<28}{'8点信号':>7}{'确认':>7}{'循环s':>10}{'向量化ms':>10}{'加速':>10}  核对")
+        ok &= compare_pair(data, args)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
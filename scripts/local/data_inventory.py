@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+K线数据清单
+扫描 user_data/data 下的K线文件，按 交易所/交易对/时间框架 记录首末时间、K线数量和缺口，
+保存为索引文件；之后的扫描只重新读取大小或修改时间变化的文件。
+用索引即时回答"这些交易对的最长公共时间范围"，不再靠反复试跑回测探测数据可用性。
+
+使用示例:
+    # 增量扫描并查看清单
+    python scripts/local/data_inventory.py scan
+    python scripts/local/data_inventory.py show --config config/eightpm_backtest.json
+
+    # 配置白名单的最长公共时间范围（预留策略启动K线），--quiet 只输出时间范围
+    python scripts/local/data_inventory.py common --config config/eightpm_backtest.json \\
+        --timeframe 1h --startup-candles 50 --quiet
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from freqtrade_data import (
+    DATA_DIR, candle_type_of, config_pairs, load_config, pair_to_filename,
+    read_candle_rows, timeframe_to_ms,
+)
+
+
+INDEX_FILE = '.inventory.json'
+INDEX_VERSION = 1
+DAY_MS = 86400 * 1000
+
+# <交易对文件名>-<时间框架>[-<K线类型>].<扩展名>
+CANDLE_FILE_RE = re.compile(
+    r'^(?P<pair>.+?)-(?P<timeframe>\d+[smhdwM])'
+    r'(?:-(?P<candle_type>futures|mark|index|premiumIndex|funding_rate))?'
+    r'(?P<ext>\.json|\.json\.gz)$'
+)
+
+
+def read_json_timestamps(path):
+    rows = read_candle_rows(path)
+    if not rows:
+        return np.empty(0, dtype='int64')
+    return np.asarray(rows, dtype='float64').reshape(-1, 6)[:, 0].astype('int64')
+
+
+# 扩展名 -> 时间戳读取函数
+TIMESTAMP_READERS = {
+    '.json': read_json_timestamps,
+    '.json.gz': read_json_timestamps,
+}
+
+
+def find_gaps(ts, timeframe):
+    """时间戳间隔大于时间框架的位置 -> [[缺失起点ms, 缺失终点ms, 缺失根数], ...]"""
+    if len(ts) < 2:
+        return []
+    tf_ms = timeframe_to_ms(timeframe)
+    diff = np.diff(ts)
+    idx = np.flatnonzero(diff > tf_ms)
+    return [[int(ts[i] + tf_ms), int(ts[i + 1] - tf_ms), int(diff[i] // tf_ms - 1)] for i in idx]
+
+
+def describe_file(path, timeframe, reader):
+    ts = np.unique(reader(path))
+    gaps = find_gaps(ts, timeframe)
+    return {
+        'first': int(ts[0]) if len(ts) else None,
+        'last': int(ts[-1]) if len(ts) else None,
+        'rows': int(len(ts)),
+        'gaps': gaps,
+        'missing_candles': int(sum(g[2] for g in gaps)),
+    }
+
+
+class DataInventory:
+    """K线文件清单，键为相对数据目录的文件路径"""
+
+    def __init__(self, datadir=DATA_DIR):
+        self.datadir = Path(datadir)
+        self.path = self.datadir / INDEX_FILE
+        self.entries = {}
+        if self.path.exists():
+            try:
+                index = json.loads(self.path.read_text(encoding='utf-8'))
+                if index.get('version') == INDEX_VERSION:
+                    self.entries = index.get('entries', {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def save(self):
+        self.datadir.mkdir(parents=True, exist_ok=True)
+        content = json.dumps({'version': INDEX_VERSION, 'updated': time.time(),
+                              'entries': self.entries}, ensure_ascii=False)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(content, encoding='utf-8')
+        tmp.replace(self.path)
+
+    def _candle_files(self):
+        for path in sorted(self.datadir.rglob('*')):
+            if not path.is_file() or path.name.startswith('.'):
+                continue
+            match = CANDLE_FILE_RE.match(path.name)
+            if match and match['ext'] in TIMESTAMP_READERS:
+                yield path, match
+
+    def scan(self):
+        """增量扫描，返回 (重新读取的文件数, 删除的条目数)"""
+        seen, updated = set(), 0
+        for path, match in self._candle_files():
+            rel = path.relative_to(self.datadir).as_posix()
+            seen.add(rel)
+            stat = path.stat()
+            entry = self.entries.get(rel)
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                continue
+
+            entry = {
+                'exchange': rel.split('/')[0],
+                'pair_file': match['pair'],
+                'timeframe': match['timeframe'],
+                'candle_type': match['candle_type'] or 'spot',
+                'format': match['ext'].lstrip('.'),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+            }
+            entry.update(describe_file(path, match['timeframe'], TIMESTAMP_READERS[match['ext']]))
+            self.entries[rel] = entry
+            updated += 1
+
+        removed = [rel for rel in self.entries if rel not in seen]
+        for rel in removed:
+            del self.entries[rel]
+        if updated or removed:
+            self.save()
+        return updated, len(removed)
+
+    def series(self, exchange=None, pairs=None, timeframe=None, candle_type=None):
+        """按条件筛选，返回 [(相对路径, 条目)]"""
+        wanted = {pair_to_filename(p): p for p in pairs} if pairs else None
+        rows = []
+        for rel, entry in sorted(self.entries.items()):
+            if exchange and entry['exchange'] != exchange:
+                continue
+            if wanted is not None and entry['pair_file'] not in wanted:
+                continue
+            if timeframe and entry['timeframe'] != timeframe:
+                continue
+            if candle_type and entry['candle_type'] != candle_type:
+                continue
+            rows.append((rel, entry))
+        return rows
+
+    def common_range(self, exchange, pairs, timeframe, candle_type='spot', startup_candles=0):
+        """
+        交易对的最长公共时间范围
+        返回 {'start_ms', 'end_ms', 'timerange', 'missing', 'gaps'}，
+        timerange 按整天对齐：起点为预留启动K线后的下一个整天，终点为最后完整K线之后的整天
+        """
+        found = {}
+        for _, entry in self.series(exchange, pairs, timeframe, candle_type):
+            if entry['rows']:
+                found[entry['pair_file']] = entry
+        missing = [p for p in pairs if pair_to_filename(p) not in found]
+        if missing or not found:
+            return {'start_ms': None, 'end_ms': None, 'timerange': None,
+                    'missing': missing, 'gaps': {}}
+
+        tf_ms = timeframe_to_ms(timeframe)
+        first = max(e['first'] for e in found.values()) + startup_candles * tf_ms
+        last = min(e['last'] for e in found.values())
+        start_ms = -(-first // DAY_MS) * DAY_MS
+        end_ms = (last + tf_ms) // DAY_MS * DAY_MS
+        if end_ms <= start_ms:
+            return {'start_ms': None, 'end_ms': None, 'timerange': None,
+                    'missing': [], 'gaps': {}}
+
+        # 公共范围内的缺口（freqtrade不会因此报错，但会影响结果）
+        gaps = {}
+        for pair in pairs:
+            inside = [g for g in found[pair_to_filename(pair)]['gaps']
+                      if g[1] >= start_ms and g[0] < end_ms]
+            if inside:
+                gaps[pair] = inside
+        return {
+            'start_ms': start_ms,
+            'end_ms': end_ms,
+            'timerange': f"{format_day(start_ms)}-{format_day(end_ms)}",
+            'missing': [],
+            'gaps': gaps,
+        }
+
+
+def format_day(ms):
+    return pd.Timestamp(ms, unit='ms', tz='UTC').strftime('%Y%m%d')
+
+
+def format_ts(ms):
+    if ms is None:
+        return '-'
+    return pd.Timestamp(ms, unit='ms', tz='UTC').strftime('%Y-%m-%d %H:%M')
+
+
+def print_series(rows):
+    print(f"{'文件':<52}{'开始':>18}{'结束':>18}{'K线数':>10}{'缺口':>6}{'缺失':>8}")
+    for rel, e in rows:
+        print(f"{rel:<52}{format_ts(e['first']):>18}{format_ts(e['last']):>18}"
+              f"{e['rows']:>10}{len(e['gaps']):>6}{e['missing_candles']:>8}")
+
+
+def _selection(args):
+    """命令行参数 -> (交易所, 交易对, 时间框架, K线类型)"""
+    config = load_config(args.config) if args.config else {}
+    exchange = args.exchange or config.get('exchange', {}).get('name')
+    pairs = args.pairs or (config_pairs(config) if config else None)
+    timeframe = args.timeframe or config.get('timeframe')
+    candle_type = args.candle_type or (candle_type_of(config) if config else None)
+    return exchange, pairs, timeframe, candle_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K线数据清单')
+    parser.add_argument('--datadir', default=str(DATA_DIR), help='数据根目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('scan', help='增量扫描数据目录并更新索引')
+    for name, help_text in (('show', '显示清单'), ('common', '最长公共时间范围')):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('--config', help='freqtrade配置文件，用于默认交易所/交易对/时间框架')
+        p.add_argument('--exchange', help='交易所目录名')
+        p.add_argument('--pairs', nargs='+', help='交易对')
+        p.add_argument('--timeframe', help='时间框架')
+        p.add_argument('--candle-type', help='K线类型: spot / futures / mark ...')
+    common = sub.choices['common']
+    common.add_argument('--startup-candles', type=int, default=0, help='为策略预热预留的K线数')
+    common.add_argument('--min-days', type=int, default=0, help='公共范围少于该天数时返回失败')
+    common.add_argument('--quiet', action='store_true', help='只输出时间范围（供脚本使用）')
+    args = parser.parse_args()
+
+    inventory = DataInventory(args.datadir)
+    # 查询前总是先做增量扫描，未变化时不会读取任何K线文件
+    started = time.perf_counter()
+    updated, removed = inventory.scan()
+    elapsed = time.perf_counter() - started
+
+    if args.command == 'scan':
+        print(f"✅ 扫描完成: {len(inventory.entries)} 个文件, 重新读取 {updated} 个, "
+              f"移除 {removed} 个 ({elapsed:.2f}秒)")
+        print(f"索引文件: {inventory.path}")
+        return
+
+    exchange, pairs, timeframe, candle_type = _selection(args)
+    if args.command == 'show':
+        print_series(inventory.series(exchange, pairs, timeframe, candle_type))
+        return
+
+    if not (exchange and pairs and timeframe):
+        parser.error('common 需要交易所、交易对和时间框架（可通过 --config 提供）')
+    result = inventory.common_range(exchange, pairs, timeframe, candle_type or 'spot',
+                                    args.startup_candles)
+    days = (result['end_ms'] - result['start_ms']) // DAY_MS if result['timerange'] else 0
+
+    if args.quiet:
+        if result['timerange'] and days >= args.min_days:
+            print(result['timerange'])
+            return
+        sys.exit(1)
+
+    if result['missing']:
+        print(f"❌ 缺少数据: {', '.join(result['missing'])}")
+        sys.exit(1)
+    if not result['timerange']:
+        print("❌ 交易对之间没有公共时间范围")
+        sys.exit(1)
+    print(f"📅 最长公共时间范围: {result['timerange']} ({days}天, {timeframe}, {len(pairs)}个交易对)")
+    for pair, gaps in result['gaps'].items():
+        total = sum(g[2] for g in gaps)
+        print(f"⚠️  {pair}: 范围内 {len(gaps)} 处缺口, 共缺 {total} 根K线")
+        for g in gaps[:5]:
+            print(f"     {format_ts(g[0])} ~ {format_ts(g[1])} ({g[2]}根)")
+    if days < args.min_days:
+        print(f"❌ 公共范围少于 {args.min_days} 天")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
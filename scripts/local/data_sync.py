@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+增量K线同步
+基于列式K线存储（ohlcv_store.py），按每个序列已有的首末K线只请求缺失的区间：
+向前补齐到 --days 要求的起点、向后追加到最新收盘K线，并尝试回补序列内部的缺口；
+交易所本身没有数据的缺口会在报告中列出，并和上市前的区间一起记入序列的 meta.json（empty_ranges），
+之后的同步不再重复请求（--retry-empty 忽略该记录重新请求）。新K线原位合并进列式存储，可选同步写回freqtrade的json文件。
+
+数据源:
+    exchange   通过ccxt从配置中的交易所获取（freqtrade已依赖ccxt）
+    fixture    读取一个freqtrade格式的json数据目录作为"交易所"，用于离线验证
+
+使用示例:
+    # 同步eightpm配置的7个交易对近730天1h数据，并写回json供freqtrade回测
+    python scripts/local/data_sync.py --config config/eightpm_backtest.json --days 730 --write-json
+
+    # 离线：以另一份数据目录作为数据源
+    python scripts/local/data_sync.py --source fixture --fixture-dir /path/to/okx --days 730
+
+    # 离线自检：构造带缺口的本地数据，同步后与数据源逐根比对
+    python scripts/local/data_sync.py --self-check
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from data_inventory import find_gaps, format_ts
+from freqtrade_data import (
+    candle_file, candle_file_candidates, candle_type_of, config_pairs, exchange_data_dir,
+    load_config, read_candle_rows, timeframe_to_ms,
+)
+from ohlcv_store import (
+    VALUE_COLUMNS, ColumnarSeries, export_json, is_fresh, migrate_file, rows_to_columns, series_dir,
+    source_info,
+)
+
+
+DAY_MS = 86400 * 1000
+
+
+class FixtureSource:
+    """以freqtrade格式的json数据目录充当交易所，接口与ccxt的fetch_ohlcv一致"""
+
+    name = 'fixture'
+
+    def __init__(self, datadir, candle_type='spot', limit=300):
+        self.datadir = Path(datadir)
+        self.candle_type = candle_type
+        self.limit = limit
+        self.requests = 0
+        self._cache = {}
+
+    def _series(self, pair, timeframe):
+        key = (pair, timeframe)
+        if key not in self._cache:
+            path = candle_file(self.datadir, pair, timeframe, self.candle_type)
+            rows = read_candle_rows(path) if path else []
+            self._cache[key] = np.asarray(rows, dtype='float64').reshape(-1, 6)
+        return self._cache[key]
+
+    def fetch_ohlcv(self, pair, timeframe, since, limit=None):
+        self.requests += 1
+        arr = self._series(pair, timeframe)
+        start = np.searchsorted(arr[:, 0], since, 'left')
+        return arr[start:start + (limit or self.limit)].tolist()
+
+
+class ExchangeSource:
+    """通过ccxt获取K线，合约市场使用swap类型"""
+
+    def __init__(self, config, limit=None):
+        import ccxt
+
+        exchange = config['exchange']
+        params = dict(exchange.get('ccxt_config', {}))
+        params.pop('sandbox', None)
+        if config.get('trading_mode') == 'futures':
+            params.setdefault('options', {})['defaultType'] = 'swap'
+        self.name = exchange['name']
+        self.client = getattr(ccxt, self.name)(params)
+        # OKX单次最多返回300根（历史接口100根），其他交易所一般为500以上
+        self.limit = limit or (100 if self.name == 'okx' else 500)
+        self.requests = 0
+
+    def fetch_ohlcv(self, pair, timeframe, since, limit=None):
+        self.requests += 1
+        return self.client.fetch_ohlcv(pair, timeframe, since=int(since), limit=limit or self.limit)
+
+
+def fetch_range(source, pair, timeframe, start_ms, end_ms):
+    """分页获取 [start_ms, end_ms) 内的K线，数据源返回空时结束"""
+    tf_ms = timeframe_to_ms(timeframe)
+    rows = []
+    since = start_ms
+    while since < end_ms:
+        batch = [r for r in source.fetch_ohlcv(pair, timeframe, since) if start_ms <= r[0] < end_ms]
+        if not batch:
+            break
+        rows.extend(batch)
+        next_since = int(batch[-1][0]) + tf_ms
+        if next_since <= since:
+            break
+        since = next_since
+    return rows
+
+
+def uncovered(start_ms, end_ms, known):
+    """[start_ms, end_ms) 中不在已知无数据区间 known 内的部分"""
+    parts = []
+    for known_start, known_end in known:
+        if known_end <= start_ms or known_start >= end_ms:
+            continue
+        if known_start > start_ms:
+            parts.append((start_ms, known_start))
+        start_ms = max(start_ms, known_end)
+    if start_ms < end_ms:
+        parts.append((start_ms, end_ms))
+    return parts
+
+
+def sync_series(source, datadir, pair, timeframe, candle_type='spot', days=None,
+                now_ms=None, write_json=False, retry_empty=False):
+    """
+    同步单个序列，返回报告字典
+    只保留已收盘的K线：开盘时间 + 时间框架 <= now
+    前补和缺口回补跳过 meta 中记录的无数据区间（retry_empty=True 时重新请求）
+    """
+    tf_ms = timeframe_to_ms(timeframe)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    end_ms = (now_ms // tf_ms) * tf_ms
+    series = ColumnarSeries(series_dir(datadir, pair, timeframe, candle_type))
+    json_path = candle_file(datadir, pair, timeframe, candle_type)
+    if json_path is not None and not is_fresh(series, json_path):
+        migrate_file(datadir, pair, timeframe, candle_type, force=True)
+        series = ColumnarSeries(series.path)
+
+    before = series.rows
+    target_start = end_ms - days * DAY_MS if days else None
+    requests_before = source.requests
+    fetched = {'head': 0, 'tail': 0, 'gaps': 0}
+    chunks = []
+
+    skipped = 0
+
+    def fetch_missing(kind, start_ms, end_ms):
+        nonlocal skipped
+        parts = uncovered(start_ms, end_ms, known)
+        skipped += not parts
+        for part_start, part_end in parts:
+            rows = fetch_range(source, pair, timeframe, part_start, part_end)
+            fetched[kind] += len(rows)
+            chunks.append(rows)
+
+    if before:
+        first, last = series.meta['first'], series.meta['last']
+        known = [] if retry_empty else series.meta.get('empty_ranges', [])
+        if target_start is not None and target_start < first:
+            fetch_missing('head', target_start, first)
+        tail = fetch_range(source, pair, timeframe, last + tf_ms, end_ms)
+        fetched['tail'] = len(tail)
+        chunks.append(tail)
+        for gap_start, gap_end, _ in find_gaps(np.asarray(series.arrays()['date']), timeframe):
+            fetch_missing('gaps', gap_start, gap_end + tf_ms)
+    else:
+        start = target_start if target_start is not None else 0
+        rows = fetch_range(source, pair, timeframe, start, end_ms)
+        fetched['tail'] = len(rows)
+        chunks.append(rows)
+
+    rows = [r for chunk in chunks for r in chunk]
+    overwritten = appended = 0
+    rewritten = False
+    if rows:
+        ts, values = rows_to_columns(rows)
+        overwritten, appended, rewritten = series.merge(ts, values)
+
+    remaining = find_gaps(np.asarray(series.arrays()['date']), timeframe) if series.exists() else []
+    if series.exists():
+        # 请求过仍然缺失的区间（上市前、交易所停机）记为无数据，下次不再请求；追加的尾部不记录
+        empty = [[gap_start, gap_end + tf_ms] for gap_start, gap_end, _ in remaining]
+        if target_start is not None and target_start < series.meta['first']:
+            empty.append([target_start, series.meta['first']])
+        if empty:
+            series.mark_empty(empty)
+    if write_json and series.exists() and (rows or json_path is None):
+        json_path = write_candle_json(series, datadir, pair, timeframe, candle_type)
+
+    return {
+        'pair': pair,
+        'timeframe': timeframe,
+        'rows_before': before,
+        'rows_after': series.rows,
+        'fetched': fetched,
+        'appended': appended,
+        'overwritten': overwritten,
+        'rewritten': rewritten,
+        'requests': source.requests - requests_before,
+        'skipped': skipped,
+        'first': series.meta['first'] if series.exists() else None,
+        'last': series.meta['last'] if series.exists() else None,
+        'gaps': remaining,
+    }
+
+
+def write_candle_json(series, datadir, pair, timeframe, candle_type='spot'):
+    """把列式数据写回freqtrade的json文件，并把列式存储标记为由该文件转换而来"""
+    path = candle_file(datadir, pair, timeframe, candle_type) or \
+        candle_file_candidates(datadir, pair, timeframe, candle_type)[0]
+    if path.suffix == '.gz':
+        path = path.with_suffix('')
+    export_json(series, path)
+    gz = path.with_name(path.name + '.gz')
+    if gz.exists():
+        gz.unlink()
+    series.mark_source(source_info(path))
+    return path
+
+
+def print_report(report):
+    fetched = report['fetched']
+    mode = '重写' if report['rewritten'] else '原位合并'
+    print(f"{report['pair']:<18}{report['timeframe']:<5}"
+          f"{report['rows_before']:>9} -> {report['rows_after']:<9}"
+          f"前补{fetched['head']:>6}  追加{fetched['tail']:>6}  回补{fetched['gaps']:>5}  "
+          f"请求{report['requests']:>4}  {mode}")
+    if report['skipped']:
+        print(f"    ⏭️  跳过 {report['skipped']} 段已知无数据的区间")
+    for gap in report['gaps'][:5]:
+        print(f"    ⚠️  缺口 {format_ts(gap[0])} ~ {format_ts(gap[1])} ({gap[2]}根，数据源无数据)")
+    if len(report['gaps']) > 5:
+        print(f"    ⚠️  ... 共 {len(report['gaps'])} 处缺口")
+
+
+def self_check():
+    """离线自检：数据源带一个真实缺口，本地数据缺头、缺尾、内部缺一段"""
+    from benchmark_fixtures import synthetic_ohlcv
+    from freqtrade_data import dates_to_ms
+
+    workdir = Path(tempfile.mkdtemp(prefix='data_sync_'))
+    fixture_dir, local_dir = workdir / 'fixture', workdir / 'local'
+    pairs, timeframe = ['ETH/USDT', 'SOL/USDT'], '1h'
+    ok = True
+    try:
+        for pair in pairs:
+            df = synthetic_ohlcv(timeframe, 90, pair)
+            rows = np.column_stack([dates_to_ms(df['date']),
+                                    df[VALUE_COLUMNS].to_numpy()]).tolist()
+            for row in rows:
+                row[0] = int(row[0])
+            source_rows = rows[:1700] + rows[1712:]        # 数据源自身缺12根（在本地数据之后）
+            local_rows = rows[240:600] + rows[640:1500]     # 本地缺头、缺尾、内部缺40根
+            for directory, data in ((fixture_dir, source_rows), (local_dir, local_rows)):
+                path = candle_file_candidates(directory, pair, timeframe)[0]
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(json.dumps(data), encoding='utf-8')
+
+        source = FixtureSource(fixture_dir, limit=100)
+        now_ms = int(source_rows[-1][0]) + timeframe_to_ms(timeframe)
+        for pair in pairs:
+            # 要求120天，数据源只有90天：上市前的30天和数据源自身的缺口都请求不到
+            report = sync_series(source, local_dir, pair, timeframe, days=120, now_ms=now_ms,
+                                 write_json=True)
+            print_report(report)
+            expected = np.asarray(source._series(pair, timeframe))
+            got = read_candle_rows(candle_file(local_dir, pair, timeframe))
+            same = np.array_equal(np.asarray(got, dtype='float64'), expected)
+            one_gap = len(report['gaps']) == 1 and report['gaps'][0][2] == 12
+            again = sync_series(source, local_dir, pair, timeframe, days=120, now_ms=now_ms)
+            idle = again['appended'] == 0 and again['fetched']['head'] == 0 \
+                and again['fetched']['tail'] == 0
+            quiet = again['requests'] == 0 and again['skipped'] == 2
+            retried = sync_series(source, local_dir, pair, timeframe, days=120, now_ms=now_ms,
+                                  retry_empty=True)['requests'] > 0
+            print(f"    {'✅' if same else '❌'} 与数据源逐根一致  "
+                  f"{'✅' if one_gap else '❌'} 只剩数据源自身的缺口  "
+                  f"{'✅' if idle else '❌'} 再次同步无新数据  "
+                  f"{'✅' if quiet and retried else '❌'} 无数据区间不再请求")
+            ok &= same and one_gap and idle and quiet and retried
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("\n✅ 自检通过" if ok else "\n❌ 自检失败")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='增量K线同步')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--timeframes', nargs='+', help='时间框架，默认使用配置中的timeframe')
+    parser.add_argument('--days', type=int, help='保证至少覆盖最近多少天')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--source', choices=['exchange', 'fixture'], default='exchange', help='数据源')
+    parser.add_argument('--fixture-dir', help='fixture数据源目录（freqtrade json格式）')
+    parser.add_argument('--write-json', action='store_true', help='同步后写回freqtrade json文件')
+    parser.add_argument('--retry-empty', action='store_true',
+                        help='重新请求已记录为无数据的区间（上市前、交易所停机的缺口）')
+    parser.add_argument('--self-check', action='store_true', help='离线自检')
+    args = parser.parse_args()
+
+    if args.self_check:
+        sys.exit(0 if self_check() else 1)
+
+    config = load_config(args.config)
+    datadir = exchange_data_dir(config, args.datadir)
+    candle_type = candle_type_of(config)
+    pairs = args.pairs or config_pairs(config)
+    timeframes = args.timeframes or [config.get('timeframe', '1h')]
+
+    if args.source == 'fixture':
+        if not args.fixture_dir:
+            parser.error('--source fixture 需要 --fixture-dir')
+        source = FixtureSource(args.fixture_dir, candle_type)
+    else:
+        source = ExchangeSource(config)
+
+    started = time.perf_counter()
+    gaps = 0
+    for pair in pairs:
+        for timeframe in timeframes:
+            report = sync_series(source, datadir, pair, timeframe, candle_type, args.days,
+                                 write_json=args.write_json, retry_empty=args.retry_empty)
+            print_report(report)
+            gaps += len(report['gaps'])
+    print(f"\n✅ 同步完成: {len(pairs) * len(timeframes)} 个序列, {source.requests} 次请求, "
+          f"{gaps} 处缺口 ({time.perf_counter() - started:.1f}秒)")
+
+
+if __name__ == "__main__":
+    main()
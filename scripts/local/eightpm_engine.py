@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+"""
+8点策略统一引擎
+strategies_archive/ 中的各版本（以及当前的 final_optimized_strategy.py）表达为同一条向量化流程的配置:
+    指标 -> 8点极值 -> 过滤条件 -> 确认 -> 高置信度 -> 信号延迟 -> 持仓模拟（仓位 / 止损 / 止盈规则）
+同一份K线上的指标按名称只计算一次，所有版本共用；持仓模拟只在有信号的行上推进，
+用数组查找每笔交易的出场，不逐行循环。开仓参数（高置信度倍数、波动率折算、波动率止损、止盈）对所有信号行
+整列计算，只有依赖余额的仓位和余额按交易顺序推进。安装numba时持仓状态机和余额推进使用 kernels.py 的
+编译内核，否则为NumPy实现（两者逐笔一致，python scripts/local/kernels.py --check 核对）。
+一次运行得到 版本 x 交易对 的回归矩阵。
+
+--verify 同时运行原脚本的 analyze_data + backtest（逐行循环），逐笔核对交易记录并报告耗时。
+原脚本把首行 shift 产生的NaN信号当作有效信号（v1.0因此报错，v2.0/v3.0开出一笔方向不明的仓位），
+核对时先把NaN信号按0处理。v2.8 是freqtrade策略，只按配置运行（精确回测见 prescreen_backtest.py）。
+
+使用示例:
+    # 5年模拟ETH数据，全部版本
+    python scripts/local/eightpm_engine.py
+
+    # 指定版本，多个交易对，并与原脚本逐笔核对
+    python scripts/local/eightpm_engine.py --variants v3.0 v4.0 --pairs ETH/USDT BTC/USDT --verify
+
+    # 本地K线数据
+    python scripts/local/eightpm_engine.py --config config/eightpm_backtest.json \\
+        --pairs ETH/USDT:USDT --timerange 20230101-20241231
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from batch_indicators import rsi
+from benchmark_fixtures import synthetic_ohlcv, to_local_format
+from freqtrade_data import PROJECT_ROOT, STRATEGY_DIR, LocalDataProvider, dates_to_ms, load_config
+from kernels import PATH_KERNEL, PATH_REASONS, balance_scan, position_path
+
+if str(STRATEGY_DIR) not in sys.path:
+    sys.path.insert(0, str(STRATEGY_DIR))
+from eightpm_signals import confirm_window, confirmation_lags, shift_rows  # noqa: E402
+
+
+ARCHIVE_DIR = PROJECT_ROOT / 'strategies_archive'
+LOCAL_DIR = PROJECT_ROOT / 'scripts' / 'local'
+
+# 原脚本的平仓原因 -> 引擎的出场类型
+REASONS = {'止损': 'stop_loss', '动态止损': 'stop_loss', '止盈': 'take_profit',
+           '反向信号': 'reverse', '回测结束': 'end'}
+
+OPERATORS = {'>': np.greater, '<': np.less, '>=': np.greater_equal, '<=': np.less_equal, '==': np.equal}
+
+
+# ---------- 指标 ----------
+
+class Indicators:
+    """
+    按名称懒计算并缓存的指标（本地格式K线: 时间索引 + Open/High/Low/Close/Volume）
+    名称为 <类型>_<周期>，如 sma_20、volume_ratio_24、momentum_3；计算方式与原脚本的pandas写法一致
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, name):
+        if name not in self.cache:
+            match = re.fullmatch(r'(.+?)_(\d+)', name)
+            kind, period = (match.group(1), int(match.group(2))) if match else (name, None)
+            function = INDICATORS.get(kind)
+            if function is None:
+                raise KeyError(f"未知的指标: {name}")
+            self.cache[name] = function(self, period) if period is not None else function(self)
+        return self.cache[name]
+
+    def series(self, name):
+        return pd.Series(self[name], index=self.data.index)
+
+
+def _column(name):
+    return lambda ind: ind.data[name].to_numpy()
+
+
+def _daily(kind):
+    def compute(ind):
+        column = 'High' if kind == 'max' else 'Low'
+        return ind.data[column].groupby(ind.data.index.normalize()).transform(kind).to_numpy()
+    return compute
+
+
+def _sma(ind, period):
+    return ind.series('close').rolling(period).mean().to_numpy()
+
+
+def _volume_ratio(ind, period):
+    volume = ind.data['Volume']
+    return (volume / volume.rolling(period).mean()).to_numpy()
+
+
+def _momentum(ind, period):
+    return ind.series('close').pct_change(period).to_numpy()
+
+
+def _volatility(ind, period):
+    close = ind.series('close')
+    return (close.rolling(period).std() / close.rolling(period).mean()).to_numpy()
+
+
+def _rsi(ind, period):
+    """原脚本的RSI：涨跌幅的简单移动平均"""
+    delta = ind.series('close').diff()
+    gain = delta.where(delta > 0, 0).rolling(period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
+    return (100 - (100 / (1 + gain / loss))).to_numpy()
+
+
+def _rsi_wilder(ind, period):
+    """TA-Lib RSI（freqtrade版本使用）"""
+    return rsi(ind['close'].astype('float64')[:, None], period)[:, 0]
+
+
+def _sma_distance(ind, period):
+    sma = ind[f'sma_{period}']
+    return np.abs(ind['close'] - sma) / sma
+
+
+def _price_position(ind):
+    return (ind['close'] - ind['daily_low']) / (ind['daily_high'] - ind['daily_low'])
+
+
+def _high_volatility(ind, period):
+    """v4.0: 波动率高于其48期均值"""
+    volatility = ind.series(f'volatility_{period}')
+    return (volatility > volatility.rolling(48).mean()).to_numpy()
+
+
+def _reversal_market(ind, period):
+    """v4.0: 震荡市（24期均线12小时内变化不超过2%），或波动率高于72期均值的趋势市"""
+    sma = ind.series('sma_24')
+    slope = (sma - sma.shift(12)) / sma.shift(12)
+    trending = (slope.abs() > 0.02).to_numpy()
+    volatility = ind.series(f'volatility_{period}')
+    above = (volatility > volatility.rolling(72).mean()).to_numpy()
+    return ~trending | (trending & above)
+
+
+INDICATORS = {
+    'close': _column('Close'),
+    'high': _column('High'),
+    'low': _column('Low'),
+    'volume': _column('Volume'),
+    'hour': lambda ind: np.asarray(ind.data.index.hour),
+    'daily_high': _daily('max'),
+    'daily_low': _daily('min'),
+    'sma': _sma,
+    'volume_ratio': _volume_ratio,
+    'momentum': _momentum,
+    'volatility': _volatility,
+    'rsi': _rsi,
+    'rsi_wilder': _rsi_wilder,
+    'sma_distance': _sma_distance,
+    'price_position': _price_position,
+    'high_volatility': _high_volatility,
+    'reversal_market': _reversal_market,
+}
+
+
+def evaluate(ind, conditions):
+    """条件列表 [(指标名, 运算符, 值)] 的与；NaN参与比较时为False"""
+    mask = np.ones(len(ind), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        for name, op, value in conditions:
+            mask &= OPERATORS[op](ind[name], value)
+    return mask
+
+
+# ---------- 版本配置 ----------
+
+@dataclass(frozen=True)
+class Sizing:
+    """仓位规则: min(基础仓位, 余额 * 比例) * 高置信度倍数 * 波动率折算，最后不超过 余额 * max_ratio"""
+    base: float = 100.0
+    balance_ratio: float = None
+    confidence_stake: float = 1.0          # 高置信度时基础仓位的倍数（先于余额限制，v3.0）
+    confidence_balance_ratio: float = None  # 高置信度时的余额比例，默认同 balance_ratio
+    confidence_multiplier: float = 1.0     # 高置信度时余额限制后的倍数（v4.0）
+    volatility_scale: float = 0.0          # 波动率折算 max(floor, 1 - 波动率 * scale)，0为不折算
+    volatility_floor: float = 0.5
+    max_ratio: float = None
+
+    def terms(self, high_confidence, volatility):
+        """
+        仓位中与余额无关的部分，对所有信号行一次计算: (基础仓位, 余额比例, 倍数, 波动率折算, 最大比例)
+        比例为NaN表示不限制；min/max 按Python内置函数的取值方式（NaN波动率时取下限）
+        """
+        stake = np.where(high_confidence, self.base * self.confidence_stake, self.base)
+        ratio = np.nan if self.balance_ratio is None else self.balance_ratio
+        strong_ratio = self.confidence_balance_ratio or ratio
+        ratio = np.where(high_confidence, strong_ratio, ratio)
+        multiplier = np.where(high_confidence, self.confidence_multiplier, 1.0)
+        factor = np.ones(len(stake))
+        if self.volatility_scale:
+            raw = 1 - volatility * self.volatility_scale
+            with np.errstate(invalid='ignore'):
+                factor = np.where(raw > self.volatility_floor, raw, self.volatility_floor)
+        max_ratio = np.full(len(stake), np.nan if self.max_ratio is None else self.max_ratio)
+        return stake, ratio, multiplier, factor, max_ratio
+
+
+@dataclass(frozen=True)
+class Variant:
+    """
+    一个版本的完整配置
+    8点K线: is_8pm 且 最高(低)价在当日极值的 tolerance 以内，并满足 long/short_filters
+    确认: confirm_lag 行之后的 confirm_candles 根K线内满足 long/short_confirm（收盘价相对8点K线至少变动
+          confirm_move），confirm_mode 为 any 时任一根满足即确认，all 时全部满足后在最后一根确认
+    入场行: 确认行（confirm_lag=0 时为8点K线），再延迟 signal_delay 行按收盘价成交
+    """
+    name: str
+    title: str
+    tolerance: float
+    long_filters: tuple = ()
+    short_filters: tuple = ()
+    confirm_lag: int = 0
+    confirm_candles: int = 1
+    confirm_mode: str = 'any'
+    confirm_move: float = None
+    long_confirm: tuple = ()
+    short_confirm: tuple = ()
+    long_high_confidence: tuple = None     # None: 没有高置信度信号
+    short_high_confidence: tuple = None
+    signal_delay: int = 0
+    sizing: Sizing = field(default_factory=Sizing)
+    volatility_window: int = 0             # 仓位/止损使用的波动率窗口，0为不使用
+    stop_loss: float = 0.01
+    stop_volatility: tuple = None          # (倍数, 上限): 止损 = stop_loss + min(波动率*倍数, 上限)
+    take_profit: float = None
+    take_profit_ratio: float = None        # 止盈 = 止损 * 比例
+    roi: tuple = None                      # ((持仓分钟, 止盈), ...)，按持仓时长取止盈
+    leverage: float = 100.0
+    pnl_divisor: float = 100.0             # 盈亏金额 = 仓位 * 杠杆收益 / pnl_divisor
+    pnl_cap: tuple = None                  # 杠杆收益的 (下限, 上限)
+    initial_balance: float = 10000.0
+    reference: tuple = None                # 原脚本 (路径, 类名)，--verify 使用
+
+
+VARIANTS = {v.name: v for v in [
+    Variant(
+        'v1.0', '基础版本', tolerance=0.001, signal_delay=1, pnl_divisor=1.0,
+        reference=(ARCHIVE_DIR / 'eightpm_strategy.py', 'EightPMStrategy'),
+    ),
+    Variant(
+        'v2.0', '简化版本', tolerance=0.002, signal_delay=1, pnl_cap=(-100, 500),
+        reference=(ARCHIVE_DIR / 'simple_eightpm_strategy.py', 'EightPMStrategy'),
+    ),
+    Variant(
+        'v3.0', '增加过滤', tolerance=0.002, signal_delay=1,
+        long_filters=(('volume_ratio_24', '>', 1.2), ('momentum_1', '>', 0), ('price_position', '<', 0.3)),
+        short_filters=(('volume_ratio_24', '>', 1.2), ('momentum_1', '<', 0), ('price_position', '>', 0.7)),
+        long_high_confidence=(('momentum_3', '>', 0.001), ('volume_ratio_24', '>', 1.2 * 1.2)),
+        short_high_confidence=(('momentum_3', '<', -0.001), ('volume_ratio_24', '>', 1.2 * 1.2)),
+        sizing=Sizing(balance_ratio=0.1, confidence_stake=1.5, confidence_balance_ratio=0.2),
+        volatility_window=12, stop_volatility=(2, 0.005), pnl_cap=(-100, 500),
+        reference=(ARCHIVE_DIR / 'optimized_eightpm_strategy.py', 'OptimizedEightPMStrategy'),
+    ),
+    Variant(
+        'v4.0', '价格确认+动态止盈', tolerance=0.003,
+        long_filters=(('volume_ratio_24', '>', 1.3), ('high_volatility_24', '==', True)),
+        short_filters=(('volume_ratio_24', '>', 1.3), ('high_volatility_24', '==', True)),
+        confirm_lag=2, confirm_move=0.002,
+        long_confirm=(('momentum_3', '>', 0.0015), ('reversal_market_24', '==', True),
+                      ('rsi_14', '<', 40), ('price_position', '<', 0.3)),
+        short_confirm=(('momentum_3', '<', -0.0015), ('reversal_market_24', '==', True),
+                       ('rsi_14', '>', 60), ('price_position', '>', 0.7)),
+        long_high_confidence=(('momentum_6', '>', 0.0015 * 2), ('volume_ratio_24', '>', 1.3 * 1.5),
+                              ('rsi_14', '<', 30)),
+        short_high_confidence=(('momentum_6', '<', -0.0015 * 2), ('volume_ratio_24', '>', 1.3 * 1.5),
+                               ('rsi_14', '>', 70)),
+        sizing=Sizing(balance_ratio=0.1, confidence_multiplier=1.8, volatility_scale=10, max_ratio=0.15),
+        volatility_window=24, stop_volatility=(3, 0.01), take_profit_ratio=2.0, pnl_cap=(-100, 500),
+        reference=(ARCHIVE_DIR / 'advanced_eightpm_strategy.py', 'AdvancedEightPMStrategy'),
+    ),
+    Variant(
+        'v5.0', '最终优化（当前本地版本）', tolerance=0.008,
+        long_filters=(('volume_ratio_20', '>', 1.05), ('rsi_14', '<', 40)),
+        short_filters=(('volume_ratio_20', '>', 1.05), ('rsi_14', '>', 60)),
+        confirm_lag=1,
+        long_confirm=(('momentum_1', '>', 0.0005), ('sma_distance_20', '<', 0.08)),
+        short_confirm=(('momentum_1', '<', -0.0005), ('sma_distance_20', '<', 0.08)),
+        stop_loss=0.015, take_profit=0.04, pnl_cap=(-100, 300),
+        reference=(LOCAL_DIR / 'final_optimized_strategy.py', 'FinalOptimizedStrategy'),
+    ),
+    Variant(
+        # freqtrade版本：RSI阈值取ETH的设置，出场只保留止损和ROI（按收盘价近似）
+        'v2.8', 'freqtrade版本（收盘价近似）', tolerance=0.0098,
+        long_filters=(('volume_ratio_20', '>', 1.028), ('rsi_wilder_14', '<', 45)),
+        short_filters=(('volume_ratio_20', '>', 1.028), ('rsi_wilder_14', '>', 55)),
+        confirm_lag=1,
+        long_confirm=(('momentum_1', '>', 0.00026), ('sma_distance_20', '<', 0.11), ('volume', '>', 0)),
+        short_confirm=(('momentum_1', '<', -0.00026), ('sma_distance_20', '<', 0.11), ('volume', '>', 0)),
+        stop_loss=0.0175, roi=((0, 0.06), (10, 0.048), (20, 0.038), (40, 0.03), (80, 0.024), (160, 0.02)),
+    ),
+]}
+
+
+# ---------- 信号 ----------
+
+def eightpm_extremes(ind, tolerance):
+    """(8点为当日低点, 8点为当日高点)"""
+    is_8pm = ind['hour'] == 20
+    low = is_8pm & (ind['low'] <= ind['daily_low'] * (1 + tolerance))
+    high = is_8pm & (ind['high'] >= ind['daily_high'] * (1 - tolerance))
+    return low, high
+
+
+def _direction_entries(ind, variant, extreme, filters, confirm, high_confidence, sign):
+    base = extreme & evaluate(ind, filters)
+    if not variant.confirm_lag:
+        entries = base & evaluate(ind, confirm)
+    else:
+        passed = evaluate(ind, confirm)
+        close = ind['close']
+
+        def confirmed(lag):
+            if variant.confirm_move is None:
+                return passed
+            reference = shift_rows(close, lag)
+            if sign > 0:
+                return passed & (close > reference * (1 + variant.confirm_move))
+            return passed & (close < reference * (1 - variant.confirm_move))
+
+        lags = confirmation_lags(variant.confirm_lag, variant.confirm_candles)
+        entries = confirm_window(base, confirmed, lags, variant.confirm_mode)
+    strong = entries & evaluate(ind, high_confidence) if high_confidence is not None else np.zeros_like(entries)
+    return entries, strong
+
+
+def build_signal(ind, variant):
+    """
+    信号数组: 1/-1 普通做多/做空，2/-2 高置信度，0 无信号（已按 signal_delay 延迟）
+    同一行同时满足时做多优先（只在无其他过滤的v1.0/v2.0中可能出现，与原脚本一致）
+    """
+    low, high = eightpm_extremes(ind, variant.tolerance)
+    longs, strong_longs = _direction_entries(
+        ind, variant, low, variant.long_filters, variant.long_confirm, variant.long_high_confidence, 1)
+    shorts, strong_shorts = _direction_entries(
+        ind, variant, high, variant.short_filters, variant.short_confirm, variant.short_high_confidence, -1)
+    signal = np.select([strong_shorts, strong_longs, longs, shorts], [-2, 2, 1, -1], 0).astype('int8')
+    if variant.signal_delay:
+        delayed = np.zeros_like(signal)
+        delayed[variant.signal_delay:] = signal[:-variant.signal_delay]
+        signal = delayed
+    return signal
+
+
+# ---------- 持仓模拟 ----------
+
+LEDGER_COLUMNS = ['entry_time', 'exit_time', 'direction', 'high_confidence', 'entry_price', 'exit_price',
+                  'position_size', 'pnl_pct', 'leveraged_pnl_pct', 'pnl_amount', 'balance', 'reason']
+
+
+def _first_hit(close, entry_row, direction, end_row, stop, take_profit, roi_of):
+    """
+    (entry_row, end_row] 内首次触发止损/止盈的行，分块向量化查找；没有时返回 (None, None)
+    同一行先判断止损，与原脚本一致
+    """
+    entry = close[entry_row]
+    start, chunk = entry_row + 1, 64
+    while start <= end_row:
+        stop_row = min(end_row + 1, start + chunk)
+        prices = close[start:stop_row]
+        pnl = (prices - entry) / entry if direction > 0 else (entry - prices) / entry
+        with np.errstate(invalid='ignore'):
+            stop_hit = pnl <= -stop
+            if roi_of is not None:
+                take_hit = pnl >= roi_of(entry_row, start, stop_row)
+            elif take_profit is not None:
+                take_hit = pnl >= take_profit
+            else:
+                take_hit = np.zeros(len(pnl), dtype=bool)
+        events = stop_hit | take_hit
+        if events.any():
+            k = int(np.argmax(events))
+            return start + k, 'stop_loss' if stop_hit[k] else 'take_profit'
+        start, chunk = stop_row, chunk * 4
+    return None, None
+
+
+def _roi_lookup(variant, ind):
+    """按持仓分钟取ROI止盈的函数，没有ROI时None"""
+    if not variant.roi:
+        return None
+    minutes = dates_to_ms(ind.data.index) / 60000.0
+    roi_minutes = np.array([m for m, _ in variant.roi], dtype='float64')
+    roi_values = np.array([v for _, v in variant.roi], dtype='float64')
+
+    def roi_of(entry_row, start, stop_row):
+        elapsed = minutes[start:stop_row] - minutes[entry_row]
+        idx = np.searchsorted(roi_minutes, elapsed, side='right') - 1
+        return np.where(idx >= 0, roi_values[np.clip(idx, 0, None)], np.inf)
+    return roi_of
+
+
+def trade_parameters(variant, ind, rows, signal):
+    """
+    信号行上的开仓参数，整列向量化计算（与余额无关）:
+    方向、高置信度、止损（含波动率部分）、止盈（固定或止损的倍数，NaN为没有）、仓位的各项系数
+    """
+    direction = np.where(signal[rows] > 0, 1, -1)
+    strong = np.abs(signal[rows]) == 2
+    volatility = ind[f'volatility_{variant.volatility_window}'][rows] if variant.volatility_window \
+        else np.full(len(rows), np.nan)
+    stop = np.full(len(rows), variant.stop_loss)
+    if variant.stop_volatility:
+        multiple, cap = variant.stop_volatility
+        extra = volatility * multiple
+        with np.errstate(invalid='ignore'):
+            stop = stop + np.where(cap < extra, cap, extra)
+    if variant.take_profit_ratio is not None:
+        take_profit = stop * variant.take_profit_ratio
+    else:
+        take_profit = np.full(len(rows), np.nan if variant.take_profit is None else variant.take_profit)
+    return {'direction': direction, 'strong': strong, 'stop': stop, 'take_profit': take_profit,
+            'sizing': variant.sizing.terms(strong, volatility)}
+
+
+def trade_path(variant, ind, signal, params):
+    """
+    单一持仓的状态机（止损/止盈 -> 反向信号平仓并反手 -> 无持仓时开仓 -> 数据末尾平仓），
+    只在开仓行推进: 每笔交易用 _first_hit 找止损/止盈，用信号行索引找反向信号，取先发生者。
+    出场只取决于开仓行，与余额无关
+    返回 (开仓参数下标, 开仓行, 出场行, 出场类型) 数组
+    """
+    close = ind['close']
+    n = len(close)
+    roi_of = _roi_lookup(variant, ind)
+    active = np.flatnonzero(signal)
+    longs, shorts = np.flatnonzero(signal > 0), np.flatnonzero(signal < 0)
+
+    picks, exits, reasons = [], [], []
+    k = 0 if len(active) else None
+    while k is not None:
+        row = int(active[k])
+        direction = int(params['direction'][k])
+        take_profit = params['take_profit'][k]
+        take_profit = None if np.isnan(take_profit) else float(take_profit)
+        opposite = shorts if direction > 0 else longs
+        j = int(np.searchsorted(opposite, row, side='right'))
+        reverse_row = int(opposite[j]) if j < len(opposite) else None
+        end_row = reverse_row if reverse_row is not None else n - 1
+        exit_row, reason = _first_hit(close, row, direction, end_row, params['stop'][k], take_profit, roi_of)
+        if exit_row is not None:
+            # 止损/止盈后同一行有信号时立即开新仓
+            next_k = int(np.searchsorted(active, exit_row, side='left'))
+        elif reverse_row is not None:
+            exit_row, reason = reverse_row, 'reverse'
+            next_k = int(np.searchsorted(active, reverse_row, side='left'))
+        else:
+            exit_row, reason, next_k = n - 1, 'end', len(active)
+        picks.append(k)
+        exits.append(exit_row)
+        reasons.append(reason)
+        k = next_k if next_k < len(active) else None
+    picks = np.array(picks, dtype='int64')
+    return picks, active[picks], np.array(exits, dtype='int64'), np.array(reasons, dtype=object)
+
+
+def kernel_path(variant, ind, signal, params, path=position_path):
+    """trade_path 的内核版本（kernels.position_path 逐行扫描），返回值相同"""
+    active = np.flatnonzero(signal)
+    if variant.roi:
+        minutes = dates_to_ms(ind.data.index) / 60000.0
+        roi_minutes = np.array([m for m, _ in variant.roi], dtype='float64')
+        roi_values = np.array([v for _, v in variant.roi], dtype='float64')
+    else:
+        minutes = roi_minutes = roi_values = np.empty(0)
+    picks, exits, codes = path(ind['close'], minutes, signal, active, params['stop'], params['take_profit'],
+                               roi_minutes, roi_values)
+    return picks, active[picks], exits, np.array(PATH_REASONS, dtype=object)[codes]
+
+
+def simulate(variant, ind, signal):
+    """
+    持仓模拟: 开仓参数整列计算 -> 状态机确定每笔交易的开仓/出场行 -> 盈亏率整列计算 ->
+    只有依赖余额的仓位和余额按交易顺序推进（balance_scan）
+    返回交易记录DataFrame，字段含义与原脚本的 trades 一致
+    """
+    close = ind['close']
+    index = ind.data.index
+    active = np.flatnonzero(signal)
+    params = trade_parameters(variant, ind, active, signal)
+    find_path = kernel_path if PATH_KERNEL else trade_path
+    picks, entry_rows, exit_rows, reasons = find_path(variant, ind, signal, params)
+
+    direction = params['direction'][picks]
+    entry_price, exit_price = close[entry_rows], close[exit_rows]
+    pnl_pct = np.where(direction > 0, (exit_price - entry_price) / entry_price,
+                       (entry_price - exit_price) / entry_price)
+    leveraged = pnl_pct * variant.leverage
+    if variant.pnl_cap:
+        leveraged = np.clip(leveraged, *variant.pnl_cap)
+    stake, ratio, multiplier, factor, max_ratio = (term[picks] for term in params['sizing'])
+    sizes, balances = balance_scan(stake, ratio, multiplier, factor, max_ratio,
+                                   leveraged, float(variant.pnl_divisor), float(variant.initial_balance))
+    return pd.DataFrame({
+        'entry_time': index[entry_rows], 'exit_time': index[exit_rows], 'direction': direction,
+        'high_confidence': params['strong'][picks], 'entry_price': entry_price, 'exit_price': exit_price,
+        'position_size': sizes, 'pnl_pct': pnl_pct, 'leveraged_pnl_pct': leveraged,
+        'pnl_amount': sizes * leveraged / variant.pnl_divisor, 'balance': balances, 'reason': reasons,
+    }, columns=LEDGER_COLUMNS)
+
+
+def ledger_metrics(ledger, initial_balance):
+    if ledger.empty:
+        return {'trades': 0, 'winrate': 0.0, 'return_pct': 0.0, 'final_balance': initial_balance,
+                'max_drawdown': 0.0, 'stop_loss': 0, 'take_profit': 0, 'reverse': 0}
+    equity = np.concatenate([[initial_balance], ledger['balance'].to_numpy()])
+    peak = np.maximum.accumulate(equity)
+    reasons = ledger['reason'].value_counts()
+    return {
+        'trades': len(ledger),
+        'winrate': float((ledger['pnl_amount'] > 0).mean()),
+        'return_pct': float((equity[-1] - initial_balance) / initial_balance * 100),
+        'final_balance': float(equity[-1]),
+        'max_drawdown': float(((peak - equity) / peak).max()),
+        'stop_loss': int(reasons.get('stop_loss', 0)),
+        'take_profit': int(reasons.get('take_profit', 0)),
+        'reverse': int(reasons.get('reverse', 0)),
+    }
+
+
+def run_variant(variant, ind):
+    """返回 (信号数组, 交易记录, 耗时秒)；共享指标的首次计算也计入"""
+    started = time.perf_counter()
+    signal = build_signal(ind, variant)
+    ledger = simulate(variant, ind, signal)
+    return signal, ledger, time.perf_counter() - started
+
+
+# ---------- 与原脚本核对 ----------
+
+def load_reference(path, class_name):
+    spec = importlib.util.spec_from_file_location(f"archive_{path.stem.replace('.', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return getattr(module, class_name)
+
+
+def run_reference(variant, data):
+    """运行原脚本的逐行实现，返回 (信号数组, 交易记录, 耗时秒)"""
+    strategy = load_reference(*variant.reference)()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = strategy.analyze_data(data)
+        df['signal'] = df['signal'].fillna(0)
+        strategy.backtest(df)
+    elapsed = time.perf_counter() - started
+    return df['signal'].to_numpy(), pd.DataFrame(strategy.trades), elapsed
+
+
+def compare_ledgers(ledger, reference):
+    """逐笔核对，返回第一处差异的描述，一致时None"""
+    if len(ledger) != len(reference):
+        return f"交易数 {len(ledger)} / 原脚本 {len(reference)}"
+    if ledger.empty:
+        return None
+    checks = {
+        '入场时间': ledger['entry_time'].to_numpy() == reference['entry_time'].to_numpy(),
+        '出场时间': ledger['exit_time'].to_numpy() == reference['exit_time'].to_numpy(),
+        '出场原因': ledger['reason'].to_numpy() == reference['reason'].map(REASONS).to_numpy(),
+        '仓位': np.isclose(ledger['position_size'], reference.get('position_size', 100.0), rtol=1e-12),
+        '盈亏': np.isclose(ledger['pnl_amount'], reference['pnl_amount'], rtol=1e-12, atol=1e-9),
+        '余额': np.isclose(ledger['balance'], reference['balance'], rtol=1e-12, atol=1e-9),
+    }
+    for label, same in checks.items():
+        if not same.all():
+            k = int(np.argmin(same))
+            return f"第{k + 1}笔{label}不同 ({ledger['entry_time'].iloc[k]})"
+    return None
+
+
+# ---------- 命令行 ----------
+
+def load_data(args, pair):
+    """本地格式K线（时间索引 + Open/High/Low/Close/Volume）"""
+    if args.config:
+        provider = LocalDataProvider(load_config(args.config), [pair], args.datadir, args.timerange)
+        df = provider.get_pair_dataframe(pair, '1h')
+    else:
+        df = synthetic_ohlcv('1h', args.fixture, pair)
+    return to_local_format(df) if len(df) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='8点策略统一引擎：归档各版本的回归矩阵')
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS),
+                        help='运行的版本，默认全部')
+    parser.add_argument('--pairs', nargs='+', default=['ETH/USDT'], help='交易对')
+    parser.add_argument('--fixture', type=int, default=1825, metavar='DAYS',
+                        help='模拟K线天数（未指定 --config 时使用），默认5年')
+    parser.add_argument('--config', help='使用本地K线数据时的freqtrade配置文件')
+    parser.add_argument('--timerange', help='时间范围，如 20240101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--verify', action='store_true', help='同时运行原脚本并逐笔核对交易记录')
+    args = parser.parse_args()
+
+    variants = [VARIANTS[name] for name in args.variants]
+    failed = False
+    for pair in args.pairs:
+        data = load_data(args, pair)
+        if data is None:
+            print(f"⚠️  {pair} 无 1h 数据，跳过")
+            continue
+        ind = Indicators(data)
+        source = '本地数据' if args.config else f'模拟K线 {args.fixture} 天'
+        print(f"\n📊 {pair}  {len(data):,} 行 ({source})")
+        header = (f"{'版本':<6}{'信号':>7}{'交易':>7}{'胜率':>8}{'收益率':>10}{'最终资金':>12}{'最大回撤':>9}"
+                  f"{'止损/止盈/反向':>16}{'引擎ms':>9}")
+        print(header + (f"{'原脚本s':>9}{'加速':>8}  核对" if args.verify else ''))
+
+        for variant in variants:
+            signal, ledger, elapsed = run_variant(variant, ind)
+            m = ledger_metrics(ledger, variant.initial_balance)
+            exits = f"{m['stop_loss']}/{m['take_profit']}/{m['reverse']}"
+            line = (f"{variant.name:<6}{int(np.count_nonzero(signal)):>7}{m['trades']:>7}{m['winrate']:>8.1%}"
+                    f"{m['return_pct']:>9.2f}%{m['final_balance']:>12,.2f}{m['max_drawdown']:>9.2%}"
+                    f"{exits:>16}{elapsed * 1000:>9.1f}")
+            if args.verify and variant.reference:
+                ref_signal, ref_ledger, ref_elapsed = run_reference(variant, data)
+                problem = None
+                if not np.array_equal(signal, ref_signal):
+                    problem = f"信号不同 {int((signal != ref_signal).sum())} 行"
+                problem = problem or compare_ledgers(ledger, ref_ledger)
+                failed |= problem is not None
+                line += (f"{ref_elapsed:>9.2f}{ref_elapsed / max(elapsed, 1e-9):>7.0f}x  "
+                         f"{'✅ 一致' if problem is None else '❌ ' + problem}")
+            elif args.verify:
+                line += f"{'-':>9}{'-':>8}  无原脚本"
+            print(line)
+        print(f"   共享指标 {len(ind.cache)} 个: {', '.join(sorted(ind.cache))}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
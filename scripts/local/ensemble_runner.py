@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+多策略单进程对比
+在一个进程中对多个策略（各自的配置）执行分析和预筛选回测（prescreen_backtest.py 的引擎），
+并排输出各策略的交易数、收益、胜率、回撤：
+- 每个 (数据源, 交易对, 时间框架) 的K线只加载一次，各策略拿到的是写时复制的视图（pandas Copy-on-Write），
+  策略追加/修改列不会影响其他策略；回测起点相同、startup不同的策略共用按最大startup加载的数据，各取所需的预热段
+- 策略跑完后释放它的分析结果，共享K线只保留后面的策略还会用到的 (数据源, 交易对)
+- --share-indicators: TA-Lib指标按 (函数, 参数, 输入数组) 缓存，不同策略对同一数据的相同指标（如 EMA(50)）
+  只计算一次。缓存持有全部输入数组和结果直到运行结束，默认关闭
+
+默认的4个策略时间框架和指标各不相同（1h SMA/RSI/ATR、1m SMA/MOM、5m EMA/ADX、1m EMA），指标缓存不会命中
+（模拟K线30天: TA-Lib 计算84次、复用0次）。默认单进程的峰值内存109MB，低于最大的单独运行（116MB），
+开启缓存后为136MB；只在多个策略使用同一份数据上的相同指标时才值得开启。
+
+同时把每个策略放到独立子进程中单独运行作为对照，报告两种方式的墙钟时间、峰值内存、K线加载次数，
+并检查两种方式的回测结果一致。
+
+使用示例:
+    # 默认对比4个策略（各自使用对应的配置）
+    python scripts/local/ensemble_runner.py --timerange 20240101-20241231
+
+    # 指定 策略@配置，无本地数据时用模拟K线
+    python scripts/local/ensemble_runner.py --fixture 90 \\
+        --runs EightPMHighLowStrategy@config/eightpm_backtest.json OneFiveTrendHTF@config/base.json
+
+    # 开启指标缓存（只有同一份K线上的相同指标会命中）
+    python scripts/local/ensemble_runner.py --fixture 90 --share-indicators \\
+        --runs SimplifiedArbitrage@config/backtest.json TriangularArbitrageOKX@config/backtest.json
+"""
+
+import argparse
+import contextlib
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest_results import metrics_per_pair
+from chunked_analysis import peak_rss_mb, reset_peak_rss
+from freqtrade_data import (
+    STRATEGY_DIR, LocalDataProvider, config_pairs, dates_to_ms, load_config, load_strategy,
+    parse_timerange, timeframe_to_ms,
+)
+from prescreen_backtest import PrescreenBacktester, analyze_strategy
+
+
+DEFAULT_RUNS = [
+    'EightPMHighLowStrategy@config/eightpm_backtest.json',
+    'SimplifiedArbitrage@config/backtest.json',
+    'OneFiveTrendHTF@config/base.json',
+    'TriangularArbitrageOKX@config/backtest.json',
+]
+METRIC_KEYS = ['trades', 'profit_total_pct', 'winrate', 'max_drawdown_account', 'profit_factor']
+OHLCV_INPUTS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def parse_run(spec):
+    """'策略@配置' -> (策略, 配置路径)，省略配置时使用 config/eightpm_backtest.json"""
+    name, _, config = spec.partition('@')
+    return name, config or 'config/eightpm_backtest.json'
+
+
+def load_run(spec, options):
+    """'策略@配置' -> (配置, 交易对, 基础数据提供者)"""
+    if str(STRATEGY_DIR) not in sys.path:
+        sys.path.insert(0, str(STRATEGY_DIR))
+    _, config_path = parse_run(spec)
+    config = load_config(config_path)
+    pairs = config_pairs(config)
+    return config, pairs, make_provider(config, pairs, options)
+
+
+def make_provider(config, pairs, options):
+    if options.get('fixture'):
+        from benchmark_fixtures import FixtureDataProvider
+        provider = FixtureDataProvider(pairs, config.get('timeframe', '1h'), options['fixture'])
+        provider.config = config
+        return provider
+    return LocalDataProvider(config, pairs, options.get('datadir'), options.get('timerange'))
+
+
+class SharedFrames:
+    """(数据源, 交易对, 时间框架) -> 只加载一次的K线"""
+
+    def __init__(self, startup_candles=0):
+        self.startup_candles = startup_candles
+        self.frames = {}
+        self.loads = 0
+
+    def get(self, key, load):
+        if key not in self.frames:
+            self.frames[key] = load()
+            self.loads += 1
+        return self.frames[key]
+
+    def release(self, keep):
+        """释放 (数据源, 交易对) 不在 keep 中的K线，之后的策略不再需要它们"""
+        for key in [key for key in self.frames if (key[:-2], key[-2]) not in keep]:
+            del self.frames[key]
+
+
+class SharedDataProvider(LocalDataProvider):
+    """从SharedFrames取K线，按本策略的startup截取预热段，返回写时复制的视图"""
+
+    def __init__(self, base, shared):
+        self.__dict__.update(base.__dict__)
+        self.base = base
+        self.shared = shared
+
+    def _source(self):
+        if hasattr(self.base, 'days'):
+            return ('fixture', self.base.days)
+        return (str(self.datadir), self.candle_type, self.timerange)
+
+    def _load(self, pair, timeframe):
+        def load():
+            self.base.startup_candles = self.shared.startup_candles
+            return self.base._load(pair, timeframe)
+
+        frame = self.shared.get(self._source() + (pair, timeframe), load)
+        start_ms, _ = parse_timerange(self.timerange)
+        if start_ms is None or frame.empty or self.startup_candles >= self.shared.startup_candles:
+            return frame
+        first = start_ms - self.startup_candles * timeframe_to_ms(timeframe)
+        skip = int(np.searchsorted(dates_to_ms(frame['date']), first))
+        return frame.iloc[skip:].reset_index(drop=True) if skip else frame
+
+    def get_pair_dataframe(self, pair, timeframe=None, candle_type=''):
+        timeframe = timeframe or self.config.get('timeframe')
+        return self._load(pair, timeframe).copy(deep=False)
+
+
+def _array_key(value):
+    array = np.asarray(value)
+    return array.__array_interface__['data'][0], array.shape, array.strides, array.dtype.str
+
+
+@contextlib.contextmanager
+def shared_indicators(stats):
+    """
+    TA-Lib abstract函数按 (函数名, 参数, 输入数组的内存地址/形状) 缓存结果
+    写时复制的视图在未被修改前与共享K线是同一块内存，不同策略的相同指标命中同一缓存；
+    缓存持有输入数组的引用，地址不会被复用
+    """
+    try:
+        import talib
+        from talib import abstract
+    except ImportError:
+        stats['available'] = False
+        yield
+        return
+
+    cache = {}
+    originals = {}
+    for name in talib.get_functions():
+        function = getattr(abstract, name, None)
+        if function is None:
+            continue
+        originals[name] = function
+
+        def proxy(*args, _name=name, _function=function, **kwargs):
+            inputs, index, data_args = [], None, 0
+            for arg in args:
+                if isinstance(arg, pd.DataFrame):
+                    inputs += [arg[c].to_numpy() for c in OHLCV_INPUTS if c in arg.columns]
+                elif isinstance(arg, pd.Series):
+                    inputs.append(arg.to_numpy())
+                elif isinstance(arg, np.ndarray):
+                    inputs.append(arg)
+                else:
+                    break
+                data_args += 1
+                if index is None and hasattr(arg, 'index'):
+                    index = arg.index
+            if not data_args:
+                return _function(*args, **kwargs)
+            try:
+                key = (_name, repr(args[data_args:]), repr(sorted(kwargs.items())),
+                       tuple(_array_key(a) for a in inputs))
+            except TypeError:
+                return _function(*args, **kwargs)
+            if key not in cache:
+                cache[key] = (_function(*args, **kwargs), inputs)
+                stats['computed'] += 1
+            else:
+                stats['reused'] += 1
+            result = cache[key][0]
+            if isinstance(result, pd.Series):
+                return pd.Series(result.to_numpy(), index=index, name=result.name, copy=True)
+            if isinstance(result, pd.DataFrame):
+                return pd.DataFrame(result.to_numpy(), index=index, columns=result.columns, copy=True)
+            if isinstance(result, np.ndarray):
+                return result.copy()
+            return result
+
+        setattr(abstract, name, proxy)
+    try:
+        yield
+    finally:
+        for name, function in originals.items():
+            setattr(abstract, name, function)
+
+
+def backtest(strategy, provider, config, pairs, start_ms):
+    """分析 + 预筛选回测，返回 (TOTAL指标, 分析秒, 回测秒)"""
+    started = time.perf_counter()
+    analyzed = analyze_strategy(strategy, provider, pairs)
+    analyzed_at = time.perf_counter()
+    engine = PrescreenBacktester(strategy, config)
+    trades = engine.run(analyzed, start_ms)
+    finished = time.perf_counter()
+    total = metrics_per_pair(trades, engine.starting_balance, pairs)['TOTAL']
+    return total, analyzed_at - started, finished - analyzed_at
+
+
+def run_separate(spec, options):
+    """子进程：单独运行一个策略，自己加载数据"""
+    reset_peak_rss()
+    started = time.perf_counter()
+    config, pairs, provider = load_run(spec, options)
+    strategy = load_strategy(parse_run(spec)[0], config, provider, options['strategy_path'])
+    provider.startup_candles = int(getattr(strategy, 'startup_candle_count', 0) or 0)
+    start_ms, _ = parse_timerange(options.get('timerange'))
+    total, analysis_s, backtest_s = backtest(strategy, provider, config, pairs, start_ms)
+    return {
+        'metrics': total, 'analysis_s': analysis_s, 'backtest_s': backtest_s,
+        'wall_s': time.perf_counter() - started, 'peak_mb': peak_rss_mb(),
+        'loads': len(provider._cache),
+    }
+
+
+def run_ensemble(specs, options):
+    """子进程：同一进程中依次运行全部策略，共用K线；options['share_indicators'] 时共用指标缓存"""
+    reset_peak_rss()
+    started = time.perf_counter()
+    shared = SharedFrames()
+    stats = {'computed': 0, 'reused': 0, 'enabled': bool(options.get('share_indicators'))}
+    runs = []
+    for spec in specs:
+        config, pairs, base = load_run(spec, options)
+        provider = SharedDataProvider(base, shared)
+        strategy = load_strategy(parse_run(spec)[0], config, provider, options['strategy_path'])
+        provider.startup_candles = int(getattr(strategy, 'startup_candle_count', 0) or 0)
+        shared.startup_candles = max(shared.startup_candles, provider.startup_candles)
+        runs.append((spec, strategy, provider, config, pairs))
+
+    start_ms, _ = parse_timerange(options.get('timerange'))
+    results = {}
+    with shared_indicators(stats) if stats['enabled'] else contextlib.nullcontext():
+        while runs:
+            spec, strategy, provider, config, pairs = runs.pop(0)
+            total, analysis_s, backtest_s = backtest(strategy, provider, config, pairs, start_ms)
+            results[spec] = {'metrics': total, 'analysis_s': analysis_s, 'backtest_s': backtest_s}
+            # 跑完的策略连同它的分析结果一起释放，共享K线只保留后面的策略还会用到的
+            provider._analyzed.clear()
+            del strategy, provider
+            shared.release({(later[2]._source(), pair) for later in runs for pair in later[4]})
+    return {
+        'runs': results, 'wall_s': time.perf_counter() - started, 'peak_mb': peak_rss_mb(),
+        'loads': shared.loads, 'indicators': stats,
+    }
+
+
+def enable_copy_on_write():
+    """pandas 3 始终写时复制；2.x 需要显式开启，否则共享视图上的修改会互相影响"""
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+
+def isolated(function, *args):
+    """
+    在新的子进程中运行，峰值内存只包含这一次运行
+    spawn的子进程重新导入pandas、选项恢复默认，写时复制在子进程的初始化函数中开启
+    """
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=enable_copy_on_write) as pool:
+        return pool.submit(function, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多策略单进程对比')
+    parser.add_argument('--runs', nargs='+', default=DEFAULT_RUNS, help='策略@配置文件 列表')
+    parser.add_argument('--strategy-path', help='策略目录，默认 user_data/strategies')
+    parser.add_argument('--timerange', help='时间范围 YYYYMMDD-YYYYMMDD')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--fixture', type=int, metavar='DAYS', help='使用指定天数的模拟K线')
+    parser.add_argument('--share-indicators', action='store_true',
+                        help='各策略共用TA-Lib指标缓存（持有全部指标直到运行结束，默认关闭）')
+    parser.add_argument('--no-separate', action='store_true', help='不运行单独运行的对照组')
+    args = parser.parse_args()
+
+    options = {'timerange': args.timerange, 'datadir': args.datadir, 'fixture': args.fixture,
+               'strategy_path': args.strategy_path or STRATEGY_DIR, 'share_indicators': args.share_indicators}
+
+    ensemble = isolated(run_ensemble, args.runs, options)
+    separate = {} if args.no_separate else {spec: isolated(run_separate, spec, options) for spec in args.runs}
+
+    print(f"🎼 {len(args.runs)} 个策略  {'模拟K线 %d 天' % args.fixture if args.fixture else args.timerange or '全部数据'}")
+    print(f"{'策略':<26}{'配置':<26}{'交易数':>7}{'收益%':>9}{'胜率':>8}{'最大回撤':>9}{'盈利因子':>9}{'分析s':>8}  单独运行")
+    failed = False
+    for spec in args.runs:
+        name, config_path = parse_run(spec)
+        run = ensemble['runs'][spec]
+        m = run['metrics']
+        status = ''
+        if spec in separate:
+            same = all(np.isclose(m[k], separate[spec]['metrics'][k], rtol=1e-9, atol=1e-12) for k in METRIC_KEYS)
+            failed |= not same
+            status = '✅ 一致' if same else '❌ 不一致'
+        print(f"{name:<26}{config_path:<26}{m['trades']:>7}{m['profit_total_pct']:>9.2f}{m['winrate']:>8.1%}"
+              f"{m['max_drawdown_account']:>9.2%}{m['profit_factor']:>9.2f}{run['analysis_s']:>8.2f}  {status}")
+
+    indicators = ensemble['indicators']
+    if not indicators['enabled']:
+        reuse = '   未共用指标（--share-indicators 开启）'
+    elif not indicators.get('available', True):
+        reuse = '   未安装TA-Lib，不缓存指标'
+    else:
+        reuse = f"   TA-Lib 计算 {indicators['computed']} 次, 复用 {indicators['reused']} 次"
+        if not indicators['reused']:
+            reuse += '（各策略没有相同的指标，缓存没有作用）'
+    print(f"\n{'方式':<12}{'墙钟s':>9}{'峰值MB':>10}{'K线加载':>9}")
+    print(f"{'单进程':<12}{ensemble['wall_s']:>9.2f}{ensemble['peak_mb']:>10.0f}{ensemble['loads']:>9}{reuse}")
+    if separate:
+        wall = sum(r['wall_s'] for r in separate.values())
+        peaks = [r['peak_mb'] for r in separate.values()]
+        loads = sum(r['loads'] for r in separate.values())
+        print(f"{'单独运行':<12}{wall:>9.2f}{max(peaks):>10.0f}{loads:>9}"
+              f"   依次运行合计; 同时运行时峰值合计 {sum(peaks):.0f}MB")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Freqtrade数据与策略加载工具
+不启动freqtrade机器人，直接读取 user_data/data 下的K线文件，
+并从 user_data/strategies 加载策略类，供本地分析脚本复用。
+"""
+
+import gzip
+import importlib.util
+import json
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+STRATEGY_DIR = PROJECT_ROOT / 'user_data' / 'strategies'
+DATA_DIR = PROJECT_ROOT / 'user_data' / 'data'
+
+OHLCV_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+EPOCH = pd.Timestamp(0, tz='UTC')
+
+TIMEFRAME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def timeframe_to_seconds(timeframe):
+    """'5m' -> 300"""
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+
+
+def timeframe_to_minutes(timeframe):
+    return timeframe_to_seconds(timeframe) // 60
+
+
+def timeframe_to_ms(timeframe):
+    return timeframe_to_seconds(timeframe) * 1000
+
+
+def pair_to_filename(pair):
+    """与freqtrade保持一致的文件名转换: ETH/USDT:USDT -> ETH_USDT_USDT"""
+    for ch in ['/', ' ', '.', '@', '$', '+', ':']:
+        pair = pair.replace(ch, '_')
+    return pair
+
+
+def parse_timerange(timerange):
+    """解析 YYYYMMDD-YYYYMMDD 格式，返回 (start_ms, end_ms)，缺省端为None"""
+    if not timerange:
+        return None, None
+    start, _, end = timerange.partition('-')
+
+    def to_ms(value):
+        if not value:
+            return None
+        return int(pd.Timestamp(value, tz='UTC').timestamp() * 1000)
+
+    return to_ms(start), to_ms(end)
+
+
+def load_config(path):
+    """读取freqtrade配置文件（相对路径按项目根目录解析）"""
+    path = Path(path)
+    if not path.is_absolute() and not path.exists():
+        path = PROJECT_ROOT / path
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def config_pairs(config):
+    """配置中的交易对白名单（兼容 exchange.pair_whitelist 与 StaticPairList.pairs）"""
+    pairs = config.get('exchange', {}).get('pair_whitelist') or []
+    if not pairs:
+        for pairlist in config.get('pairlists', []):
+            pairs = pairlist.get('pairs') or pairs
+    return list(pairs)
+
+
+def candle_type_of(config):
+    return 'futures' if config.get('trading_mode') == 'futures' else 'spot'
+
+
+def exchange_data_dir(config, datadir=None):
+    """freqtrade默认数据目录: user_data/data/<exchange>"""
+    if datadir:
+        return Path(datadir)
+    return DATA_DIR / config.get('exchange', {}).get('name', '')
+
+
+def candle_file_candidates(datadir, pair, timeframe, candle_type='spot'):
+    datadir = Path(datadir)
+    name = f"{pair_to_filename(pair)}-{timeframe}"
+    if candle_type and candle_type != 'spot':
+        name = f"{name}-{candle_type}"
+        dirs = [datadir / 'futures', datadir]
+    else:
+        dirs = [datadir]
+    return [d / f"{name}{ext}" for d in dirs for ext in ('.json', '.json.gz')]
+
+
+def candle_file(datadir, pair, timeframe, candle_type='spot'):
+    """返回K线文件路径，不存在时返回None"""
+    for path in candle_file_candidates(datadir, pair, timeframe, candle_type):
+        if path.exists():
+            return path
+    return None
+
+
+def read_candle_rows(path):
+    """读取freqtrade json格式K线: [[timestamp_ms, open, high, low, close, volume], ...]"""
+    path = Path(path)
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ohlcv_from_rows(rows):
+    """K线数组 -> freqtrade风格DataFrame（date为UTC时间）"""
+    arr = np.asarray(rows, dtype='float64').reshape(-1, 6)
+    df = pd.DataFrame(arr[:, 1:], columns=OHLCV_COLUMNS[1:])
+    df.insert(0, 'date', pd.to_datetime(arr[:, 0].astype('int64'), unit='ms', utc=True))
+    return df
+
+
+def dates_to_ms(dates):
+    """UTC时间序列 -> int64毫秒时间戳（不依赖pandas内部时间精度）"""
+    delta = pd.to_datetime(dates, utc=True) - EPOCH
+    return np.asarray(delta // pd.Timedelta(milliseconds=1), dtype='int64')
+
+
+def trim_timerange(df, start_ms=None, end_ms=None):
+    ts = dates_to_ms(df['date'])
+    mask = np.ones(len(df), dtype=bool)
+    if start_ms is not None:
+        mask &= ts >= start_ms
+    if end_ms is not None:
+        mask &= ts < end_ms
+    return df.loc[mask].reset_index(drop=True)
+
+
+def load_pair_history(pair, timeframe, datadir, candle_type='spot',
+                      timerange=None, startup_candles=0):
+    """
+    读取单个交易对的K线数据
+    与freqtrade一致：回测起点向前多加载startup_candles根K线用于指标预热
+    已转换为列式存储且不比json旧时直接从列式存储加载（见 ohlcv_store.py）
+    """
+    from ohlcv_store import load_series
+
+    start_ms, end_ms = parse_timerange(timerange)
+    if start_ms is not None:
+        start_ms -= startup_candles * timeframe_to_ms(timeframe)
+
+    df = load_series(datadir, pair, timeframe, candle_type, start_ms, end_ms)
+    if df is not None:
+        return df
+
+    path = candle_file(datadir, pair, timeframe, candle_type)
+    if path is None:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    df = ohlcv_from_rows(read_candle_rows(path))
+    df = df.drop_duplicates(subset='date', keep='last').sort_values('date').reset_index(drop=True)
+    return trim_timerange(df, start_ms, end_ms)
+
+
+class LocalDataProvider:
+    """
+    freqtrade DataProvider的本地替代
+    只实现策略实际调用的接口：current_whitelist / get_pair_dataframe / get_analyzed_dataframe
+    """
+
+    runmode = 'backtest'
+
+    def __init__(self, config, pairs=None, datadir=None, timerange=None, startup_candles=0):
+        self.config = config
+        self.pairs = list(pairs) if pairs else config_pairs(config)
+        self.datadir = exchange_data_dir(config, datadir)
+        self.candle_type = candle_type_of(config)
+        self.timerange = timerange
+        self.startup_candles = startup_candles
+        self._cache = {}
+        self._analyzed = {}
+
+    def current_whitelist(self):
+        return list(self.pairs)
+
+    def _load(self, pair, timeframe):
+        key = (pair, timeframe)
+        if key not in self._cache:
+            df = load_pair_history(
+                pair, timeframe, self.datadir, self.candle_type,
+                timerange=self.timerange, startup_candles=self.startup_candles,
+            )
+            if df.empty:
+                df = self._derive(pair, timeframe, df)
+            self._cache[key] = df
+        return self._cache[key]
+
+    def _derive(self, pair, timeframe, empty):
+        """没有该时间框架的数据文件时，从配置的基础时间框架派生（见 resample.py）"""
+        base = self.config.get('timeframe')
+        if not base or timeframe == base or \
+                timeframe_to_ms(timeframe) % timeframe_to_ms(base) or \
+                timeframe_to_ms(timeframe) < timeframe_to_ms(base):
+            return empty
+        from resample import load_resampled
+
+        start_ms, end_ms = parse_timerange(self.timerange)
+        if start_ms is not None:
+            start_ms -= self.startup_candles * timeframe_to_ms(timeframe)
+        df = load_resampled(self.datadir, pair, timeframe, base, self.candle_type, start_ms, end_ms)
+        return empty if df is None else df
+
+    def get_pair_dataframe(self, pair, timeframe=None, candle_type=''):
+        timeframe = timeframe or self.config.get('timeframe')
+        # 返回副本，策略会直接在informative数据上追加列
+        return self._load(pair, timeframe).copy()
+
+    def historic_ohlcv(self, pair, timeframe=None, candle_type=''):
+        return self.get_pair_dataframe(pair, timeframe, candle_type)
+
+    def set_analyzed_dataframe(self, pair, timeframe, dataframe):
+        self._analyzed[(pair, timeframe)] = dataframe
+
+    def get_analyzed_dataframe(self, pair, timeframe):
+        df = self._analyzed.get((pair, timeframe))
+        if df is None:
+            return pd.DataFrame(), None
+        last = df['date'].iloc[-1] if len(df) else None
+        return df, last
+
+
+def strategy_files(name, strategy_dir=STRATEGY_DIR):
+    """策略目录中源码包含 class <name> 的文件（不导入）"""
+    files = []
+    for path in sorted(Path(strategy_dir).glob('*.py')):
+        try:
+            source = path.read_text(encoding='utf-8')
+        except UnicodeDecodeError:
+            continue
+        if re.search(rf"^class {re.escape(name)}\b", source, re.MULTILINE):
+            files.append(path)
+    return files
+
+
+def load_strategy_class(name, strategy_dir=STRATEGY_DIR):
+    """在策略目录中按类名查找并导入策略类"""
+    strategy_dir = Path(strategy_dir)
+    if str(strategy_dir) not in sys.path:
+        # 与freqtrade一致，允许策略导入同目录下的辅助模块
+        sys.path.insert(0, str(strategy_dir))
+
+    for path in strategy_files(name, strategy_dir):
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        cls = getattr(module, name, None)
+        if cls is not None:
+            cls.__file__ = str(path)
+            return cls
+    raise ValueError(f"未在 {strategy_dir} 中找到策略类: {name}")
+
+
+def load_strategy(name, config, provider=None, strategy_dir=STRATEGY_DIR):
+    """实例化策略并挂载数据提供者"""
+    cls = load_strategy_class(name, strategy_dir)
+    strategy = cls(config)
+    if provider is not None:
+        strategy.dp = provider
+    if hasattr(strategy, 'ft_bot_start'):
+        strategy.ft_bot_start()
+    return strategy
+
+
+def analyze_pair(strategy, dataframe, pair):
+    """按freqtrade顺序执行 指标 -> 入场 -> 出场，返回分析后的DataFrame"""
+    metadata = {'pair': pair}
+    df = strategy.populate_indicators(dataframe, metadata)
+    df = strategy.populate_entry_trend(df, metadata)
+    df = strategy.populate_exit_trend(df, metadata)
+    for col in ('enter_long', 'enter_short', 'exit_long', 'exit_short'):
+        if col not in df.columns:
+            df[col] = 0
+    return df
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+可选的JIT内核
+路径相关、无法整列向量化的循环（单一持仓状态机、依赖余额的仓位、移动止损的出场查找）写成
+只用标量和数组下标的函数，安装numba时编译执行（首次调用时编译，cache=True 缓存到 __pycache__），
+否则就是同样写法的Python函数。
+
+调用方（eightpm_engine.py、prescreen_backtest.py）另有分块向量化的NumPy实现，按 --check 实测选择较快的一方:
+- position_path: 编译后使用内核；Python版本比NumPy实现慢（5年小时线 7.0ms vs 2.8ms），未编译时用NumPy实现
+- prescreen_exit: 始终使用内核；未编译的Python版本也比NumPy实现快（300笔 12-24ms vs 46-73ms），
+  每笔交易扫到出场即停，没有分块的重复计算
+- balance_scan: 只按交易循环，始终使用内核
+两种实现的结果必须逐笔一致，用 --check 在模拟K线上核对（编译版本、Python版本、NumPy实现三方对比），
+CI（.github/workflows/backtest.yml）每次运行都会执行。
+
+后端（环境变量）:
+    FT_KERNELS=auto     # 默认，安装numba时编译
+    FT_KERNELS=python   # 不编译，按上面的规则选择Python内核或NumPy实现
+    FT_KERNELS=numpy    # 不编译，调用方一律使用NumPy实现（排查差异时使用）
+
+使用示例:
+    python scripts/local/kernels.py --check
+    python scripts/local/kernels.py --check --fixture 365 --pairs ETH/USDT BTC/USDT
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+BACKEND = os.environ.get('FT_KERNELS', 'auto').lower()
+JIT_ENABLED = njit is not None and BACKEND not in ('python', 'numpy')
+# 调用方是否改用内核: 持仓路径只有编译后才比NumPy实现快，出场查找的Python版本也更快
+PATH_KERNEL = JIT_ENABLED
+EXIT_KERNEL = BACKEND != 'numpy'
+
+# 名称 -> (Python函数, 编译函数或None)，--check 使用
+KERNELS = {}
+
+
+def kernel(func):
+    """登记内核；编译可用时返回编译版本，否则返回Python函数本身"""
+    compiled = njit(cache=True)(func) if JIT_ENABLED else None
+    KERNELS[func.__name__] = (func, compiled)
+    return compiled if compiled is not None else func
+
+
+# ---------- 仓位与余额 ----------
+
+@kernel
+def balance_scan(stake, ratio, multiplier, factor, max_ratio, leveraged, divisor, initial_balance):
+    """
+    按交易顺序推进余额: 仓位 = min(min(基础仓位, 余额*比例) * 倍数 * 折算, 余额*最大比例)，
+    余额 += 仓位 * 杠杆收益 / divisor。比例为NaN时比较为False，不限制
+    返回 (仓位数组, 每笔后的余额数组)
+    """
+    n = len(stake)
+    sizes = np.empty(n)
+    balances = np.empty(n)
+    balance = initial_balance
+    for i in range(n):
+        size = stake[i]
+        cap = balance * ratio[i]
+        if cap < size:
+            size = cap
+        size = size * multiplier[i]
+        size = size * factor[i]
+        cap = balance * max_ratio[i]
+        if cap < size:
+            size = cap
+        sizes[i] = size
+        balance += size * leveraged[i] / divisor
+        balances[i] = balance
+    return sizes, balances
+
+
+# ---------- 8点引擎的持仓状态机 ----------
+
+# position_path 的出场类型编码
+PATH_REASONS = ('stop_loss', 'take_profit', 'reverse', 'end')
+
+
+@kernel
+def position_path(close, minutes, signal, active, stop, take_profit, roi_minutes, roi_values):
+    """
+    单一持仓的状态机，按收盘价逐行判断: 止损 -> 止盈（有ROI表时按持仓分钟取ROI）-> 反向信号平仓并反手，
+    止损/止盈后从出场行起的第一个信号开新仓，数据末尾平仓
+    signal: 每行信号（正做多/负做空/0）；active: 有信号的行；stop/take_profit 按 active 的下标，止盈NaN为没有
+    返回 (开仓在 active 中的下标, 出场行, 出场类型编码 PATH_REASONS)
+    """
+    n = len(close)
+    m = len(active)
+    picks = np.empty(m, dtype=np.int64)
+    exits = np.empty(m, dtype=np.int64)
+    reasons = np.empty(m, dtype=np.int8)
+    count = 0
+    k = 0
+    while k < m:
+        row = active[k]
+        direction = 1 if signal[row] > 0 else -1
+        entry = close[row]
+        exit_row = n - 1
+        reason = 3
+        for j in range(row + 1, n):
+            price = close[j]
+            if direction > 0:
+                pnl = (price - entry) / entry
+            else:
+                pnl = (entry - price) / entry
+            if pnl <= -stop[k]:
+                exit_row, reason = j, 0
+                break
+            threshold = take_profit[k]
+            if len(roi_minutes) > 0:
+                elapsed = minutes[j] - minutes[row]
+                threshold = np.inf
+                for r in range(len(roi_minutes)):
+                    if roi_minutes[r] <= elapsed:
+                        threshold = roi_values[r]
+            if pnl >= threshold:
+                exit_row, reason = j, 1
+                break
+            if signal[j] * direction < 0:
+                exit_row, reason = j, 2
+                break
+        picks[count] = k
+        exits[count] = exit_row
+        reasons[count] = reason
+        count += 1
+        if reason == 3:
+            break
+        while k < m and active[k] < exit_row:
+            k += 1
+    return picks[:count], exits[:count], reasons[:count]
+
+
+# ---------- 预筛选回测的单笔出场 ----------
+
+# prescreen_exit 的出场类型编码
+EXIT_REASONS = ('exit_signal', 'stop_loss', 'trailing_stop_loss', 'roi', 'force_exit')
+
+
+@kernel
+def prescreen_exit(ts, open_, high, low, close, enter_sig, exit_sig, entry_idx, is_short, use_exit_signal,
+                   stoploss, trailing_stop, trailing_positive, trailing_offset, only_offset,
+                   roi_minutes, roi_values, fee):
+    """
+    从入场K线开始逐根查找首次出场，规则与 PrescreenBacktester.find_exit 相同:
+    出场信号(开盘) > 止损（移动止损按K线有利极值更新，只朝有利方向移动）> ROI
+    trailing_positive 为NaN表示未设置
+    返回 (出场行, 成交价, 出场类型编码 EXIT_REASONS)
+    """
+    n = len(ts)
+    open_rate = open_[entry_idx]
+    if is_short:
+        initial = open_rate * (1 - stoploss)
+    else:
+        initial = open_rate * (1 + stoploss)
+    stop = initial
+    best = open_rate
+    for j in range(entry_idx, n):
+        if is_short:
+            favorable, adverse = low[j], high[j]
+        else:
+            favorable, adverse = high[j], low[j]
+        signal_hit = use_exit_signal and exit_sig[j] and not enter_sig[j] and j > entry_idx
+
+        if trailing_stop:
+            if is_short:
+                best = min(best, favorable)
+                best_profit = 1 - best / open_rate
+            else:
+                best = max(best, favorable)
+                best_profit = best / open_rate - 1
+            distance = -stoploss
+            allowed = True
+            if not math.isnan(trailing_positive):
+                reached = best_profit > trailing_offset
+                if reached:
+                    distance = trailing_positive
+                if only_offset:
+                    allowed = reached
+            if allowed:
+                if is_short:
+                    stop = min(stop, best * (1 + distance))
+                else:
+                    stop = max(stop, best * (1 - distance))
+        stop_hit = adverse >= stop if is_short else adverse <= stop
+
+        roi_rate = np.nan
+        elapsed = (ts[j] - ts[entry_idx]) / 60000.0
+        for r in range(len(roi_minutes)):
+            if roi_minutes[r] <= elapsed:
+                if is_short:
+                    roi_rate = open_rate * (1 - fee) * (1 - roi_values[r]) / (1 + fee)
+                else:
+                    roi_rate = open_rate * (1 + fee) * (1 + roi_values[r]) / (1 - fee)
+        roi_hit = favorable <= roi_rate if is_short else favorable >= roi_rate
+
+        if signal_hit:
+            return j, open_[j], 0
+        if stop_hit:
+            # 开盘已越过止损价时按开盘价成交；与 np.isclose 相同的容差判断止损是否移动过
+            rate = max(open_[j], stop) if is_short else min(open_[j], stop)
+            moved = abs(stop - initial) > 1e-8 + 1e-5 * abs(initial)
+            return j, rate, 2 if moved else 1
+        if roi_hit:
+            rate = roi_rate
+            if j > entry_idx:
+                rate = min(open_[j], rate) if is_short else max(open_[j], rate)
+            return j, rate, 3
+    return n - 1, close[n - 1], 4
+
+
+# ---------- 自检 ----------
+
+def _backends(name):
+    """(标签, 函数) 列表: Python版本，以及编译版本（可用时）"""
+    func, compiled = KERNELS[name]
+    found = [('python', func)]
+    if compiled is not None:
+        found.append(('numba', compiled))
+    return found
+
+
+def check_engine(data, pair):
+    """eightpm_engine: 每个版本的 trade_path（NumPy）与 position_path 逐笔一致"""
+    import eightpm_engine as engine
+
+    ok = True
+    ind = engine.Indicators(data)
+    for variant in engine.VARIANTS.values():
+        same_all = True
+        signal = engine.build_signal(ind, variant)
+        active = np.flatnonzero(signal)
+        params = engine.trade_parameters(variant, ind, active, signal)
+        started = time.perf_counter()
+        expected = engine.trade_path(variant, ind, signal, params)
+        numpy_s = time.perf_counter() - started
+        timings = [f"numpy {numpy_s * 1000:.1f}ms"]
+        for label, func in _backends('position_path'):
+            engine.kernel_path(variant, ind, signal, params, func)  # 首次调用包含编译
+            started = time.perf_counter()
+            got = engine.kernel_path(variant, ind, signal, params, func)
+            timings.append(f"{label} {(time.perf_counter() - started) * 1000:.1f}ms")
+            same = all(np.array_equal(a, b) for a, b in zip(got, expected))
+            same_all &= same
+            if not same:
+                print(f"   ❌ {pair} {variant.name} position_path[{label}] 与NumPy实现不一致")
+        ok &= same_all
+        print(f"   {'✅' if same_all else '❌'} {pair} {variant.name:<5} 交易 {len(expected[0]):>4}  " + ', '.join(timings))
+
+        # balance_scan: 编译版本与Python版本
+        terms = [term[expected[0]] for term in params['sizing']]
+        leveraged = np.linspace(-50, 80, len(expected[0]))
+        results = [func(*terms, leveraged, float(variant.pnl_divisor), float(variant.initial_balance))
+                   for _, func in _backends('balance_scan')]
+        for result in results[1:]:
+            if not all(np.array_equal(a, b) for a, b in zip(result, results[0])):
+                ok = False
+                print(f"   ❌ {pair} {variant.name} balance_scan 编译版本与Python版本不一致")
+    return ok
+
+
+PRESCREEN_CASES = [
+    # (名称, 策略属性)
+    ('止损+ROI', dict(trailing_stop=False)),
+    ('移动止损', dict(trailing_stop=True)),
+    ('移动止损+正向偏移', dict(trailing_stop=True, trailing_stop_positive=0.01,
+                            trailing_stop_positive_offset=0.02)),
+    ('仅达到偏移后移动', dict(trailing_stop=True, trailing_stop_positive=0.01,
+                           trailing_stop_positive_offset=0.02, trailing_only_offset_is_reached=True)),
+    ('不用出场信号', dict(trailing_stop=True, use_exit_signal=False)),
+]
+
+
+def check_prescreen(frame, pair, entries):
+    """prescreen_backtest: PrescreenBacktester.find_exit（NumPy）与 prescreen_exit 逐笔一致"""
+    from types import SimpleNamespace
+
+    from prescreen_backtest import PrescreenBacktester, prepare_pair_arrays
+
+    rng = np.random.default_rng(7)
+    df = frame.copy()
+    df['enter_long'] = (rng.random(len(df)) < 0.02).astype('int8')
+    df['enter_short'] = (rng.random(len(df)) < 0.02).astype('int8')
+    df['exit_long'] = (rng.random(len(df)) < 0.01).astype('int8')
+    df['exit_short'] = (rng.random(len(df)) < 0.01).astype('int8')
+    a = prepare_pair_arrays(pair, df)
+    rows = np.sort(rng.choice(len(df) - 1, size=min(entries, len(df) - 1), replace=False))
+    config = {'trading_mode': 'futures', 'dry_run_wallet': 1000, 'stake_amount': 100}
+
+    ok = True
+    for label, attrs in PRESCREEN_CASES:
+        same_all = True
+        strategy = SimpleNamespace(stoploss=-0.03, minimal_roi={'0': 0.06, '120': 0.03, '600': 0.01},
+                                   can_short=True, use_exit_signal=True)
+        for key, value in attrs.items():
+            setattr(strategy, key, value)
+        backtester = PrescreenBacktester(strategy, config)
+        backtester.use_kernels = False
+        started = time.perf_counter()
+        expected = [backtester.find_exit(a, int(row), short) for row in rows for short in (False, True)]
+        timings = [f"numpy {(time.perf_counter() - started) * 1000:.1f}ms"]
+        for backend, func in _backends('prescreen_exit'):
+            backtester.kernel_exit(a, int(rows[0]), False, func)  # 首次调用包含编译
+            started = time.perf_counter()
+            got = [backtester.kernel_exit(a, int(row), short, func) for row in rows for short in (False, True)]
+            timings.append(f"{backend} {(time.perf_counter() - started) * 1000:.1f}ms")
+            bad = [i for i, (x, y) in enumerate(zip(got, expected))
+                   if x[0] != y[0] or x[2] != y[2] or x[1] != y[1]]
+            if bad:
+                same_all = False
+                i = bad[0]
+                print(f"   ❌ {pair} {label}[{backend}] {len(bad)} 笔不一致，第一笔 {got[i]} / NumPy {expected[i]}")
+        ok &= same_all
+        print(f"   {'✅' if same_all else '❌'} {pair} {label:<10} 出场 {len(expected):>4}  " + ', '.join(timings))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='可选JIT内核：与NumPy实现的一致性自检')
+    parser.add_argument('--check', action='store_true', help='在模拟K线上核对各内核')
+    parser.add_argument('--fixture', type=int, default=730, metavar='DAYS', help='模拟K线天数')
+    parser.add_argument('--pairs', nargs='+', default=['ETH/USDT'], help='交易对')
+    parser.add_argument('--entries', type=int, default=300, help='预筛选出场核对的入场行数')
+    args = parser.parse_args()
+
+    print(f"⚙️  内核后端: {'numba ' + __import__('numba').__version__ if JIT_ENABLED else 'Python'}"
+          f"（FT_KERNELS={BACKEND}{'' if njit is not None else '，未安装numba'}）")
+    print(f"   持仓路径: {'内核' if PATH_KERNEL else 'NumPy实现'}  预筛选出场: {'内核' if EXIT_KERNEL else 'NumPy实现'}")
+    if not args.check:
+        return
+
+    from benchmark_fixtures import synthetic_ohlcv, to_local_format
+
+    ok = True
+    for pair in args.pairs:
+        frame = synthetic_ohlcv('1h', args.fixture, pair)
+        print(f"\n📊 {pair}  {len(frame):,} 行 (模拟K线 {args.fixture} 天)")
+        ok &= check_engine(to_local_format(frame), pair)
+        ok &= check_prescreen(frame, pair, args.entries)
+    print(f"\n{'✅ 全部一致' if ok else '❌ 存在不一致'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+前视偏差抽样检测
+在抽样的切点c上分别分析 [c-历史, c] 与 [c-历史, c+视野] 两段K线，两者起点相同、预热影响相互抵消，
+切点那一行的值不同就说明该列用到了c之后的K线。对泄漏的列二分查找需要多少根未来K线才与完整结果一致，
+得到前视的距离。informative数据裁剪到各段的结束时间，与实盘只能拿到已收盘K线的情况一致。
+
+切点一半取在完整分析有入场/出场信号的行，一半均匀随机抽取；每个切点只分析几百行，
+几十个切点在几秒内完成，不需要逐根K线回放全部历史。
+
+使用示例:
+    python scripts/local/lookahead_check.py --config config/eightpm_backtest.json \\
+        --strategy EightPMHighLowStrategy
+
+    # 无本地数据时用一年的模拟K线，抽样50个切点
+    python scripts/local/lookahead_check.py --config config/eightpm_backtest.json \\
+        --strategy EightPMHighLowStrategy --fixture 365 --samples 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from freqtrade_data import (
+    STRATEGY_DIR, LocalDataProvider, analyze_pair, config_pairs, load_config, load_strategy,
+)
+from startup_candles import TrimmedProvider
+
+
+SIGNAL_COLUMNS = ['enter_long', 'enter_short', 'exit_long', 'exit_short', 'enter_tag', 'exit_tag']
+DEFAULT_HORIZON = 48
+
+
+def _analyze(strategy, provider, df, lo, hi, pair):
+    """分析 df 的 [lo, hi) 行，informative数据裁剪到同一时间范围"""
+    window = df.iloc[lo:hi].reset_index(drop=True)
+    provider.start, provider.end = window['date'].iloc[0], window['date'].iloc[-1]
+    return analyze_pair(strategy, window.copy(), pair)
+
+
+def _changed(truncated, extended, row, columns=None):
+    """两次分析在同一行上取值不同的列"""
+    columns = columns or [c for c in truncated.columns if c in extended.columns and c != 'date']
+    a, b = truncated.iloc[row], extended.iloc[row]
+    changed = []
+    for col in columns:
+        x, y = a[col], b[col]
+        if pd.isna(x) and pd.isna(y):
+            continue
+        if isinstance(x, (float, np.floating)) and isinstance(y, (float, np.floating)):
+            if np.isclose(x, y, rtol=1e-9, atol=0.0):
+                continue
+        elif x == y:
+            continue
+        changed.append(col)
+    return changed
+
+
+def lead_distances(strategy, provider, df, lo, cut, horizon, extended, columns, pair):
+    """
+    按列二分查找：切点之后至少需要多少根K线，该列在切点行的值才与 [lo, cut+horizon] 的分析一致
+    各列的二分共用同一组截断分析（按结束位置缓存）
+    """
+    cache = {}
+
+    def changed(extra, column):
+        if extra not in cache:
+            out = _analyze(strategy, provider, df, lo, cut + 1 + extra, pair)
+            cache[extra] = set(_changed(out, extended, cut - lo, columns))
+        return column in cache[extra]
+
+    leads = {}
+    for column in columns:
+        low, high = 1, horizon
+        while low < high:
+            mid = (low + high) // 2
+            if changed(mid, column):
+                low = mid + 1
+            else:
+                high = mid
+        leads[column] = low
+    return leads
+
+
+def sample_cuts(strategy, provider, df, pair, samples, history, horizon, seed):
+    """
+    切点：一半取在与完整分析的信号行同一时刻（一天中的时间）的行，其余均匀随机
+    按时刻而不是只按信号行抽样，截断后才出现/消失的信号都能覆盖到
+    """
+    rng = np.random.default_rng(seed)
+    candidates = np.arange(history, len(df) - horizon - 1)
+    if not len(candidates):
+        return []
+    provider.start = provider.end = None
+    analyzed = analyze_pair(strategy, df.copy(), pair)
+    signal_cols = [c for c in ('enter_long', 'enter_short', 'exit_long', 'exit_short') if c in analyzed]
+    fired = np.flatnonzero((analyzed[signal_cols].fillna(0) != 0).any(axis=1).to_numpy())
+    time_of_day = (df['date'] - df['date'].dt.floor('D')).to_numpy()
+    focused = candidates[np.isin(time_of_day[candidates], np.unique(time_of_day[fired]))]
+    picked = set(rng.choice(focused, min(len(focused), samples // 2), replace=False).tolist())
+    rest = np.setdiff1d(candidates, list(picked))
+    picked.update(rng.choice(rest, min(len(rest), samples - len(picked)), replace=False).tolist())
+    return sorted(picked)
+
+
+def check_pair(strategy, base_provider, df, pair, samples, history, horizon, seed=0):
+    """
+    返回 (切点数, {列: {'cuts': 泄漏切点数, 'lead': 最大前视K线数, 'first': 示例时间}})
+    """
+    provider = TrimmedProvider(base_provider)
+    strategy.dp = provider
+    try:
+        cuts = sample_cuts(strategy, provider, df, pair, samples, history, horizon, seed)
+        leaks = {}
+        for cut in cuts:
+            lo = cut - history
+            truncated = _analyze(strategy, provider, df, lo, cut + 1, pair)
+            extended = _analyze(strategy, provider, df, lo, cut + 1 + horizon, pair)
+            changed = _changed(truncated, extended, cut - lo)
+            if not changed:
+                continue
+            leads = lead_distances(strategy, provider, df, lo, cut, horizon, extended, changed, pair)
+            for col, lead in leads.items():
+                entry = leaks.setdefault(col, {'cuts': 0, 'lead': 0, 'first': str(df['date'].iloc[cut])})
+                entry['cuts'] += 1
+                entry['lead'] = max(entry['lead'], lead)
+        return len(cuts), leaks
+    finally:
+        provider.start = provider.end = None
+        strategy.dp = base_provider
+
+
+def main():
+    parser = argparse.ArgumentParser(description='前视偏差抽样检测')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--strategy-path', help='策略目录，默认 user_data/strategies')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认白名单第一个')
+    parser.add_argument('--timerange', help='时间范围，如 20240101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--fixture', type=int, metavar='DAYS', help='使用指定天数的模拟K线')
+    parser.add_argument('--samples', type=int, default=30, help='每个交易对抽样的切点数')
+    parser.add_argument('--history', type=int, help='切点之前的K线数，默认 startup_candle_count 的5倍（至少100）')
+    parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON, help='切点之后检查的K线数（可检出的最大前视距离）')
+    parser.add_argument('--seed', type=int, default=0, help='抽样随机种子')
+    args = parser.parse_args()
+
+    # 检测的是策略本身的逻辑，不受压缩/增量分析开关影响
+    for name in ('FT_STRATEGY_COMPACT', 'FT_STRATEGY_TAIL'):
+        os.environ.pop(name, None)
+    if str(STRATEGY_DIR) not in sys.path:
+        sys.path.insert(0, str(STRATEGY_DIR))
+
+    config = load_config(args.config)
+    strategy_name = args.strategy or config.get('strategy')
+    if not strategy_name:
+        parser.error('需要 --strategy 或配置中的strategy')
+    pairs = args.pairs or config_pairs(config)[:1]
+    timeframe = config.get('timeframe', '1h')
+    if args.fixture:
+        from benchmark_fixtures import FixtureDataProvider
+        provider = FixtureDataProvider(config_pairs(config), timeframe, args.fixture)
+    else:
+        provider = LocalDataProvider(config, config_pairs(config), args.datadir, args.timerange)
+    strategy = load_strategy(strategy_name, config, provider, args.strategy_path or STRATEGY_DIR)
+    timeframe = strategy.timeframe
+    history = args.history or max(100, 5 * int(getattr(strategy, 'startup_candle_count', 0) or 0))
+
+    print(f"🔍 {strategy_name} ({timeframe})  每个切点: 之前 {history} 根, 之后最多 {args.horizon} 根")
+    found = False
+    for pair in pairs:
+        df = provider.get_pair_dataframe(pair, timeframe)
+        if len(df) <= history + args.horizon + 1:
+            print(f"⚠️  {pair}: K线不足 {history + args.horizon + 2} 根")
+            continue
+        started = time.perf_counter()
+        cuts, leaks = check_pair(strategy, provider, df, pair, args.samples, history, args.horizon, args.seed)
+        elapsed = time.perf_counter() - started
+        if not leaks:
+            print(f"✅ {pair}: {cuts} 个切点未发现前视 ({elapsed:.1f}秒)")
+            continue
+        found = True
+        print(f"❌ {pair}: {len(leaks)} 列使用了未来K线 ({cuts} 个切点, {elapsed:.1f}秒)")
+        print(f"   {'列':<28}{'泄漏切点':>10}{'前视K线':>9}  示例")
+        for col, entry in sorted(leaks.items(), key=lambda item: (-item[1]['lead'], str(item[0]))):
+            mark = '🚨' if col in SIGNAL_COLUMNS else '  '
+            lead = f"{entry['lead']}" if entry['lead'] < args.horizon else f"≥{args.horizon}"
+            print(f" {mark}{str(col):<28}{entry['cuts']:>6}/{cuts:<3}{lead:>9}  {entry['first']}")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+列式K线存储
+每个 交易对/时间框架 一个目录，每列一个定长二进制文件（date为int64毫秒，其余为float64，小端），
+meta.json 记录行数。可以用 np.memmap 零拷贝加载，追加新K线时只在列文件末尾写入，不重写已有数据。
+
+目录结构: user_data/data/<交易所>/columnar/<K线类型>/<交易对文件名>-<时间框架>/
+    date.i8  open.f8  high.f8  low.f8  close.f8  volume.f8  meta.json
+
+读取K线的本地工具（freqtrade_data.load_pair_history）在列式数据存在且不比json旧时优先使用它；
+freqtrade本身仍读取json文件。
+
+使用示例:
+    # 把配置对应交易所的json K线全部转换为列式存储
+    python scripts/local/ohlcv_store.py migrate --config config/eightpm_backtest.json
+
+    # 查看已转换的序列 / 对比json与列式存储的加载耗时
+    python scripts/local/ohlcv_store.py info --config config/eightpm_backtest.json
+    python scripts/local/ohlcv_store.py bench --config config/eightpm_backtest.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from freqtrade_data import (
+    OHLCV_COLUMNS, candle_file, candle_type_of, config_pairs, dates_to_ms, exchange_data_dir,
+    load_config, ohlcv_from_rows, pair_to_filename, parse_timerange, read_candle_rows,
+)
+
+
+STORE_DIRNAME = 'columnar'
+STORE_VERSION = 1
+
+# 列名 -> (文件名, dtype)
+COLUMN_FILES = {
+    'date': ('date.i8', np.dtype('<i8')),
+    'open': ('open.f8', np.dtype('<f8')),
+    'high': ('high.f8', np.dtype('<f8')),
+    'low': ('low.f8', np.dtype('<f8')),
+    'close': ('close.f8', np.dtype('<f8')),
+    'volume': ('volume.f8', np.dtype('<f8')),
+}
+VALUE_COLUMNS = OHLCV_COLUMNS[1:]
+
+
+def series_dir(datadir, pair, timeframe, candle_type='spot'):
+    return Path(datadir) / STORE_DIRNAME / (candle_type or 'spot') / f"{pair_to_filename(pair)}-{timeframe}"
+
+
+def rows_to_columns(rows):
+    """freqtrade K线数组 -> (int64时间戳, {列名: float64数组})，按时间排序去重（保留最后一条）"""
+    arr = np.asarray(rows, dtype='float64').reshape(-1, 6)
+    ts = arr[:, 0].astype('int64')
+    # 反转后取首次出现即为原数据中的最后一条
+    _, idx = np.unique(ts[::-1], return_index=True)
+    idx = len(ts) - 1 - idx
+    return ts[idx], {col: arr[idx, i + 1] for i, col in enumerate(VALUE_COLUMNS)}
+
+
+class ColumnarSeries:
+    """单个 交易对/时间框架 的列式存储"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._meta = None
+
+    @property
+    def meta_path(self):
+        return self.path / 'meta.json'
+
+    def exists(self):
+        return self.meta_path.exists()
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self._meta = json.load(f)
+        return self._meta
+
+    @property
+    def rows(self):
+        return self.meta['rows'] if self.exists() else 0
+
+    def _write_meta(self, meta, path=None):
+        path = Path(path or self.path)
+        tmp = path / 'meta.json.tmp'
+        tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, path / 'meta.json')
+        self._meta = meta
+
+    def _new_meta(self, ts, source=None):
+        return {
+            'version': STORE_VERSION,
+            'rows': int(len(ts)),
+            'first': int(ts[0]) if len(ts) else None,
+            'last': int(ts[-1]) if len(ts) else None,
+            'columns': {c: [f, d.str] for c, (f, d) in COLUMN_FILES.items()},
+            'source': source,
+        }
+
+    def write(self, ts, values, source=None):
+        """整体写入（先写临时目录再替换），ts需已排序且唯一"""
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        columns = dict(values, date=ts)
+        for col, (name, dtype) in COLUMN_FILES.items():
+            np.ascontiguousarray(columns[col], dtype=dtype).tofile(tmp / name)
+        meta = self._new_meta(ts, source)
+        if self.exists() and self.meta.get('empty_ranges'):
+            # 数据源确认没有数据的区间与文件内容无关，重写时保留
+            meta['empty_ranges'] = self.meta['empty_ranges']
+        self._write_meta(meta, tmp)
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        tmp.rename(self.path)
+        self._meta = None
+
+    def append(self, ts, values, source=None):
+        """
+        只追加时间晚于最后一根K线的数据，已有的列文件不重写
+        先写列文件再更新meta中的行数，中途中断时多写的尾部会被忽略并在下次追加时截掉
+        """
+        if not self.exists():
+            self.write(ts, values, source)
+            return len(ts)
+        meta = self.meta
+        keep = ts > meta['last'] if meta['last'] is not None else np.ones(len(ts), dtype=bool)
+        if not keep.any():
+            return 0
+        columns = dict(values, date=ts)
+        for col, (name, dtype) in COLUMN_FILES.items():
+            path = self.path / name
+            with open(path, 'r+b') as f:
+                f.truncate(meta['rows'] * dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                np.ascontiguousarray(columns[col][keep], dtype=dtype).tofile(f)
+        new_ts = ts[keep]
+        meta = dict(meta, rows=meta['rows'] + int(len(new_ts)), last=int(new_ts[-1]))
+        if meta['first'] is None:
+            meta['first'] = int(new_ts[0])
+        if source is not None:
+            meta['source'] = source
+        self._write_meta(meta)
+        return int(len(new_ts))
+
+    def update_tail(self, ts, values):
+        """原位覆盖已存在的尾部K线（例如未收盘K线的更新），返回覆盖的行数"""
+        if not self.exists() or not len(ts):
+            return 0
+        stored = self.arrays()['date']
+        pos = np.searchsorted(stored, ts)
+        hit = (pos < len(stored)) & (stored[np.minimum(pos, len(stored) - 1)] == ts)
+        if not hit.any():
+            return 0
+        columns = dict(values, date=ts)
+        for col, (name, dtype) in COLUMN_FILES.items():
+            if col == 'date':
+                continue
+            mm = np.memmap(self.path / name, dtype=dtype, mode='r+', shape=(self.rows,))
+            mm[pos[hit]] = columns[col][hit]
+            mm.flush()
+            del mm
+        return int(hit.sum())
+
+    def merge(self, ts, values, source=None):
+        """
+        合并新K线：已有时间戳原位覆盖，晚于末尾的追加；
+        只有新数据落在已有数据中间的缺口里时才整体重写
+        返回 (覆盖行数, 追加行数, 是否重写)
+        """
+        if not self.exists():
+            self.write(ts, values, source)
+            return 0, int(len(ts)), True
+        stored = self.arrays()['date']
+        last = stored[-1] if len(stored) else None
+        newer = ts > last if last is not None else np.ones(len(ts), dtype=bool)
+        older = ~newer
+        known = np.isin(ts[older], stored)
+        if not known.all():
+            frame = self.dataframe()
+            extra = pd.DataFrame(dict(values, date=ts))
+            extra['date'] = pd.to_datetime(extra['date'], unit='ms', utc=True)
+            merged = pd.concat([frame, extra[OHLCV_COLUMNS]]).drop_duplicates('date', keep='last')
+            merged = merged.sort_values('date')
+            self.write(dates_to_ms(merged['date']),
+                       {c: merged[c].to_numpy('float64') for c in VALUE_COLUMNS}, source)
+            return int(known.sum()), int((~known).sum() + newer.sum()), True
+        overwritten = self.update_tail(ts[older], {c: v[older] for c, v in values.items()})
+        appended = self.append(ts[newer], {c: v[newer] for c, v in values.items()}, source)
+        if source is not None and not appended:
+            self.mark_source(source)
+        return overwritten, appended, False
+
+    def mark_source(self, source):
+        """记录当前数据对应的json文件（大小/修改时间），用于判断是否过期"""
+        self._write_meta(dict(self.meta, source=source))
+
+    def mark_empty(self, ranges):
+        """记录数据源已请求过但没有数据的区间 [[起点ms, 终点ms), ...]，与已有记录合并"""
+        merged = []
+        for start, end in sorted([*self.meta.get('empty_ranges', []), *ranges]):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([int(start), int(end)])
+        if merged == self.meta.get('empty_ranges'):
+            return
+        self._write_meta(dict(self.meta, empty_ranges=merged))
+
+    def arrays(self, start_ms=None, end_ms=None, mode='r'):
+        """列名 -> np.memmap（零拷贝），按时间范围切片仍是同一块内存的视图"""
+        rows = self.rows
+        result = {}
+        for col, (name, dtype) in COLUMN_FILES.items():
+            if rows == 0:
+                result[col] = np.empty(0, dtype=dtype)
+            else:
+                result[col] = np.memmap(self.path / name, dtype=dtype, mode=mode, shape=(rows,))
+        if start_ms is not None or end_ms is not None:
+            ts = result['date']
+            lo = np.searchsorted(ts, start_ms, 'left') if start_ms is not None else 0
+            hi = np.searchsorted(ts, end_ms, 'left') if end_ms is not None else len(ts)
+            result = {col: arr[lo:hi] for col, arr in result.items()}
+        return result
+
+    def dataframe(self, start_ms=None, end_ms=None):
+        """freqtrade风格DataFrame；价格和成交量列直接引用memmap，不复制"""
+        arrays = self.arrays(start_ms, end_ms)
+        columns = {'date': pd.to_datetime(np.asarray(arrays['date']), unit='ms', utc=True)}
+        columns.update({col: arrays[col] for col in VALUE_COLUMNS})
+        return pd.DataFrame(columns, copy=False)
+
+
+def export_json(series, path):
+    """列式数据写出为freqtrade json K线文件（先写临时文件再替换）"""
+    path = Path(path)
+    arrays = series.arrays()
+    rows = np.column_stack([np.asarray(arrays['date'], dtype='float64')] +
+                           [arrays[c] for c in VALUE_COLUMNS]).tolist()
+    for row in rows:
+        row[0] = int(row[0])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(rows), encoding='utf-8')
+    os.replace(tmp, path)
+    return path
+
+
+def source_info(path):
+    stat = Path(path).stat()
+    return {'file': Path(path).name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def is_fresh(series, json_path):
+    """列式数据是否由当前的json文件转换而来（json被freqtrade更新后视为过期）"""
+    if not series.exists():
+        return False
+    if json_path is None or not Path(json_path).exists():
+        return True
+    source = series.meta.get('source') or {}
+    stat = Path(json_path).stat()
+    return source.get('size') == stat.st_size and source.get('mtime_ns') == stat.st_mtime_ns
+
+
+def load_series(datadir, pair, timeframe, candle_type='spot', start_ms=None, end_ms=None,
+                require_fresh=True):
+    """读取列式数据，不存在或已过期时返回None"""
+    series = ColumnarSeries(series_dir(datadir, pair, timeframe, candle_type))
+    if not series.exists():
+        return None
+    if require_fresh and not is_fresh(series, candle_file(datadir, pair, timeframe, candle_type)):
+        return None
+    return series.dataframe(start_ms, end_ms)
+
+
+def migrate_file(datadir, pair, timeframe, candle_type='spot', force=False):
+    """json -> 列式，已是最新时跳过；返回写入的行数（跳过时为None）"""
+    path = candle_file(datadir, pair, timeframe, candle_type)
+    if path is None:
+        raise FileNotFoundError(f"没有 {pair} {timeframe} 的json数据")
+    series = ColumnarSeries(series_dir(datadir, pair, timeframe, candle_type))
+    if not force and is_fresh(series, path):
+        return None
+    ts, values = rows_to_columns(read_candle_rows(path))
+    series.write(ts, values, source_info(path))
+    return len(ts)
+
+
+def _format_ts(ms):
+    if ms is None:
+        return '-'
+    return pd.Timestamp(ms, unit='ms', tz='UTC').strftime('%Y-%m-%d %H:%M')
+
+
+def _series_args(parser):
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--timeframes', nargs='+', help='时间框架，默认使用配置中的timeframe')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+
+
+def _selected(args):
+    config = load_config(args.config)
+    datadir = exchange_data_dir(config, args.datadir)
+    pairs = args.pairs or config_pairs(config)
+    timeframes = args.timeframes or [config.get('timeframe', '1h')]
+    return datadir, pairs, timeframes, candle_type_of(config)
+
+
+def bench_load(datadir, pair, timeframe, candle_type, repeat=3):
+    """返回 (json加载秒数, 列式加载秒数, 行数)，均取最短耗时"""
+    path = candle_file(datadir, pair, timeframe, candle_type)
+    series = ColumnarSeries(series_dir(datadir, pair, timeframe, candle_type))
+
+    def best(load):
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            df = load()
+            # 触碰数据，避免memmap的延迟读取让计时失真
+            float(df['close'].sum())
+            times.append(time.perf_counter() - started)
+        return min(times), len(df)
+
+    json_time, rows = best(lambda: ohlcv_from_rows(read_candle_rows(path)))
+    store_time, _ = best(series.dataframe)
+    return json_time, store_time, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列式K线存储')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('migrate', help='把json K线转换为列式存储')
+    _series_args(p)
+    p.add_argument('--force', action='store_true', help='即使已是最新也重新转换')
+    p = sub.add_parser('info', help='查看列式存储中的序列')
+    _series_args(p)
+    p = sub.add_parser('bench', help='对比json与列式存储的加载耗时')
+    _series_args(p)
+    p.add_argument('--repeat', type=int, default=3, help='重复次数')
+    p.add_argument('--timerange', help='只加载该时间范围（列式存储按二分查找切片）')
+    args = parser.parse_args()
+
+    datadir, pairs, timeframes, candle_type = _selected(args)
+
+    if args.command == 'migrate':
+        for pair in pairs:
+            for timeframe in timeframes:
+                try:
+                    rows = migrate_file(datadir, pair, timeframe, candle_type, args.force)
+                except FileNotFoundError as e:
+                    print(f"⚠️  {e}")
+                    continue
+                if rows is None:
+                    print(f"⏭️  {pair} {timeframe} 已是最新")
+                else:
+                    print(f"✅ {pair} {timeframe}: {rows} 根K线")
+
+    elif args.command == 'info':
+        print(f"{'序列':<40}{'K线数':>10}{'开始':>18}{'结束':>18}{'大小MB':>9}  状态")
+        for pair in pairs:
+            for timeframe in timeframes:
+                series = ColumnarSeries(series_dir(datadir, pair, timeframe, candle_type))
+                if not series.exists():
+                    print(f"{pair + ' ' + timeframe:<40}{'-':>10}  未转换")
+                    continue
+                meta = series.meta
+                size = sum(p.stat().st_size for p in series.path.iterdir()) / 1024 / 1024
+                fresh = is_fresh(series, candle_file(datadir, pair, timeframe, candle_type))
+                print(f"{pair + ' ' + timeframe:<40}{meta['rows']:>10}{_format_ts(meta['first']):>18}"
+                      f"{_format_ts(meta['last']):>18}{size:>9.2f}  {'最新' if fresh else 'json已更新，需重新转换'}")
+
+    elif args.command == 'bench':
+        print(f"{'序列':<40}{'K线数':>10}{'json(s)':>10}{'列式(s)':>10}{'加速':>8}")
+        total_json = total_store = 0.0
+        for pair in pairs:
+            for timeframe in timeframes:
+                if candle_file(datadir, pair, timeframe, candle_type) is None:
+                    continue
+                migrate_file(datadir, pair, timeframe, candle_type)
+                json_time, store_time, rows = bench_load(datadir, pair, timeframe, candle_type,
+                                                         args.repeat)
+                total_json += json_time
+                total_store += store_time
+                print(f"{pair + ' ' + timeframe:<40}{rows:>10}{json_time:>10.4f}{store_time:>10.4f}"
+                      f"{json_time / store_time if store_time else float('inf'):>7.1f}x")
+        if total_store:
+            print(f"{'合计':<40}{'':>10}{total_json:>10.4f}{total_store:>10.4f}"
+                  f"{total_json / total_store:>7.1f}x")
+        if args.timerange:
+            start_ms, end_ms = parse_timerange(args.timerange)
+            started = time.perf_counter()
+            for pair in pairs:
+                for timeframe in timeframes:
+                    load_series(datadir, pair, timeframe, candle_type, start_ms, end_ms)
+            print(f"\n按时间范围 {args.timerange} 切片加载全部序列: {time.perf_counter() - started:.4f}秒")
+
+
+if __name__ == "__main__":
+    main()
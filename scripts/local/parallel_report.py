@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+按交易对并行分析对比
+用 user_data/strategies/parallel_analysis.py 的调度对白名单交易对分别以 逐个 / 线程池 / 进程池
+方式执行完整分析（指标 -> 入场 -> 出场），报告耗时、相对逐个执行的加速比，
+并检查并行结果与逐个执行逐列一致、交易对顺序不变。
+
+使用示例:
+    python scripts/local/parallel_report.py --config config/eightpm_backtest.json \\
+        --strategy EightPMHighLowStrategy --timerange 20240101-20241231
+
+    # 无本地数据时用两年的模拟K线，4个并行
+    python scripts/local/parallel_report.py --config config/base.json --strategy OneFiveTrendHTF \\
+        --fixture 730 --workers 4
+
+在freqtrade中启用: FT_STRATEGY_PARALLEL=1 freqtrade backtesting ...
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from freqtrade_data import (
+    STRATEGY_DIR, LocalDataProvider, analyze_pair, config_pairs, load_config, load_strategy,
+)
+
+
+def timed_run(run_pairs, strategy, frames, mode, workers, repeat):
+    """返回 (按交易对顺序的分析结果, 最短耗时秒)"""
+    items = [(strategy, df, pair) for pair, df in frames.items()]
+    best, results = None, None
+    for _ in range(repeat):
+        inputs = [(s, df.copy(), pair) for s, df, pair in items]
+        started = time.perf_counter()
+        results = run_pairs(analyze_pair, inputs, mode, workers)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return results, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按交易对并行分析对比')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--strategy-path', help='策略目录，默认 user_data/strategies')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--timerange', help='时间范围，如 20240101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--fixture', type=int, metavar='DAYS', help='使用指定天数的模拟K线')
+    parser.add_argument('--modes', nargs='+', default=['threads', 'processes'],
+                        choices=['threads', 'processes'], help='对比的并行方式')
+    parser.add_argument('--workers', type=int, help='并行数，默认 min(CPU核数, 交易对数)')
+    parser.add_argument('--repeat', type=int, default=1, help='每种方式重复次数，取最短耗时')
+    args = parser.parse_args()
+
+    # 对照组逐个执行，不受策略上并行装饰器的影响
+    os.environ.pop('FT_STRATEGY_PARALLEL', None)
+    if str(STRATEGY_DIR) not in sys.path:
+        sys.path.insert(0, str(STRATEGY_DIR))
+    from parallel_analysis import analysis_mode, default_workers, fork_context, run_pairs
+
+    config = load_config(args.config)
+    strategy_name = args.strategy or config.get('strategy')
+    if not strategy_name:
+        parser.error('需要 --strategy 或配置中的strategy')
+    pairs = args.pairs or config_pairs(config)
+    timeframe = config.get('timeframe', '1h')
+    if args.fixture:
+        from benchmark_fixtures import FixtureDataProvider
+        provider = FixtureDataProvider(pairs, timeframe, args.fixture)
+    else:
+        provider = LocalDataProvider(config, pairs, args.datadir, args.timerange)
+    strategy = load_strategy(strategy_name, config, provider, args.strategy_path or STRATEGY_DIR)
+    frames = {pair: provider.get_pair_dataframe(pair, strategy.timeframe) for pair in pairs}
+    frames = {pair: df for pair, df in frames.items() if not df.empty}
+    if not frames:
+        print('❌ 没有K线数据')
+        sys.exit(1)
+    # informative数据预先加载，避免首次访问的读盘计入第一种方式
+    for pair in frames:
+        for _, informative_tf in getattr(strategy, 'informative_pairs', lambda: [])() or []:
+            provider.get_pair_dataframe(pair, informative_tf)
+
+    workers = default_workers(len(frames), args.workers)
+    rows = sum(len(df) for df in frames.values())
+    print(f"⚡ {strategy_name}  {len(frames)} 个交易对, {rows:,} 行, {workers} 个并行, "
+          f"策略默认方式: {analysis_mode(strategy, 'auto')}")
+    if 'processes' in args.modes and fork_context() is None:
+        print("⚠️  当前平台不支持fork，processes 实际使用线程池")
+
+    expected, serial_s = timed_run(run_pairs, strategy, frames, 'serial', 1, args.repeat)
+    print(f"{'方式':<12}{'耗时s':>9}{'加速':>8}  结果")
+    print(f"{'serial':<12}{serial_s:>9.2f}{1.0:>7.1f}x  基准")
+    failed = False
+    for mode in args.modes:
+        results, elapsed = timed_run(run_pairs, strategy, frames, mode, workers, args.repeat)
+        same = len(results) == len(expected) and all(a.equals(b) for a, b in zip(results, expected))
+        failed |= not same
+        print(f"{mode:<12}{elapsed:>9.2f}{serial_s / max(elapsed, 1e-9):>7.1f}x  "
+              f"{'✅ 一致' if same else '❌ 不一致'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
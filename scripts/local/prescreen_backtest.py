@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+向量化预筛选回测
+直接使用 user_data/strategies 中策略生成的 enter_long / enter_short / exit_long 信号，
+按freqtrade的规则（信号后一根K线开盘入场、止损优先于ROI、出场信号按开盘价成交）
+模拟 stoploss / minimal_roi / 移动止损 / max_open_trades，快速估算各交易对的收益、胜率和回撤。
+
+每笔交易的出场点用向量化的"首次触发"查找完成，不再逐K线循环，
+适合每天筛选几十个策略变体；结果与真实freqtrade回测的偏差可以用 --parity 量化。
+出场查找默认使用 kernels.py 的内核逐K线扫描（扫到出场即停，未编译时也比分块向量化快），安装numba时编译执行；
+结果与向量化查找一致（kernels.py --check 核对），FT_KERNELS=numpy 时改回向量化查找。
+
+使用示例:
+    python scripts/local/prescreen_backtest.py \\
+        --config config/eightpm_backtest.json \\
+        --strategies EightPMHighLowStrategy \\
+        --timerange 20240101-20241231 \\
+        --parity user_data/backtest_results/eightpm_result.zip
+"""
+
+import argparse
+import heapq
+import json
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from backtest_results import (
+    format_metrics_table, load_backtest_result,
+    metrics_per_pair, strategy_section, trades_dataframe,
+)
+from freqtrade_data import (
+    LocalDataProvider, analyze_pair, config_pairs, dates_to_ms, load_config,
+    load_strategy, parse_timerange,
+)
+from kernels import EXIT_KERNEL, EXIT_REASONS, prescreen_exit
+
+
+# 预筛选引擎不模拟的策略回调，存在时会在对比报告中提示
+UNMODELED_CALLBACKS = ['custom_exit', 'custom_stoploss', 'custom_stake_amount',
+                       'custom_entry_price', 'custom_exit_price', 'adjust_trade_position',
+                       'confirm_trade_entry', 'confirm_trade_exit']
+
+# 对比报告的可信度阈值
+PARITY_MIN_ENTRY_MATCH = 0.90
+PARITY_MAX_PROFIT_ERROR_PCT = 1.0
+
+
+@dataclass
+class PairArrays:
+    """单个交易对的回测数组，信号已按freqtrade规则后移一根K线"""
+    pair: str
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    enter_long: np.ndarray
+    enter_short: np.ndarray
+    exit_long: np.ndarray
+    exit_short: np.ndarray
+    first_index: int
+
+
+def _shifted_signal(df, column):
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    values = df[column].fillna(0).to_numpy(dtype='float64') == 1
+    shifted = np.zeros(len(values), dtype=bool)
+    shifted[1:] = values[:-1]
+    return shifted
+
+
+def prepare_pair_arrays(pair, df, start_ms=None):
+    ts = dates_to_ms(df['date'])
+    first_index = int(np.searchsorted(ts, start_ms)) if start_ms is not None else 0
+    return PairArrays(
+        pair=pair,
+        ts=ts,
+        open=df['open'].to_numpy(dtype='float64'),
+        high=df['high'].to_numpy(dtype='float64'),
+        low=df['low'].to_numpy(dtype='float64'),
+        close=df['close'].to_numpy(dtype='float64'),
+        enter_long=_shifted_signal(df, 'enter_long'),
+        enter_short=_shifted_signal(df, 'enter_short'),
+        exit_long=_shifted_signal(df, 'exit_long'),
+        exit_short=_shifted_signal(df, 'exit_short'),
+        first_index=first_index,
+    )
+
+
+def overridden_callbacks(strategy):
+    """列出策略自己实现（而非继承自freqtrade）的回调"""
+    found = []
+    for name in UNMODELED_CALLBACKS:
+        for cls in type(strategy).__mro__:
+            if cls.__module__.startswith('freqtrade') or cls is object:
+                continue
+            if name in cls.__dict__:
+                found.append(name)
+                break
+    return found
+
+
+class PrescreenBacktester:
+    """向量化首次触发出场的预筛选回测引擎"""
+
+    def __init__(self, strategy, config, fee=0.0005, max_open_trades=None):
+        self.config = config
+        self.fee = fee
+        self.stoploss = float(strategy.stoploss)
+        roi = sorted((int(k), float(v)) for k, v in (strategy.minimal_roi or {}).items())
+        self.roi_minutes = np.array([k for k, _ in roi], dtype='float64')
+        self.roi_values = np.array([v for _, v in roi], dtype='float64')
+
+        self.trailing_stop = bool(getattr(strategy, 'trailing_stop', False))
+        self.trailing_stop_positive = getattr(strategy, 'trailing_stop_positive', None)
+        self.trailing_stop_positive_offset = float(getattr(strategy, 'trailing_stop_positive_offset', 0.0) or 0.0)
+        self.trailing_only_offset_is_reached = bool(getattr(strategy, 'trailing_only_offset_is_reached', False))
+        self.use_exit_signal = bool(getattr(strategy, 'use_exit_signal', True))
+        self.use_kernels = EXIT_KERNEL
+
+        can_short = bool(getattr(strategy, 'can_short', False))
+        self.allow_short = can_short and config.get('trading_mode', 'spot') != 'spot'
+
+        if max_open_trades is None:
+            max_open_trades = config.get('max_open_trades', -1)
+        self.max_open_trades = int(max_open_trades)
+        self.starting_balance = float(config.get('dry_run_wallet', 1000))
+
+        stake = config.get('stake_amount', 'unlimited')
+        if stake == 'unlimited':
+            slots = self.max_open_trades if self.max_open_trades > 0 else 1
+            stake = self.starting_balance * config.get('tradable_balance_ratio', 0.99) / slots
+        self.stake_amount = float(stake)
+
+    # ---------- 单笔交易出场 ----------
+
+    def _roi_rate(self, open_rate, elapsed_minutes, is_short):
+        """每根K线在当前持仓时长下触发ROI所需的价格（已含手续费），无ROI时为nan"""
+        if len(self.roi_minutes) == 0:
+            return np.full(len(elapsed_minutes), np.nan)
+        idx = np.searchsorted(self.roi_minutes, elapsed_minutes, side='right') - 1
+        roi = np.where(idx >= 0, self.roi_values[np.clip(idx, 0, None)], np.nan)
+        fee = self.fee
+        if is_short:
+            return open_rate * (1 - fee) * (1 - roi) / (1 + fee)
+        return open_rate * (1 + fee) * (1 + roi) / (1 - fee)
+
+    def _stop_levels(self, open_rate, favorable, is_short, carry_best, carry_stop):
+        """
+        逐K线止损价
+        移动止损按freqtrade的adjust_stop_loss规则：用K线有利极值更新，只朝有利方向移动
+        """
+        if is_short:
+            initial = open_rate * (1 - self.stoploss)
+        else:
+            initial = open_rate * (1 + self.stoploss)
+        if carry_stop is None:
+            carry_stop = initial
+
+        if not self.trailing_stop:
+            return np.full(len(favorable), carry_stop), carry_best, carry_stop
+
+        if is_short:
+            best = np.minimum.accumulate(np.minimum(favorable, carry_best))
+            best_profit = 1 - best / open_rate
+        else:
+            best = np.maximum.accumulate(np.maximum(favorable, carry_best))
+            best_profit = best / open_rate - 1
+
+        distance = np.full(len(best), -self.stoploss)
+        if self.trailing_stop_positive is not None:
+            reached = best_profit > self.trailing_stop_positive_offset
+            distance = np.where(reached, float(self.trailing_stop_positive), distance)
+            allowed = reached if self.trailing_only_offset_is_reached else np.ones(len(best), dtype=bool)
+        else:
+            allowed = np.ones(len(best), dtype=bool)
+
+        if is_short:
+            level = np.where(allowed, best * (1 + distance), np.inf)
+            stops = np.minimum(carry_stop, np.minimum.accumulate(level))
+        else:
+            level = np.where(allowed, best * (1 - distance), -np.inf)
+            stops = np.maximum(carry_stop, np.maximum.accumulate(level))
+        return stops, best[-1], stops[-1]
+
+    def find_exit(self, a, entry_idx, is_short):
+        """
+        从入场K线开始分块向量化查找首次出场
+        同一根K线内优先级与freqtrade一致：出场信号(开盘) > 止损 > ROI
+        """
+        if self.use_kernels:
+            return self.kernel_exit(a, entry_idx, is_short)
+        n = len(a.ts)
+        open_rate = a.open[entry_idx]
+        initial_stop = open_rate * (1 - self.stoploss) if is_short else open_rate * (1 + self.stoploss)
+        carry_best = open_rate
+        carry_stop = None
+        start = entry_idx
+        chunk = 256
+
+        while start < n:
+            end = min(n, start + chunk)
+            sl = slice(start, end)
+            idx = np.arange(start, end)
+            opens = a.open[sl]
+
+            if is_short:
+                favorable, adverse = a.low[sl], a.high[sl]
+                enter_sig, exit_sig = a.enter_short[sl], a.exit_short[sl]
+            else:
+                favorable, adverse = a.high[sl], a.low[sl]
+                enter_sig, exit_sig = a.enter_long[sl], a.exit_long[sl]
+
+            if self.use_exit_signal:
+                signal_hit = exit_sig & ~enter_sig & (idx > entry_idx)
+            else:
+                signal_hit = np.zeros(len(idx), dtype=bool)
+
+            stops, carry_best, carry_stop = self._stop_levels(
+                open_rate, favorable, is_short, carry_best, carry_stop)
+            stop_hit = adverse >= stops if is_short else adverse <= stops
+
+            elapsed = (a.ts[sl] - a.ts[entry_idx]) / 60000.0
+            roi_rate = self._roi_rate(open_rate, elapsed, is_short)
+            with np.errstate(invalid='ignore'):
+                roi_hit = favorable <= roi_rate if is_short else favorable >= roi_rate
+
+            events = signal_hit | stop_hit | roi_hit
+            if events.any():
+                k = int(np.argmax(events))
+                j = start + k
+                if signal_hit[k]:
+                    return j, opens[k], 'exit_signal'
+                if stop_hit[k]:
+                    stop = stops[k]
+                    # 开盘已越过止损价时按开盘价成交
+                    rate = max(opens[k], stop) if is_short else min(opens[k], stop)
+                    moved = not np.isclose(stop, initial_stop)
+                    return j, rate, 'trailing_stop_loss' if moved else 'stop_loss'
+                rate = roi_rate[k]
+                if j > entry_idx:
+                    rate = min(opens[k], rate) if is_short else max(opens[k], rate)
+                return j, rate, 'roi'
+
+            start = end
+            chunk *= 4
+
+        return n - 1, a.close[n - 1], 'force_exit'
+
+    def kernel_exit(self, a, entry_idx, is_short, exit_kernel=prescreen_exit):
+        """find_exit 的内核版本（kernels.prescreen_exit 逐K线扫描），返回值相同"""
+        if is_short:
+            enter_sig, exit_sig = a.enter_short, a.exit_short
+        else:
+            enter_sig, exit_sig = a.enter_long, a.exit_long
+        positive = self.trailing_stop_positive
+        j, rate, code = exit_kernel(
+            a.ts, a.open, a.high, a.low, a.close, enter_sig, exit_sig, entry_idx, is_short,
+            self.use_exit_signal, self.stoploss, self.trailing_stop,
+            np.nan if positive is None else float(positive), self.trailing_stop_positive_offset,
+            self.trailing_only_offset_is_reached, self.roi_minutes, self.roi_values, self.fee)
+        return int(j), rate, EXIT_REASONS[code]
+
+    def profit_ratio(self, open_rate, close_rate, is_short):
+        fee = self.fee
+        if is_short:
+            return 1 - close_rate * (1 + fee) / (open_rate * (1 - fee))
+        return close_rate * (1 - fee) / (open_rate * (1 + fee)) - 1
+
+    # ---------- 多交易对调度 ----------
+
+    def _candidates(self, arrays):
+        """所有交易对的入场候选 (时间, 交易对顺序, 行号, 是否做空)，按此顺序排序"""
+        columns = []
+        for order, a in enumerate(arrays):
+            longs = a.enter_long.copy()
+            shorts = a.enter_short.copy() if self.allow_short else np.zeros_like(longs)
+            both = longs & shorts
+            longs &= ~both
+            shorts &= ~both
+            for mask, is_short in ((longs, False), (shorts, True)):
+                rows = np.flatnonzero(mask)
+                rows = rows[rows >= a.first_index]
+                columns.append((a.ts[rows], np.full(len(rows), order), rows, np.full(len(rows), is_short)))
+        if not columns:
+            return []
+        ts, orders, rows, shorts = (np.concatenate(parts) for parts in zip(*columns))
+        # 与元组排序相同: 时间 -> 交易对顺序 -> 行号 -> 做多在前
+        order = np.lexsort((shorts, rows, orders, ts))
+        return list(zip(ts[order].tolist(), orders[order].tolist(), rows[order].tolist(),
+                        shorts[order].tolist()))
+
+    def run(self, analyzed, start_ms=None):
+        """
+        analyzed: {pair: 分析后的DataFrame}，按白名单顺序
+        返回freqtrade格式字段的交易DataFrame
+        """
+        arrays = [prepare_pair_arrays(pair, df, start_ms) for pair, df in analyzed.items() if len(df)]
+        busy_until = [-1] * len(arrays)
+        open_exits = []
+        trades = []
+
+        for ts, order, row, is_short in self._candidates(arrays):
+            if row <= busy_until[order]:
+                continue
+            while open_exits and open_exits[0] < ts:
+                heapq.heappop(open_exits)
+            if 0 < self.max_open_trades <= len(open_exits):
+                continue
+
+            a = arrays[order]
+            exit_idx, close_rate, reason = self.find_exit(a, row, is_short)
+            busy_until[order] = exit_idx
+            heapq.heappush(open_exits, a.ts[exit_idx])
+
+            open_rate = a.open[row]
+            ratio = self.profit_ratio(open_rate, close_rate, is_short)
+            trades.append({
+                'pair': a.pair,
+                'is_short': is_short,
+                'open_timestamp': int(a.ts[row]),
+                'close_timestamp': int(a.ts[exit_idx]),
+                'open_rate': float(open_rate),
+                'close_rate': float(close_rate),
+                'profit_ratio': float(ratio),
+                'profit_abs': float(ratio * self.stake_amount),
+                'exit_reason': reason,
+            })
+
+        result = pd.DataFrame(trades, columns=[
+            'pair', 'is_short', 'open_timestamp', 'close_timestamp', 'open_rate',
+            'close_rate', 'profit_ratio', 'profit_abs', 'exit_reason'])
+        result['open_date'] = pd.to_datetime(result['open_timestamp'], unit='ms', utc=True)
+        result['close_date'] = pd.to_datetime(result['close_timestamp'], unit='ms', utc=True)
+        return result.sort_values(['open_timestamp', 'pair']).reset_index(drop=True)
+
+
+def analyze_strategy(strategy, provider, pairs):
+    """逐交易对执行策略分析，并把结果登记到数据提供者（供custom_exit等读取）"""
+    analyzed = {}
+    for pair in pairs:
+        df = provider.get_pair_dataframe(pair, strategy.timeframe)
+        if df.empty:
+            print(f"⚠️  {pair} 无 {strategy.timeframe} 数据，跳过")
+            continue
+        df = analyze_pair(strategy, df, pair)
+        provider.set_analyzed_dataframe(pair, strategy.timeframe, df)
+        analyzed[pair] = df
+    return analyzed
+
+
+def parity_report(pre_trades, ft_trades, starting_balance, pairs, callbacks=()):
+    """
+    预筛选结果与freqtrade真实回测的对比
+    - 入场匹配率: freqtrade交易中，预筛选在同一交易对同一时间也开仓的比例
+    - 出场一致率: 匹配交易中出场时间相同的比例
+    - 收益误差: 每个交易对收益百分比的差值
+    """
+    pre = metrics_per_pair(pre_trades, starting_balance, pairs)
+    ft = metrics_per_pair(ft_trades, starting_balance, pairs)
+
+    rows = {}
+    for pair in list(pairs) + ['TOTAL']:
+        p, f = pre[pair], ft[pair]
+        rows[pair] = {
+            'trades_prescreen': p['trades'],
+            'trades_freqtrade': f['trades'],
+            'profit_pct_prescreen': p['profit_total_pct'],
+            'profit_pct_freqtrade': f['profit_total_pct'],
+            'profit_pct_error': p['profit_total_pct'] - f['profit_total_pct'],
+            'winrate_error': p['winrate'] - f['winrate'],
+            'drawdown_error': p['max_drawdown_account'] - f['max_drawdown_account'],
+        }
+
+    matched = pd.DataFrame()
+    if len(pre_trades) and len(ft_trades):
+        matched = pd.merge(
+            ft_trades[['pair', 'open_date', 'close_date', 'profit_ratio']],
+            pre_trades[['pair', 'open_date', 'close_date', 'profit_ratio']],
+            on=['pair', 'open_date'], suffixes=('_ft', '_pre'),
+        )
+    entry_match = len(matched) / len(ft_trades) if len(ft_trades) else 1.0
+    entry_precision = len(matched) / len(pre_trades) if len(pre_trades) else 1.0
+    exit_match = float((matched['close_date_ft'] == matched['close_date_pre']).mean()) if len(matched) else 0.0
+    profit_mae = float((matched['profit_ratio_ft'] - matched['profit_ratio_pre']).abs().mean()) if len(matched) else 0.0
+
+    total_error = abs(rows['TOTAL']['profit_pct_error'])
+    trusted = entry_match >= PARITY_MIN_ENTRY_MATCH and total_error <= PARITY_MAX_PROFIT_ERROR_PCT
+    return {
+        'pairs': rows,
+        'entry_match_rate': entry_match,
+        'entry_precision': entry_precision,
+        'exit_match_rate': exit_match,
+        'matched_profit_ratio_mae': profit_mae,
+        'unmodeled_callbacks': list(callbacks),
+        'trusted': trusted,
+    }
+
+
+def print_parity(report):
+    print("\n=== 与freqtrade回测对比 ===")
+    print(f"{'交易对':<18}{'交易数(预/真)':>16}{'收益%(预/真)':>20}{'收益误差':>10}{'胜率误差':>10}")
+    for pair, r in report['pairs'].items():
+        print(f"{pair:<18}{r['trades_prescreen']:>8}/{r['trades_freqtrade']:<7}"
+              f"{r['profit_pct_prescreen']:>10.2f}/{r['profit_pct_freqtrade']:<9.2f}"
+              f"{r['profit_pct_error']:>+10.2f}{r['winrate_error']:>+10.1%}")
+    print(f"入场匹配率: {report['entry_match_rate']:.1%}  (预筛选入场准确率: {report['entry_precision']:.1%})")
+    print(f"出场一致率: {report['exit_match_rate']:.1%}")
+    print(f"匹配交易单笔收益平均绝对误差: {report['matched_profit_ratio_mae']:.4%}")
+    if report['unmodeled_callbacks']:
+        print(f"⚠️  未模拟的策略回调: {', '.join(report['unmodeled_callbacks'])}")
+    if report['trusted']:
+        print("✅ 误差在阈值内，可用预筛选结果做初筛")
+    else:
+        print(f"❌ 误差超出阈值 (入场匹配率 >= {PARITY_MIN_ENTRY_MATCH:.0%}, "
+              f"总收益误差 <= {PARITY_MAX_PROFIT_ERROR_PCT}个百分点)，请以freqtrade回测为准")
+
+
+def prescreen(strategy_name, config, pairs, timerange=None, datadir=None, fee=0.0005,
+              max_open_trades=None):
+    """对单个策略执行预筛选，返回 (策略实例, 交易DataFrame, 回测引擎)"""
+    start_ms, _ = parse_timerange(timerange)
+    provider = LocalDataProvider(config, pairs=pairs, datadir=datadir, timerange=timerange)
+    strategy = load_strategy(strategy_name, config, provider)
+    provider.startup_candles = int(getattr(strategy, 'startup_candle_count', 0))
+
+    analyzed = analyze_strategy(strategy, provider, pairs)
+    engine = PrescreenBacktester(strategy, config, fee=fee, max_open_trades=max_open_trades)
+    trades = engine.run(analyzed, start_ms)
+    return strategy, trades, engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description='向量化预筛选回测')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategies', nargs='+', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--timerange', help='时间范围 YYYYMMDD-YYYYMMDD')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--fee', type=float, default=0.0005, help='单边手续费率')
+    parser.add_argument('--max-open-trades', type=int, help='覆盖配置中的max_open_trades')
+    parser.add_argument('--parity', help='freqtrade回测结果(zip/json/目录)，用于误差对比')
+    parser.add_argument('--export', help='把结果写入json文件')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    pairs = args.pairs or config_pairs(config)
+    strategies = args.strategies or [config['strategy']]
+
+    exported = {}
+    for name in strategies:
+        started = time.perf_counter()
+        strategy, trades, engine = prescreen(
+            name, config, pairs, args.timerange, args.datadir, args.fee, args.max_open_trades)
+        elapsed = time.perf_counter() - started
+
+        rows = metrics_per_pair(trades, engine.starting_balance, pairs)
+        print(format_metrics_table(rows, f"{name} 预筛选结果 ({elapsed:.2f}秒)"))
+        entry = {'metrics': rows, 'elapsed_seconds': elapsed}
+
+        if args.parity:
+            result = load_backtest_result(args.parity)
+            ft_trades = trades_dataframe(strategy_section(result, name))
+            report = parity_report(trades, ft_trades, engine.starting_balance, pairs,
+                                   overridden_callbacks(strategy))
+            print_parity(report)
+            entry['parity'] = report
+        exported[name] = entry
+
+    if args.export:
+        with open(args.export, 'w', encoding='utf-8') as f:
+            json.dump(exported, f, ensure_ascii=False, indent=2, default=float)
+        print(f"\n结果已保存: {args.export}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+多时间框架派生
+从最低时间框架的K线派生更高时间框架（OneFiveTrendHTF 的 5m -> 15m、EightPM 的 1h -> 4h），
+只需同步和存储基础时间框架。聚合在int64时间戳上按桶向量化完成（reduceat），
+首尾不完整的K线桶默认丢弃（尚未收盘/数据起点在桶中间），内部因缺数据不完整的桶保留并计数。
+
+派生结果缓存在列式存储中（columnar/resampled/...），基础序列只追加新K线时只重算末尾的桶。
+本地工具加载K线时，如果某个时间框架没有数据文件，会自动从配置的基础时间框架派生。
+
+使用示例:
+    # 派生15m并写出freqtrade json，freqtrade回测无需单独下载15m
+    python scripts/local/resample.py derive --config config/base.json --timeframes 15m --write-json
+
+    # 与交易所提供的高时间框架K线对比
+    python scripts/local/resample.py parity --config config/base.json --timeframes 15m 1h
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from freqtrade_data import (
+    OHLCV_COLUMNS, candle_file, candle_file_candidates, candle_type_of, config_pairs,
+    dates_to_ms, exchange_data_dir, load_config, ohlcv_from_rows, pair_to_filename, read_candle_rows,
+    timeframe_to_ms,
+)
+from ohlcv_store import (
+    STORE_DIRNAME, VALUE_COLUMNS, ColumnarSeries, export_json, is_fresh, migrate_file, series_dir,
+)
+
+
+# 周线与交易所一致从周一开始（1970-01-01是周四）
+WEEK_OFFSET_MS = 4 * 86400 * 1000
+
+# 对比报告的容差：价格要求完全一致，成交量为浮点累加，允许相对误差
+PARITY_VOLUME_RTOL = 1e-9
+
+
+def bucket_starts(ts, timeframe):
+    """每根K线所属的高时间框架桶起点（毫秒）"""
+    tf_ms = timeframe_to_ms(timeframe)
+    offset = WEEK_OFFSET_MS if timeframe.endswith('w') else 0
+    return ts - (ts - offset) % tf_ms
+
+
+def resample_arrays(ts, values, base_timeframe, timeframe, partial='edges'):
+    """
+    OHLCV数组聚合到更高时间框架
+    ts: 已排序的int64毫秒时间戳; values: {open/high/low/close/volume: float64数组}
+    partial: 'edges' 丢弃首尾不完整的桶; 'all' 丢弃全部不完整的桶; 'none' 全部保留
+    返回 (桶起点, 聚合后的列, 每个桶的基础K线数, 是否完整)
+    """
+    base_ms, tf_ms = timeframe_to_ms(base_timeframe), timeframe_to_ms(timeframe)
+    if tf_ms % base_ms:
+        raise ValueError(f"{timeframe} 不是 {base_timeframe} 的整数倍")
+    per_bucket = tf_ms // base_ms
+    if len(ts) == 0:
+        empty = {col: np.empty(0) for col in VALUE_COLUMNS}
+        return np.empty(0, dtype='int64'), empty, np.empty(0, dtype='int64'), np.empty(0, dtype=bool)
+
+    buckets = bucket_starts(ts, timeframe)
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    counts = np.diff(np.concatenate([starts, [len(ts)]]))
+    ends = starts + counts - 1
+
+    out = {
+        'open': values['open'][starts],
+        'high': np.maximum.reduceat(values['high'], starts),
+        'low': np.minimum.reduceat(values['low'], starts),
+        'close': values['close'][ends],
+        'volume': np.add.reduceat(values['volume'], starts),
+    }
+    out_ts = buckets[starts]
+    complete = counts == per_bucket
+
+    keep = np.ones(len(starts), dtype=bool)
+    if partial == 'all':
+        keep = complete
+    elif partial == 'edges':
+        # 首桶只有在数据起点不在桶边界时才不完整；末桶可能尚未收盘
+        keep[0] = complete[0]
+        keep[-1] &= complete[-1]
+    elif partial != 'none':
+        raise ValueError(f"未知的partial参数: {partial}")
+
+    return out_ts[keep], {c: v[keep] for c, v in out.items()}, counts[keep], complete[keep]
+
+
+def resample_dataframe(df, base_timeframe, timeframe, partial='edges'):
+    """freqtrade风格DataFrame的派生版本"""
+    ts = dates_to_ms(df['date'])
+    values = {c: df[c].to_numpy('float64') for c in VALUE_COLUMNS}
+    out_ts, out, _, _ = resample_arrays(ts, values, base_timeframe, timeframe, partial)
+    result = pd.DataFrame(out)
+    result.insert(0, 'date', pd.to_datetime(out_ts, unit='ms', utc=True))
+    return result
+
+
+def derived_dir(datadir, pair, timeframe, base_timeframe, candle_type='spot'):
+    return Path(datadir) / STORE_DIRNAME / 'resampled' / (candle_type or 'spot') / \
+        f"{pair_to_filename(pair)}-{timeframe}-from-{base_timeframe}"
+
+
+def base_series(datadir, pair, base_timeframe, candle_type='spot'):
+    """基础时间框架的列式序列，json比列式数据新时先重新转换"""
+    series = ColumnarSeries(series_dir(datadir, pair, base_timeframe, candle_type))
+    json_path = candle_file(datadir, pair, base_timeframe, candle_type)
+    if json_path is not None and not is_fresh(series, json_path):
+        migrate_file(datadir, pair, base_timeframe, candle_type, force=True)
+        series = ColumnarSeries(series.path)
+    return series if series.exists() else None
+
+
+def derive_series(datadir, pair, timeframe, base_timeframe, candle_type='spot'):
+    """
+    派生并缓存高时间框架序列，返回 (缓存序列, 模式)
+    模式: 'cached' 无需更新, 'incremental' 只重算末尾的桶, 'full' 全量重算
+    """
+    base = base_series(datadir, pair, base_timeframe, candle_type)
+    if base is None:
+        return None, None
+    cache = ColumnarSeries(derived_dir(datadir, pair, timeframe, base_timeframe, candle_type))
+    base_ts = base.arrays()['date']
+    base_meta = base.meta
+
+    mode = 'full'
+    if cache.exists() and cache.meta.get('source'):
+        source = cache.meta['source']
+        if source['base_rows'] == base_meta['rows'] and source['base_last'] == base_meta['last'] \
+                and source['base_first'] == base_meta['first']:
+            return cache, 'cached'
+        # 基础序列只在末尾追加了K线时，可以从缓存的最后一个桶开始重算
+        idx = int(np.searchsorted(base_ts, source['base_last'], 'right'))
+        if source['base_first'] == base_meta['first'] and idx == source['base_rows'] \
+                and cache.rows and base_ts[idx - 1] == source['base_last']:
+            mode = 'incremental'
+
+    source = {'base_timeframe': base_timeframe, 'base_rows': base_meta['rows'],
+              'base_first': base_meta['first'], 'base_last': base_meta['last']}
+    arrays = base.arrays()
+    if mode == 'incremental':
+        last_bucket = int(cache.meta['last'])
+        lo = int(np.searchsorted(base_ts, last_bucket, 'left'))
+        ts = np.asarray(base_ts[lo:])
+        values = {c: np.asarray(arrays[c][lo:]) for c in VALUE_COLUMNS}
+        # 起点就是桶边界，首桶不会被当作不完整丢弃
+        out_ts, out, _, _ = resample_arrays(ts, values, base_timeframe, timeframe)
+        cache.merge(out_ts, out)
+        cache.mark_source(source)
+    else:
+        values = {c: np.asarray(arrays[c]) for c in VALUE_COLUMNS}
+        out_ts, out, _, _ = resample_arrays(np.asarray(base_ts), values, base_timeframe, timeframe)
+        cache.write(out_ts, out, source)
+        cache = ColumnarSeries(cache.path)
+    return cache, mode
+
+
+def load_resampled(datadir, pair, timeframe, base_timeframe, candle_type='spot',
+                   start_ms=None, end_ms=None):
+    """从基础时间框架派生的DataFrame，没有基础数据时返回None"""
+    cache, _ = derive_series(datadir, pair, timeframe, base_timeframe, candle_type)
+    if cache is None:
+        return None
+    return cache.dataframe(start_ms, end_ms)
+
+
+def write_derived_json(cache, datadir, pair, timeframe, candle_type='spot'):
+    """写出freqtrade json文件，让freqtrade回测直接使用派生的K线"""
+    return export_json(cache, candle_file_candidates(datadir, pair, timeframe, candle_type)[0])
+
+
+def parity(derived, exchange):
+    """
+    派生K线与交易所K线逐根对比（只比较两边都有的时间）
+    返回 {'common', 'only_derived', 'only_exchange', 'mismatched', 'max_abs_diff': {列: 值}}
+    """
+    merged = pd.merge(derived, exchange, on='date', suffixes=('_derived', '_exchange'))
+    result = {
+        'common': int(len(merged)),
+        'only_derived': int(len(derived) - len(merged)),
+        'only_exchange': int(len(exchange) - len(merged)),
+        'max_abs_diff': {},
+    }
+    mismatch = np.zeros(len(merged), dtype=bool)
+    for col in VALUE_COLUMNS:
+        a = merged[f"{col}_derived"].to_numpy('float64')
+        b = merged[f"{col}_exchange"].to_numpy('float64')
+        result['max_abs_diff'][col] = float(np.max(np.abs(a - b))) if len(merged) else 0.0
+        if col == 'volume':
+            mismatch |= ~np.isclose(a, b, rtol=PARITY_VOLUME_RTOL, atol=0.0)
+        else:
+            mismatch |= a != b
+    result['mismatched'] = int(mismatch.sum())
+    if mismatch.any():
+        result['first_mismatch'] = str(merged['date'][mismatch].iloc[0])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多时间框架派生')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('derive', '派生并缓存高时间框架'), ('parity', '与交易所K线对比')):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('--config', default='config/base.json', help='freqtrade配置文件')
+        p.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+        p.add_argument('--base', help='基础时间框架，默认使用配置中的timeframe')
+        p.add_argument('--timeframes', nargs='+', required=True, help='要派生的时间框架')
+        p.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    sub.choices['derive'].add_argument('--write-json', action='store_true',
+                                       help='同时写出freqtrade json文件')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    datadir = exchange_data_dir(config, args.datadir)
+    candle_type = candle_type_of(config)
+    pairs = args.pairs or config_pairs(config)
+    base = args.base or config.get('timeframe')
+    failed = False
+
+    for pair in pairs:
+        for timeframe in args.timeframes:
+            cache, mode = derive_series(datadir, pair, timeframe, base, candle_type)
+            if cache is None:
+                print(f"⚠️  {pair}: 没有 {base} 基础数据")
+                failed = True
+                continue
+
+            if args.command == 'derive':
+                line = f"✅ {pair:<18}{base} -> {timeframe:<5}{cache.rows:>8} 根  ({mode})"
+                if args.write_json:
+                    line += f"  -> {write_derived_json(cache, datadir, pair, timeframe, candle_type).name}"
+                print(line)
+                continue
+
+            path = candle_file(datadir, pair, timeframe, candle_type)
+            if path is None:
+                print(f"⚠️  {pair}: 没有交易所提供的 {timeframe} 数据，无法对比")
+                continue
+            exchange = ohlcv_from_rows(read_candle_rows(path))
+            report = parity(cache.dataframe(), exchange[OHLCV_COLUMNS])
+            ok = report['mismatched'] == 0
+            failed |= not ok
+            diffs = ', '.join(f"{c}={v:.3g}" for c, v in report['max_abs_diff'].items())
+            print(f"{'✅' if ok else '❌'} {pair:<18}{base} -> {timeframe:<5}"
+                  f"共同{report['common']:>7}  不一致{report['mismatched']:>5}  "
+                  f"仅派生{report['only_derived']:>5}  仅交易所{report['only_exchange']:>5}  最大差值: {diffs}")
+            if not ok:
+                print(f"     首个不一致: {report['first_mismatch']}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -41,12 +41,21 @@ echo ""
 echo "=== 运行回测 ==="
 mkdir -p user_data/backtest_results
 
-freqtrade backtesting \
-  --config config/eightpm_backtest.json \
-  --strategy EightPMHighLowStrategy \
-  --timerange $TIMERANGE \
-  --export trades \
-  --export-filename user_data/backtest_results/local_eightpm_result.json
+if [ "${NO_CACHE:-0}" = "1" ]; then
+    freqtrade backtesting \
+      --config config/eightpm_backtest.json \
+      --strategy EightPMHighLowStrategy \
+      --timerange $TIMERANGE \
+      --export trades \
+      --export-filename user_data/backtest_results/local_eightpm_result.json
+else
+    # 策略、配置、时间范围和数据都没变时直接使用缓存结果（NO_CACHE=1 可跳过缓存）
+    python scripts/local/backtest_cache.py run \
+      --config config/eightpm_backtest.json \
+      --strategy EightPMHighLowStrategy \
+      --timerange $TIMERANGE \
+      --results-dir user_data/backtest_results
+fi
 
 echo ""
 echo "=== 回测完成 ==="
@@ -97,4 +106,7 @@ echo "自定义参数运行："
 echo "./scripts/local/run_local_backtest.sh [时间范围] [交易对] [数据天数]"
 echo ""
 echo "示例："
-echo "./scripts/local/run_local_backtest.sh 20240101-20241231 \"ETH/USDT BTC/USDT\" 365"
\ No newline at end of file
+echo "./scripts/local/run_local_backtest.sh 20240101-20241231 \"ETH/USDT BTC/USDT\" 365"
+echo ""
+echo "跳过回测缓存："
+echo "NO_CACHE=1 ./scripts/local/run_local_backtest.sh"
\ No newline at end of file
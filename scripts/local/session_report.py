@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+8点入场条件稀疏计算对比（实验，策略不使用）
+EightPMHighLowStrategy 只在8点K线之后的确认K线上入场，入场条件（8点极值、成交量比、RSI、确认、均线距离）
+可以只在8点K线和候选确认K线上计算再写回整列（其余行为False）。本脚本在策略的子类中，对同一份指标分别按
+整列和稀疏两种方式重新计算这些条件并计时，分析结果使用稀疏计算的条件列；随后检查:
+- 整列计算与策略自己的条件列逐行一致（确认本脚本的条件与策略相同）
+- 稀疏计算的条件列和入场信号与策略逐行一致（near_sma 稀疏时只在候选行上有值，只对比候选行）
+
+实测（7个交易对 x 5年1h）: 条件计算合计 18.5 -> 15.0毫秒，完整分析约0.41秒，差别在测量波动之内，
+个别交易对（ADA）反而变慢（0.9倍）。逐行比较只剩约4%，剩下的主要是按列读写DataFrame的固定开销，
+收益抵不上分散/回写的间接层，所以策略保持整列计算。
+
+使用示例:
+    python scripts/local/session_report.py --config config/eightpm_backtest.json --timerange 20200101-20241231
+
+    # 无本地数据时用5年的模拟K线，确认窗口3根K线
+    python scripts/local/session_report.py --fixture 1825 --candles 3
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from freqtrade_data import STRATEGY_DIR, LocalDataProvider, analyze_pair, config_pairs, load_config, load_strategy
+
+# 与策略逐行对比的条件列和信号列
+CONDITION_COLUMNS = ['is_daily_high_at_8pm', 'is_daily_low_at_8pm', 'base_long', 'base_short',
+                     'confirmed_long', 'confirmed_short', 'near_sma']
+SIGNAL_COLUMNS = ['enter_long', 'enter_short']
+
+# 与 EightPMHighLowStrategy.populate_indicators 中按交易对的RSI阈值一致 (名称片段, 做多, 做空)；
+# 不一致时整列计算与策略的对比会失败
+RSI_THRESHOLDS = [('AVAX', 52, 48), ('ETH', 53, 47), ('SOL', 50, 50), ('ADA', 49, 51), ('DOT', 48, 52)]
+
+
+def rsi_thresholds(pair):
+    for name, long_threshold, short_threshold in RSI_THRESHOLDS:
+        if name in pair:
+            return long_threshold, short_threshold
+    return 50, 50
+
+
+def session_rows(is_session, lags):
+    """
+    (8点K线的行号, 候选确认行的行号)
+    候选行为各8点K线之后 lags 距离的行（超出末尾的丢弃），升序去重
+    """
+    is_session = np.asarray(is_session, dtype=bool)
+    session = np.flatnonzero(is_session)
+    candidate = np.zeros(len(is_session), dtype=bool)
+    for lag in lags:
+        candidate[session[session + lag < len(is_session)] + lag] = True
+    return session, np.flatnonzero(candidate)
+
+
+def scatter(n, rows, values, fill=False):
+    """把 rows 上计算的结果写回长度 n 的整列，其余行为 fill"""
+    values = np.asarray(values)
+    out = np.full(n, fill, dtype=np.result_type(values.dtype, np.min_scalar_type(fill)))
+    out[rows] = values
+    return out
+
+
+def entry_conditions(strategy, dataframe, pair, eight_rows, candidate_rows):
+    """
+    在 eight_rows（8点条件）和 candidate_rows（确认、均线距离）上计算入场条件，写回 dataframe 的整列
+    两者为 slice(None) 时即整列计算
+    """
+    from eightpm_signals import confirm_window, confirmation_lags
+
+    n = len(dataframe)
+    lags = confirmation_lags(1, strategy.confirmation_candles)
+    rsi_long_threshold, rsi_short_threshold = rsi_thresholds(pair)
+
+    def at(column, rows):
+        return dataframe[column].to_numpy()[rows]
+
+    is_8pm = at('is_8pm', eight_rows)
+    is_daily_high_at_8pm = is_8pm & (at('high', eight_rows) >= at('daily_high', eight_rows) * (1 - strategy.tolerance))
+    is_daily_low_at_8pm = is_8pm & (at('low', eight_rows) <= at('daily_low', eight_rows) * (1 + strategy.tolerance))
+    dataframe['is_daily_high_at_8pm'] = scatter(n, eight_rows, is_daily_high_at_8pm)
+    dataframe['is_daily_low_at_8pm'] = scatter(n, eight_rows, is_daily_low_at_8pm)
+
+    volume_ratio, rsi = at('volume_ratio', eight_rows), at('rsi', eight_rows)
+    base_long = [is_daily_low_at_8pm, volume_ratio > strategy.volume_threshold, rsi < rsi_long_threshold]
+    base_short = [is_daily_high_at_8pm, volume_ratio > strategy.volume_threshold, rsi > rsi_short_threshold]
+    if strategy.trend_confirmation and 'trend_4h_4h' in dataframe.columns:
+        trend = at('trend_4h_4h', eight_rows)
+        base_long.append(trend == 1)
+        base_short.append(trend == -1)
+    dataframe['base_long'] = scatter(n, eight_rows, np.logical_and.reduce(base_long))
+    dataframe['base_short'] = scatter(n, eight_rows, np.logical_and.reduce(base_short))
+
+    price_change = at('price_change_1h', candidate_rows)
+    dataframe['confirmed_long'] = confirm_window(
+        dataframe['base_long'].to_numpy(), scatter(n, candidate_rows, price_change > strategy.confirmation_threshold),
+        lags, strategy.confirmation_mode)
+    dataframe['confirmed_short'] = confirm_window(
+        dataframe['base_short'].to_numpy(), scatter(n, candidate_rows, price_change < -strategy.confirmation_threshold),
+        lags, strategy.confirmation_mode)
+
+    close, sma_20 = at('close', candidate_rows), at('sma_20', candidate_rows)
+    dataframe['near_sma'] = scatter(n, candidate_rows, abs(close - sma_20) / sma_20 < strategy.sma_range_pct)
+    return dataframe
+
+
+def session_strategy(base, repeat):
+    """策略的子类：populate_indicators 之后按整列/稀疏两种方式重新计算入场条件并计时，返回稀疏计算的结果"""
+
+    class SessionConditions(base):
+        results = {}
+
+        def populate_indicators(self, dataframe, metadata):
+            from eightpm_signals import confirmation_lags
+
+            dataframe = super().populate_indicators(dataframe, metadata)
+            pair = metadata['pair']
+            lags = confirmation_lags(1, self.confirmation_candles)
+            eight_rows, candidate_rows = session_rows(dataframe['is_8pm'].to_numpy(), lags)
+            timings = {}
+            for mode, rows in (('dense', (slice(None), slice(None))), ('sparse', (eight_rows, candidate_rows))):
+                best = None
+                for _ in range(repeat):
+                    frame = dataframe.copy()
+                    started = time.perf_counter()
+                    entry_conditions(self, frame, pair, *rows)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[mode] = (best, frame)
+            self.results[pair] = {
+                'evaluated': len(eight_rows) + len(candidate_rows),
+                'candidates': candidate_rows,
+                'dense_s': timings['dense'][0],
+                'sparse_s': timings['sparse'][0],
+                'dense': timings['dense'][1],
+            }
+            return timings['sparse'][1]
+
+    SessionConditions.__name__ = f"{base.__name__}Session"
+    return SessionConditions
+
+
+def different_column(a, b, columns, rows=None):
+    """第一个不一致的列名；rows 不为None时只对比这些行"""
+    for column in columns:
+        left = a[column].fillna(0).to_numpy(dtype='float64')
+        right = b[column].fillna(0).to_numpy(dtype='float64')
+        if rows is not None:
+            left, right = left[rows], right[rows]
+        if not np.array_equal(left, right):
+            return column
+    return None
+
+
+def timed_analysis(strategy, df, pair, repeat):
+    """返回 (分析结果, 完整分析最短耗时秒)"""
+    best, result = None, None
+    for _ in range(repeat):
+        frame = df.copy()
+        started = time.perf_counter()
+        result = analyze_pair(strategy, frame, pair)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='8点入场条件稀疏计算对比')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', default='EightPMHighLowStrategy', help='策略类名')
+    parser.add_argument('--strategy-path', help='策略目录，默认 user_data/strategies')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--timerange', help='时间范围，如 20240101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--fixture', type=int, metavar='DAYS', help='使用指定天数的模拟K线')
+    parser.add_argument('--candles', type=int, help='确认窗口K线数，默认使用策略的 confirmation_candles')
+    parser.add_argument('--repeat', type=int, default=3, help='每种方式重复次数，取最短耗时')
+    args = parser.parse_args()
+
+    if str(STRATEGY_DIR) not in sys.path:
+        sys.path.insert(0, str(STRATEGY_DIR))
+
+    config = load_config(args.config)
+    pairs = args.pairs or config_pairs(config)
+    timeframe = config.get('timeframe', '1h')
+    if args.fixture:
+        from benchmark_fixtures import FixtureDataProvider
+        provider = FixtureDataProvider(pairs, timeframe, args.fixture)
+    else:
+        provider = LocalDataProvider(config, pairs, args.datadir, args.timerange)
+    strategy = load_strategy(args.strategy, config, provider, args.strategy_path or STRATEGY_DIR)
+    if args.candles:
+        strategy.confirmation_candles = args.candles
+    session = session_strategy(type(strategy), args.repeat)(config)
+    session.dp = provider
+    if hasattr(session, 'ft_bot_start'):
+        session.ft_bot_start()
+    session.confirmation_candles = strategy.confirmation_candles
+
+    print(f"⚡ {args.strategy}  确认窗口 {strategy.confirmation_candles} 根K线 ({strategy.confirmation_mode})")
+    print(f"{'交易对':<18}{'行数':>9}{'条件行':>9}{'占比':>8}{'整列ms':>9}{'稀疏ms':>9}{'加速':>8}"
+          f"{'分析s':>8}{'入场':>7}  结果")
+    failed = False
+    totals = np.zeros(5)
+    for pair in pairs:
+        df = provider.get_pair_dataframe(pair, strategy.timeframe)
+        if df is None or df.empty:
+            print(f"{pair:<18}  无K线数据，跳过")
+            continue
+        reference, full_s = timed_analysis(strategy, df, pair, args.repeat)
+        sparse = analyze_pair(session, df.copy(), pair)
+        result = session.results[pair]
+
+        problems = []
+        column = different_column(result['dense'], reference, CONDITION_COLUMNS)
+        if column:
+            problems.append(f"整列 {column}")
+        column = different_column(sparse, reference, CONDITION_COLUMNS[:-1] + SIGNAL_COLUMNS) or \
+            different_column(sparse, reference, ['near_sma'], result['candidates'])
+        if column:
+            problems.append(f"稀疏 {column}")
+        failed |= bool(problems)
+
+        dense_s, sparse_s, evaluated = result['dense_s'], result['sparse_s'], result['evaluated']
+        entries = int(sparse['enter_long'].fillna(0).sum() + sparse['enter_short'].fillna(0).sum())
+        print(f"{pair:<18}{len(df):>9,}{evaluated:>9,}{evaluated / (2 * len(df)):>8.1%}"
+              f"{dense_s * 1000:>9.2f}{sparse_s * 1000:>9.2f}{dense_s / max(sparse_s, 1e-9):>7.1f}x"
+              f"{full_s:>8.3f}{entries:>7}  "
+              f"{'✅ 一致' if not problems else '❌ ' + ', '.join(problems) + ' 不一致'}")
+        totals += [len(df), evaluated, dense_s, sparse_s, full_s]
+
+    rows, evaluated, dense_s, sparse_s, full_s = totals
+    if rows:
+        print(f"{'合计':<18}{int(rows):>9,}{int(evaluated):>9,}{evaluated / (2 * rows):>8.1%}"
+              f"{dense_s * 1000:>9.2f}{sparse_s * 1000:>9.2f}{dense_s / max(sparse_s, 1e-9):>7.1f}x{full_s:>8.3f}")
+        print("   条件行 = 8点K线 + 候选确认K线；占比相对全部K线各算一遍（8点条件 + 确认条件）")
+        print(f"   稀疏计算节省 {(dense_s - sparse_s) * 1000:.2f}ms，占完整分析的 {(dense_s - sparse_s) / full_s:.1%}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+分片并行freqtrade回测
+把白名单（或时间范围）拆成若干分片，每个分片一个 freqtrade backtesting 进程并行运行，
+再合并各分片导出的交易列表，重新计算组合指标，写出一个与整体回测同格式的结果文件。
+
+- 按交易对分片（默认）：分片回测不限制持仓数（--max-open-trades -1），合并后按开仓时间、
+  白名单顺序重放 max_open_trades：同一时刻持仓已满时丢弃该笔交易。
+  max_open_trades >= 交易对数且未启用position stacking时，合并结果与整体回测一致；
+  持仓数会成为限制时，整体回测中被挡掉的交易之后可能开出另一笔交易，重放无法还原，存在误差
+- 按时间分片（--shard-by timerange）：每段是完整白名单，freqtrade自动在段前加载startup数据；
+  段末仍持仓的交易被强制平仓（force_exit），下一段不会延续，存在误差
+- stake_amount 为 unlimited 或使用复利时每笔仓位依赖账户余额，合并后的绝对收益与整体回测不同
+
+--compare 额外运行一次整体回测，报告两者的墙钟时间和合并误差（交易匹配数、各指标差值）。
+
+使用示例:
+    python scripts/local/sharded_backtest.py --config config/eightpm_backtest.json \\
+        --strategy EightPMHighLowStrategy --timerange 20240101-20241231 --jobs 4
+
+    # 与整体回测对比合并误差
+    python scripts/local/sharded_backtest.py --config config/eightpm_backtest.json \\
+        --timerange 20240101-20241231 --jobs 4 --compare
+
+    # 按时间分片
+    python scripts/local/sharded_backtest.py --config config/base.json --strategy OneFiveTrendHTF \\
+        --timerange 20230101-20241231 --shard-by timerange --jobs 4
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from backtest_cache import run_freqtrade
+from backtest_results import (
+    RESULTS_DIR, compute_metrics, format_metrics_table, load_backtest_result, metrics_per_pair,
+    strategy_section, trades_dataframe,
+)
+from freqtrade_data import config_pairs, load_config, parse_timerange
+
+
+METRIC_KEYS = ['trades', 'profit_total_pct', 'winrate', 'max_drawdown_account', 'profit_factor']
+
+
+def shard_pairs(pairs, shards):
+    """交易对轮流分配到各分片，保持各分片内的白名单顺序"""
+    shards = max(1, min(shards, len(pairs)))
+    return [pairs[i::shards] for i in range(shards)]
+
+
+def shard_timerange(timerange, shards):
+    """把 YYYYMMDD-YYYYMMDD 按天均分为若干段（首尾相接）"""
+    start_ms, end_ms = parse_timerange(timerange)
+    if start_ms is None or end_ms is None:
+        raise ValueError('按时间分片需要完整的 --timerange，如 20240101-20241231')
+    start, end = pd.Timestamp(start_ms, unit='ms'), pd.Timestamp(end_ms, unit='ms')
+    days = max(1, (end - start).days)
+    shards = max(1, min(shards, days))
+    edges = [start + pd.Timedelta(days=round(days * i / shards)) for i in range(shards)] + [end]
+    return [f"{a:%Y%m%d}-{b:%Y%m%d}" for a, b in zip(edges[:-1], edges[1:])]
+
+
+def run_shards(strategy, config_path, tasks, jobs, workdir):
+    """
+    tasks: [(名称, 时间范围, 额外参数)]，并行运行，返回 ([结果文件], 墙钟秒)
+    每个分片使用独立的结果目录和日志文件
+    """
+    def run(index, task):
+        name, timerange, extra = task
+        shard_dir = Path(workdir) / f"shard{index:02d}"
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        log_path = shard_dir / 'freqtrade.log'
+        try:
+            return run_freqtrade(strategy, config_path, timerange, extra, shard_dir, log_path)
+        except Exception as e:
+            raise RuntimeError(f"分片 {name} 回测失败: {e}（日志: {log_path}）") from e
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max(1, jobs)) as pool:
+        results = list(pool.map(run, range(len(tasks)), tasks))
+    return results, time.perf_counter() - started
+
+
+def load_trades(result_path, strategy):
+    return trades_dataframe(strategy_section(load_backtest_result(result_path), strategy))
+
+
+def replay_max_open_trades(trades, max_open_trades, pairs):
+    """
+    按 (开仓时间, 白名单顺序) 重放持仓数限制，返回 (保留的交易, 丢弃的交易数)
+    与本地预筛选引擎相同的口径：平仓时间早于开仓时间的持仓才释放名额
+    """
+    if trades.empty or max_open_trades is None or max_open_trades < 0 or max_open_trades >= len(pairs):
+        return trades, 0
+    order = {pair: i for i, pair in enumerate(pairs)}
+    trades = trades.assign(_order=trades['pair'].map(order).fillna(len(order)))
+    trades = trades.sort_values(['open_date', '_order'], kind='stable')
+    open_closes, keep = [], []
+    for open_date, close_date in zip(trades['open_date'], trades['close_date']):
+        while open_closes and open_closes[0] < open_date:
+            heapq.heappop(open_closes)
+        if len(open_closes) >= max_open_trades:
+            keep.append(False)
+            continue
+        heapq.heappush(open_closes, close_date)
+        keep.append(True)
+    kept = trades[keep].drop(columns='_order')
+    return kept, int(len(trades) - len(kept))
+
+
+def merge_trades(frames, max_open_trades, pairs):
+    """合并各分片的交易并重放持仓数限制，按开仓时间排序"""
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame(), 0
+    merged = pd.concat(frames, ignore_index=True)
+    merged, rejected = replay_max_open_trades(merged, max_open_trades, pairs)
+    return merged.sort_values(['open_date', 'pair'], kind='stable').reset_index(drop=True), rejected
+
+
+def write_merged_result(trades, strategy, pairs, starting_balance, results_dir, meta):
+    """写出与freqtrade导出格式兼容的结果json（strategy.<name>.trades 与 strategy_comparison）"""
+    records = trades.copy()
+    for col in ('open_date', 'close_date'):
+        if col in records:
+            records[col] = records[col].astype(str)
+    metrics = compute_metrics(trades, starting_balance)
+    result = {
+        'strategy': {strategy: {
+            'trades': json.loads(records.to_json(orient='records')),
+            'pairlist': list(pairs),
+            'starting_balance': starting_balance,
+            'sharded': meta,
+        }},
+        'strategy_comparison': [dict(metrics, key=strategy)],
+    }
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    path = results_dir / f"sharded-{strategy}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+    return path
+
+
+def merge_error(sharded, single, starting_balance, pairs):
+    """合并结果与整体回测的差异：按 (交易对, 开仓时间) 匹配交易，并比较各指标"""
+    keys = ['pair', 'open_date']
+    matched = pd.merge(single[keys + ['close_date', 'profit_abs']], sharded[keys + ['close_date', 'profit_abs']],
+                       on=keys, suffixes=('_single', '_sharded')) if len(single) and len(sharded) else pd.DataFrame()
+    a, b = metrics_per_pair(sharded, starting_balance, pairs), metrics_per_pair(single, starting_balance, pairs)
+    return {
+        'matched': len(matched),
+        'only_single': len(single) - len(matched),
+        'only_sharded': len(sharded) - len(matched),
+        'exit_mismatch': int((matched['close_date_single'] != matched['close_date_sharded']).sum()) if len(matched) else 0,
+        'metrics': {pair: {k: a[pair][k] - b[pair][k] for k in METRIC_KEYS} for pair in a},
+    }
+
+
+def print_merge_error(error, sharded_s, single_s):
+    print("\n=== 合并误差（分片 - 整体） ===")
+    print(f"墙钟时间: 分片 {sharded_s:.1f}s, 整体 {single_s:.1f}s, 加速 {single_s / max(sharded_s, 1e-9):.2f}x")
+    print(f"交易匹配 {error['matched']} 笔, 仅整体 {error['only_single']} 笔, 仅分片 {error['only_sharded']} 笔, "
+          f"平仓时间不同 {error['exit_mismatch']} 笔")
+    print(f"{'交易对':<18}{'交易数':>8}{'收益%':>10}{'胜率':>9}{'最大回撤':>10}{'盈利因子':>10}")
+    for pair, m in error['metrics'].items():
+        print(f"{pair:<18}{m['trades']:>+8}{m['profit_total_pct']:>+10.3f}{m['winrate']:>+9.2%}"
+              f"{m['max_drawdown_account']:>+10.2%}{m['profit_factor']:>+10.3f}")
+    exact = not (error['only_single'] or error['only_sharded'] or error['exit_mismatch'])
+    print('✅ 合并结果与整体回测一致' if exact else '⚠️  合并结果与整体回测存在差异')
+    return exact
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分片并行freqtrade回测')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--timerange', help='时间范围 YYYYMMDD-YYYYMMDD')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--shard-by', choices=['pairs', 'timerange'], default='pairs', help='分片方式')
+    parser.add_argument('--shards', type=int, help='分片数，默认等于 --jobs')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='并行的freqtrade进程数')
+    parser.add_argument('--compare', action='store_true', help='同时运行整体回测并报告合并误差')
+    parser.add_argument('--results-dir', default=str(RESULTS_DIR), help='合并结果的输出目录')
+    # 未识别的参数（如 --fee 0.0005）原样传给每个freqtrade进程
+    args, extra = parser.parse_known_args()
+
+    config = load_config(args.config)
+    strategy = args.strategy or config.get('strategy')
+    if not strategy:
+        parser.error('需要 --strategy 或配置中的strategy')
+    pairs = args.pairs or config_pairs(config)
+    max_open_trades = int(config.get('max_open_trades', -1))
+    starting_balance = float(config.get('dry_run_wallet', 1000))
+    shards = args.shards or args.jobs
+    extra = list(extra) + ['--cache', 'none']
+
+    if args.shard_by == 'pairs':
+        groups = shard_pairs(pairs, shards)
+        tasks = [(f"{len(g)}个交易对", args.timerange, extra + ['--pairs', *g, '--max-open-trades', '-1'])
+                 for g in groups]
+    else:
+        try:
+            ranges = shard_timerange(args.timerange, shards)
+        except ValueError as e:
+            parser.error(str(e))
+        tasks = [(tr, tr, extra + ['--pairs', *pairs]) for tr in ranges]
+
+    print(f"🧩 {strategy}: {len(tasks)} 个分片（按{'交易对' if args.shard_by == 'pairs' else '时间'}），"
+          f"{min(args.jobs, len(tasks))} 个并行, max_open_trades={max_open_trades}")
+    with tempfile.TemporaryDirectory(prefix='sharded-backtest-') as workdir:
+        results, sharded_s = run_shards(strategy, args.config, tasks, args.jobs, workdir)
+        frames = [load_trades(path, strategy) for path in results]
+        merged, rejected = merge_trades(frames, max_open_trades, pairs)
+        forced = int((merged['exit_reason'] == 'force_exit').sum()) if 'exit_reason' in merged else 0
+        path = write_merged_result(merged, strategy, pairs, starting_balance, args.results_dir, {
+            'shard_by': args.shard_by, 'shards': [t[0] for t in tasks], 'rejected_by_max_open_trades': rejected,
+        })
+        print(format_metrics_table(metrics_per_pair(merged, starting_balance, pairs), f"合并结果 ({sharded_s:.1f}s)"))
+        print(f"重放max_open_trades丢弃 {rejected} 笔, 强制平仓 {forced} 笔 -> {path}")
+
+        if not args.compare:
+            return
+        print("\n⏱  运行整体回测 ...")
+        single_dir = Path(workdir) / 'single'
+        started = time.perf_counter()
+        single_path = run_freqtrade(strategy, args.config, args.timerange, extra + ['--pairs', *pairs],
+                                    single_dir, single_dir.with_suffix('.log'))
+        single_s = time.perf_counter() - started
+        single = load_trades(single_path, strategy)
+        exact = print_merge_error(merge_error(merged, single, starting_balance, pairs), sharded_s, single_s)
+    sys.exit(0 if exact else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+startup_candle_count 计算
+运行一次策略分析并拦截指标调用（talib.abstract.* 以及 pandas 的 rolling / ewm / shift / diff / pct_change），
+按调用所在的时间框架推导最少预热K线数：
+- 固定窗口指标：TA-Lib 的 lookback（SMA(20) 为19）、rolling(n) 为 n-1、shift(n) 为 n
+- 递归指标（EMA/RSI/ATR/ADX、pandas ewm）：在 lookback 之外再加收敛所需的K线数，
+  即初始值的残余权重 (1-α)^k 小于容差 --tolerance（EMA α=2/(n+1)，Wilder平滑 α=1/n）
+- informative时间框架的预热按时间折算为主时间框架K线数（merge_informative_pair 再多用一根高周期K线）
+
+解析结果之后在本地数据上实测：在若干切点前只保留 S 根历史重新分析，与完整历史的结果比较切点之后的
+指标（相对误差不超过容差）和信号（完全一致），二分查找满足条件的最小 S。
+解析无法覆盖的依赖（按日分组统计、指标嵌套）会体现为实测值大于解析值。
+
+使用示例:
+    python scripts/local/startup_candles.py --config config/base.json --strategy OneFiveTrendHTF
+
+    # 无本地数据时用模拟K线，容差0.1%
+    python scripts/local/startup_candles.py --config config/eightpm_backtest.json \\
+        --strategy EightPMHighLowStrategy --fixture 365 --tolerance 1e-3
+"""
+
+import argparse
+import contextlib
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from freqtrade_data import (
+    STRATEGY_DIR, LocalDataProvider, analyze_pair, config_pairs, load_config, load_strategy,
+    timeframe_to_ms,
+)
+
+
+DEFAULT_TOLERANCE = 1e-3
+
+# 递归平滑的TA-Lib函数: 名称 -> (平滑方式, 周期参数, 级联次数)
+EMA_FUNCTIONS = {
+    'EMA': ('ema', 'timeperiod', 1),
+    'DEMA': ('ema', 'timeperiod', 2),
+    'TEMA': ('ema', 'timeperiod', 3),
+    'TRIX': ('ema', 'timeperiod', 3),
+    'T3': ('ema', 'timeperiod', 6),
+    'MACD': ('ema', 'slowperiod', 1),
+    'RSI': ('wilder', 'timeperiod', 1),
+    'CMO': ('wilder', 'timeperiod', 1),
+    'ATR': ('wilder', 'timeperiod', 1),
+    'NATR': ('wilder', 'timeperiod', 1),
+    'PLUS_DM': ('wilder', 'timeperiod', 1),
+    'MINUS_DM': ('wilder', 'timeperiod', 1),
+    'PLUS_DI': ('wilder', 'timeperiod', 1),
+    'MINUS_DI': ('wilder', 'timeperiod', 1),
+    'DX': ('wilder', 'timeperiod', 1),
+    'ADX': ('wilder', 'timeperiod', 2),
+    'ADXR': ('wilder', 'timeperiod', 2),
+}
+
+# 数据不足时各函数的默认周期（与TA-Lib一致）
+DEFAULT_PERIOD = 14
+
+
+def convergence_candles(alpha, tolerance, stages=1):
+    """初始值残余权重 (1-alpha)^k 小于tolerance所需的K线数k（级联平滑按级数放大）"""
+    if alpha >= 1:
+        return 0
+    if alpha <= 0:
+        return math.inf
+    return int(math.ceil(stages * math.log(tolerance) / math.log(1 - alpha)))
+
+
+class IndicatorCall:
+    """一次指标调用：来源、名称、参数、输入长度、固定回看和收敛所需K线数"""
+
+    def __init__(self, source, name, params, length, lookback, convergence=0):
+        self.source = source
+        self.name = name
+        self.params = params
+        self.length = length
+        self.lookback = lookback
+        self.convergence = convergence
+        self.timeframe = None
+
+    @property
+    def warmup(self):
+        return self.lookback + self.convergence
+
+    def label(self):
+        params = ','.join(f"{v:g}" if isinstance(v, float) else str(v) for v in self.params.values())
+        return f"{self.name}({params})"
+
+
+class CallRecorder:
+    """拦截指标调用；同一时刻只记录最外层调用（pandas内部的嵌套调用不重复计入）"""
+
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.calls = []
+        self.depth = 0
+
+    @contextlib.contextmanager
+    def outer(self):
+        self.depth += 1
+        try:
+            yield self.depth == 1
+        finally:
+            self.depth -= 1
+
+    def add(self, call):
+        self.calls.append(call)
+
+
+def _input_length(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(value)
+    if isinstance(value, dict) and value:
+        return len(next(iter(value.values())))
+    return None
+
+
+def _talib_call(recorder, name, function, args, kwargs):
+    """TA-Lib abstract调用 -> IndicatorCall（参数按位置映射到函数定义的参数顺序）"""
+    from talib import abstract
+
+    info = abstract.Function(name).info
+    names = list(info['parameters'])
+    if args and isinstance(args[0], (pd.DataFrame, dict)):
+        inputs = 1
+    else:
+        inputs = sum(len(v) if isinstance(v, (list, tuple)) else 1 for v in info['input_names'].values())
+    params = dict(info['parameters'])
+    params.update(zip(names, args[inputs:]))
+    params.update({k: v for k, v in kwargs.items() if k in params})
+
+    probe = abstract.Function(name)
+    probe.parameters = params
+    lookback = int(probe.lookback)
+    convergence = 0
+    spec = EMA_FUNCTIONS.get(name)
+    if spec is not None:
+        kind, period_name, stages = spec
+        period = int(params.get(period_name, DEFAULT_PERIOD))
+        alpha = 2.0 / (period + 1) if kind == 'ema' else 1.0 / period
+        convergence = convergence_candles(alpha, recorder.tolerance, stages)
+    shown = {k: v for k, v in params.items() if k.endswith('period') or k == 'timeperiod'}
+    return IndicatorCall('talib', name, shown, _input_length(args[0]) if args else None,
+                         lookback, convergence)
+
+
+@contextlib.contextmanager
+def instrument_talib(recorder):
+    """替换 talib.abstract 模块上的函数；策略 `import talib.abstract as ta` 拿到的是同一个模块对象"""
+    try:
+        import talib
+        from talib import abstract
+    except ImportError:
+        yield
+        return
+
+    originals = {}
+    for name in talib.get_functions():
+        function = getattr(abstract, name, None)
+        if function is None:
+            continue
+        originals[name] = function
+
+        def proxy(*args, _name=name, _function=function, **kwargs):
+            with recorder.outer() as outermost:
+                if outermost:
+                    recorder.add(_talib_call(recorder, _name, _function, args, kwargs))
+                return _function(*args, **kwargs)
+
+        setattr(abstract, name, proxy)
+    try:
+        yield
+    finally:
+        for name, function in originals.items():
+            setattr(abstract, name, function)
+
+
+def _ewm_alpha(com=None, span=None, halflife=None, alpha=None, **_):
+    if alpha is not None:
+        return float(alpha)
+    if span is not None:
+        return 2.0 / (span + 1)
+    if com is not None:
+        return 1.0 / (com + 1)
+    if halflife is not None:
+        return 1 - math.exp(math.log(0.5) / halflife)
+    return None
+
+
+def _pandas_call(recorder, method, obj, args, kwargs):
+    length = len(obj)
+    if method == 'rolling':
+        window = args[0] if args else kwargs.get('window')
+        if not isinstance(window, (int, np.integer)):
+            return None
+        return IndicatorCall('pandas', 'rolling', {'window': int(window)}, length, int(window) - 1)
+    if method == 'ewm':
+        alpha = _ewm_alpha(com=args[0], **kwargs) if args else _ewm_alpha(**kwargs)
+        if alpha is None:
+            return None
+        params = {k: kwargs[k] for k in ('com', 'span', 'halflife', 'alpha') if k in kwargs}
+        return IndicatorCall('pandas', 'ewm', params or {'com': args[0]}, length, 0,
+                             convergence_candles(alpha, recorder.tolerance))
+    periods = args[0] if args else kwargs.get('periods', 1)
+    if not isinstance(periods, (int, np.integer)):
+        return None
+    return IndicatorCall('pandas', method, {'periods': int(periods)}, length, abs(int(periods)))
+
+
+PANDAS_METHODS = ['rolling', 'ewm', 'shift', 'diff', 'pct_change']
+
+
+@contextlib.contextmanager
+def instrument_pandas(recorder):
+    """替换 Series/DataFrame 的窗口类方法"""
+    originals = []
+    for cls in (pd.Series, pd.DataFrame):
+        for method in PANDAS_METHODS:
+            function = getattr(cls, method)
+            originals.append((cls, method, function))
+
+            def proxy(self, *args, _method=method, _function=function, **kwargs):
+                with recorder.outer() as outermost:
+                    if outermost:
+                        call = _pandas_call(recorder, _method, self, args, kwargs)
+                        if call is not None:
+                            recorder.add(call)
+                    return _function(self, *args, **kwargs)
+
+            setattr(cls, method, proxy)
+    try:
+        yield
+    finally:
+        for cls, method, function in originals:
+            setattr(cls, method, function)
+
+
+class RecordingProvider(LocalDataProvider):
+    """记录策略请求的各时间框架数据长度，用于把指标调用归到时间框架"""
+
+    def __init__(self, base):
+        self.__dict__.update(base.__dict__)
+        self.base = base
+        self.lengths = {}
+
+    def get_pair_dataframe(self, pair, timeframe=None, candle_type=''):
+        timeframe = timeframe or self.config.get('timeframe')
+        df = self.base.get_pair_dataframe(pair, timeframe, candle_type)
+        self.lengths.setdefault(len(df), timeframe)
+        return df
+
+
+def record_calls(strategy, provider, df, pair, tolerance):
+    """分析一次并返回带时间框架的指标调用列表"""
+    recorder = CallRecorder(tolerance)
+    recording = RecordingProvider(provider)
+    strategy.dp = recording
+    try:
+        with instrument_talib(recorder), instrument_pandas(recorder):
+            analyze_pair(strategy, df.copy(), pair)
+    finally:
+        strategy.dp = provider
+    lengths = dict(recording.lengths)
+    lengths[len(df)] = strategy.timeframe
+    for call in recorder.calls:
+        call.timeframe = lengths.get(call.length, strategy.timeframe)
+    return recorder.calls
+
+
+def analytic_startup(calls, timeframe):
+    """
+    各时间框架的预热需求 -> 主时间框架K线数
+    返回 (主时间框架K线数, {时间框架: (该周期K线数, 折算K线数, 决定该值的调用)})
+    """
+    main_ms = timeframe_to_ms(timeframe)
+    per_timeframe = {}
+    for call in calls:
+        current = per_timeframe.get(call.timeframe)
+        if current is None or call.warmup > current.warmup:
+            per_timeframe[call.timeframe] = call
+    result = {}
+    for tf, call in per_timeframe.items():
+        ratio = timeframe_to_ms(tf) / main_ms
+        # informative K线在收盘后才合并，需要多一根高周期K线
+        converted = call.warmup if tf == timeframe else int(math.ceil((call.warmup + 1) * ratio))
+        result[tf] = (call.warmup, converted, call)
+    total = max((v[1] for v in result.values()), default=0)
+    return total, result
+
+
+class TrimmedProvider(LocalDataProvider):
+    """informative数据裁剪到与主数据相同的时间范围（模拟freqtrade只加载startup之后的数据）"""
+
+    def __init__(self, base):
+        self.__dict__.update(base.__dict__)
+        self.base = base
+        self.start = None
+        self.end = None
+
+    def get_pair_dataframe(self, pair, timeframe=None, candle_type=''):
+        df = self.base.get_pair_dataframe(pair, timeframe, candle_type)
+        if self.start is None:
+            return df
+        mask = (df['date'] >= self.start) & (df['date'] <= self.end)
+        return df.loc[mask].reset_index(drop=True)
+
+
+def _converged(reference, candidate, tolerance):
+    """切点之后的行：数值列相对误差不超过容差，其他列（信号、布尔条件）完全一致；返回 (是否通过, 首个不通过的列)"""
+    for col in reference.columns:
+        if col not in candidate.columns or col == 'date':
+            continue
+        a, b = candidate[col], reference[col]
+        if pd.api.types.is_float_dtype(b) and pd.api.types.is_float_dtype(a):
+            x, y = a.to_numpy('float64'), b.to_numpy('float64')
+            if not np.array_equal(np.isnan(x), np.isnan(y)):
+                return False, col
+            scale = np.nanmedian(np.abs(y)) if np.isfinite(y).any() else 0.0
+            with np.errstate(invalid='ignore'):
+                bad = np.abs(x - y) > tolerance * np.maximum(np.abs(y), scale)
+            if bad.any():
+                return False, col
+        elif not a.reset_index(drop=True).astype(str).equals(b.reset_index(drop=True).astype(str)):
+            return False, col
+    return True, None
+
+
+def empirical_startup(strategy, provider, df, pair, tolerance, cuts=3, eval_rows=50, start=None):
+    """
+    实测最小预热：切点前保留S根历史的分析结果与完整历史一致时S满足要求，二分查找最小S
+    两者都截止到同一根K线，避免按日统计等使用当天后续K线的列因末端截断而不一致
+    返回 (最小S或None, 各切点位置, {S: 首个不通过的列})
+    """
+    trimmed = TrimmedProvider(provider)
+    strategy.dp = trimmed
+    try:
+        n = len(df)
+        latest = n - eval_rows
+        earliest = min(latest, max(n // 2, (start or 0) * 2))
+        positions = sorted({int(p) for p in np.linspace(earliest, latest, cuts)})
+        failures = {}
+        references = {}
+        for cut in positions:
+            history = df.iloc[:cut + eval_rows].reset_index(drop=True)
+            trimmed.start, trimmed.end = history['date'].iloc[0], history['date'].iloc[-1]
+            references[cut] = analyze_pair(strategy, history.copy(), pair).set_index('date')
+
+        def ok(size):
+            for cut in positions:
+                window = df.iloc[max(0, cut - size):cut + eval_rows].reset_index(drop=True)
+                trimmed.start, trimmed.end = window['date'].iloc[0], window['date'].iloc[-1]
+                out = analyze_pair(strategy, window.copy(), pair).set_index('date')
+                dates = df['date'].iloc[cut:cut + eval_rows]
+                passed, column = _converged(references[cut].loc[dates], out.loc[dates], tolerance)
+                if not passed:
+                    failures[size] = column
+                    return False
+            return True
+
+        limit = positions[0]
+        hi = max(start or 0, 16)
+        while hi < limit and not ok(hi):
+            hi *= 2
+        if hi >= limit:
+            hi = limit
+            if not ok(hi):
+                return None, positions, failures
+        lo = 0
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ok(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return hi, positions, failures
+    finally:
+        trimmed.start = trimmed.end = None
+        strategy.dp = provider
+
+
+def main():
+    parser = argparse.ArgumentParser(description='startup_candle_count 计算')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--strategy-path', help='策略目录，默认 user_data/strategies')
+    parser.add_argument('--pairs', nargs='+', help='实测使用的交易对，默认白名单第一个')
+    parser.add_argument('--timerange', help='时间范围，如 20240101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--fixture', type=int, metavar='DAYS', help='使用指定天数的模拟K线')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='收敛容差：初始值残余权重/指标相对误差上限 (默认1e-3)')
+    parser.add_argument('--cuts', type=int, default=3, help='实测的切点数')
+    parser.add_argument('--eval-rows', type=int, default=50, help='每个切点之后比较的K线数')
+    parser.add_argument('--no-verify', action='store_true', help='只做解析计算，不在数据上实测')
+    args = parser.parse_args()
+
+    # 按float64整段分析计算，不受压缩/增量分析开关影响
+    for name in ('FT_STRATEGY_COMPACT', 'FT_STRATEGY_TAIL'):
+        os.environ.pop(name, None)
+    if str(STRATEGY_DIR) not in sys.path:
+        sys.path.insert(0, str(STRATEGY_DIR))
+
+    config = load_config(args.config)
+    strategy_name = args.strategy or config.get('strategy')
+    if not strategy_name:
+        parser.error('需要 --strategy 或配置中的strategy')
+    pairs = args.pairs or config_pairs(config)[:1]
+    timeframe = config.get('timeframe', '1h')
+    if args.fixture:
+        from benchmark_fixtures import FixtureDataProvider
+        provider = FixtureDataProvider(config_pairs(config), timeframe, args.fixture)
+    else:
+        provider = LocalDataProvider(config, config_pairs(config), args.datadir, args.timerange)
+    strategy = load_strategy(strategy_name, config, provider, args.strategy_path or STRATEGY_DIR)
+    timeframe = strategy.timeframe
+    current = int(getattr(strategy, 'startup_candle_count', 0) or 0)
+
+    started = time.perf_counter()
+    df = provider.get_pair_dataframe(pairs[0], timeframe)
+    if df.empty:
+        print(f"❌ {pairs[0]}: 没有 {timeframe} 数据")
+        sys.exit(1)
+    calls = record_calls(strategy, provider, df, pairs[0], args.tolerance)
+    analytic, per_timeframe = analytic_startup(calls, timeframe)
+
+    print(f"📐 {strategy_name} ({timeframe})  当前 startup_candle_count = {current}  容差 {args.tolerance:g}")
+    print(f"{'时间框架':<8}{'指标':<24}{'回看':>6}{'收敛':>7}{'预热':>7}{'折算' + timeframe:>10}")
+    seen = set()
+    for call in sorted(calls, key=lambda c: (-timeframe_to_ms(c.timeframe), -c.warmup)):
+        key = (call.timeframe, call.label())
+        if key in seen:
+            continue
+        seen.add(key)
+        converted = per_timeframe[call.timeframe][1] if per_timeframe[call.timeframe][2] is call else ''
+        print(f"{call.timeframe:<8}{call.label():<24}{call.lookback:>6}{call.convergence:>7}"
+              f"{call.warmup:>7}{converted:>10}")
+    print(f"解析结果: {analytic} 根 {timeframe}")
+
+    recommended = analytic
+    if not args.no_verify:
+        for pair in pairs:
+            df = provider.get_pair_dataframe(pair, timeframe)
+            size, positions, failures = empirical_startup(
+                strategy, provider, df, pair, args.tolerance, args.cuts, args.eval_rows, analytic)
+            if size is None:
+                print(f"⚠️  {pair}: 历史不足，无法在 {positions[0]} 根内收敛")
+                continue
+            recommended = max(recommended, size)
+            note = ''
+            if size > analytic:
+                column = failures.get(analytic)
+                note = f"（解析值不足{'，首个未收敛列: ' + str(column) if column else ''}）"
+            print(f"实测 {pair}: {size} 根 ({len(positions)} 个切点){note}")
+    elapsed = time.perf_counter() - started
+
+    status = '✅' if current >= recommended else '⚠️ '
+    print(f"{status} 建议 startup_candle_count = {recommended}（当前 {current}，{elapsed:.1f}秒）")
+    if current > recommended * 2 and recommended:
+        print(f"   当前值是需要的 {current / recommended:.1f} 倍，多加载了历史")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+实盘增量分析回放
+按实盘方式逐根喂入K线（每次输入截至当前K线的全部历史），对比两种分析方式：
+- 整段计算：每根新K线都重新分析全部历史（freqtrade默认行为）
+- 只重算末尾：user_data/strategies/tail_recompute.py，只重算 新K线 + 回看长度 行
+报告每根K线的分析耗时（中位数），并检查新K线的信号逐根一致。
+
+--restart 模拟部署重启（user_data/strategies/warm_start.py）：运行中的实例写入检查点后，新实例的每个
+时间框架（含informative）都只拿到截至当前已收盘的最近 --window 根K线（freqtrade实盘每次提供的K线数有上限），
+对比从检查点热启动与冷启动（不启用warm_start）的新实例，以整段历史的分析结果为准统计新K线信号的不一致数。
+
+使用示例:
+    python scripts/local/tail_replay.py --config config/base.json \\
+        --strategy TriangularArbitrageOKX --candles 200
+
+    # 无本地数据时用一天的模拟1m K线
+    python scripts/local/tail_replay.py --config config/base.json --strategy TriangularArbitrageOKX \\
+        --fixture 1 --candles 60
+
+    # 重启后热启动与冷启动对比（15m EMA200的预热超过实盘K线数）
+    python scripts/local/tail_replay.py --config config/base.json --strategy OneFiveTrendHTF \\
+        --fixture 30 --candles 50 --restart --window 300
+
+在freqtrade实盘中启用: FT_STRATEGY_TAIL=1 freqtrade trade ...
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from freqtrade_data import (
+    STRATEGY_DIR, LocalDataProvider, analyze_pair, config_pairs, load_config, load_strategy,
+    timeframe_to_minutes,
+)
+
+
+def replay_pair(full_strategy, tail_strategy, df, pair, candles):
+    """
+    逐根回放最后candles根K线，返回 {'full_ms', 'tail_ms', 'mismatched', 'first_mismatch'}
+    回放开始前先用之前的历史做一次整段计算，建立只重算末尾的缓存
+    """
+    from frame_compaction import signal_frame
+
+    start = len(df) - candles
+    analyze_pair(tail_strategy, df.iloc[:start].copy(), pair)
+    full_times, tail_times = [], []
+    mismatched, first = 0, None
+    for end in range(start + 1, len(df) + 1):
+        history = df.iloc[:end]
+        full_input, tail_input = history.copy(), history.copy()
+
+        started = time.perf_counter()
+        full = analyze_pair(full_strategy, full_input, pair)
+        full_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        tail = analyze_pair(tail_strategy, tail_input, pair)
+        tail_times.append(time.perf_counter() - started)
+
+        if len(tail) != len(history) or \
+                not signal_frame(full.iloc[-1:]).equals(signal_frame(tail.iloc[-1:])):
+            mismatched += 1
+            first = first or str(history['date'].iloc[-1])
+    return {
+        'full_ms': statistics.median(full_times) * 1000,
+        'tail_ms': statistics.median(tail_times) * 1000,
+        'mismatched': mismatched,
+        'first_mismatch': first,
+    }
+
+
+class WindowedProvider:
+    """实盘数据的模拟：每个时间框架只返回截至当前K线收盘时已收盘的最近window根（window为None时不限）"""
+
+    runmode = 'backtest'
+
+    def __init__(self, provider, timeframe, window=None):
+        self.provider = provider
+        self.timeframe = timeframe
+        self.window = window
+        self.now = None
+
+    def at(self, date):
+        """当前K线（开盘时间date）收盘"""
+        self.now = date + pd.Timedelta(minutes=timeframe_to_minutes(self.timeframe))
+
+    def get_pair_dataframe(self, pair, timeframe=None, candle_type=''):
+        timeframe = timeframe or self.timeframe
+        df = self.provider.get_pair_dataframe(pair, timeframe, candle_type)
+        df = df[df['date'] + pd.Timedelta(minutes=timeframe_to_minutes(timeframe)) <= self.now]
+        if self.window:
+            df = df.iloc[-self.window:]
+        return df.reset_index(drop=True)
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
+
+
+def restart_pair(full_strategy, make_warm, provider, df, pair, candles, window, checkpoint_dir):
+    """
+    模拟重启：回放前运行中的实例（拿到完整历史）写入检查点，之后热启动/冷启动两个新实例的
+    每个时间框架各自只拿到最近window根K线
+    返回 {名称: {'first_ms', 'mismatched', 'deviation'}}，以整段历史的分析结果为准；
+    deviation 为新K线上指标列相对整段历史的最大相对偏差
+    """
+    from frame_compaction import signal_frame
+    from warm_start import CHECKPOINTS
+
+    timeframe = full_strategy.timeframe
+    start = len(df) - candles
+    running = WindowedProvider(provider, timeframe)
+    running.at(df['date'].iloc[start - 1])
+    analyze_pair(make_warm(running, checkpoint_dir), df.iloc[:start].copy(), pair)
+    CHECKPOINTS.flush()
+
+    live = WindowedProvider(provider, timeframe, window)
+    instances = {'warm': make_warm(live, checkpoint_dir), 'cold': make_warm(live, None)}
+    results = {name: {'first_ms': None, 'mismatched': 0, 'deviation': 0.0} for name in instances}
+    for end in range(start + 1, len(df) + 1):
+        # 策略合并informative时会重建索引，只比较最后一行的值
+        full = analyze_pair(full_strategy, df.iloc[:end].copy(), pair).iloc[-1]
+        reference = signal_frame(full.to_frame().T.infer_objects()).reset_index(drop=True)
+        numeric = [c for c, v in full.items() if isinstance(v, float) and v == v and v != 0]
+        live.at(df['date'].iloc[end - 1])
+        recent = df.iloc[max(0, end - window):end]
+        for name, strategy in instances.items():
+            inputs = recent.copy()
+            started = time.perf_counter()
+            out = analyze_pair(strategy, inputs, pair)
+            elapsed = (time.perf_counter() - started) * 1000
+            if results[name]['first_ms'] is None:
+                results[name]['first_ms'] = elapsed
+            if len(out) != len(recent) or \
+                    not signal_frame(out.iloc[-1:]).reset_index(drop=True).equals(reference):
+                results[name]['mismatched'] += 1
+            last = out.iloc[-1]
+            deviation = max((abs(float(last[c]) / full[c] - 1) for c in numeric if c in last.index), default=0.0)
+            results[name]['deviation'] = max(results[name]['deviation'], deviation)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='实盘增量分析回放')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--strategy-path', help='策略目录，默认 user_data/strategies')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--timerange', help='时间范围，如 20240101-20241231')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--fixture', type=int, metavar='DAYS', help='使用指定天数的模拟K线')
+    parser.add_argument('--candles', type=int, default=100, help='回放的K线数')
+    parser.add_argument('--lookback', type=int, help='覆盖策略的回看长度（tail_lookback）')
+    parser.add_argument('--restart', action='store_true', help='模拟重启，对比检查点热启动与冷启动（warm_start）')
+    parser.add_argument('--window', type=int, default=300, help='重启后每次输入的K线数')
+    args = parser.parse_args()
+
+    # 两种方式都从未装饰的策略类出发，避免环境变量影响对照组
+    for name in ('FT_STRATEGY_TAIL', 'FT_STRATEGY_CHECKPOINT_DIR'):
+        os.environ.pop(name, None)
+    if str(STRATEGY_DIR) not in sys.path:
+        sys.path.insert(0, str(STRATEGY_DIR))
+    from tail_recompute import STATS, tail_lookback, tail_recompute
+    from warm_start import warm_start
+
+    config = load_config(args.config)
+    strategy_name = args.strategy or config.get('strategy')
+    if not strategy_name:
+        parser.error('需要 --strategy 或配置中的strategy')
+    pairs = args.pairs or config_pairs(config)
+    timeframe = config.get('timeframe', '1h')
+    if args.fixture:
+        from benchmark_fixtures import FixtureDataProvider
+        provider = FixtureDataProvider(pairs, timeframe, args.fixture)
+    else:
+        provider = LocalDataProvider(config, pairs, args.datadir, args.timerange)
+
+    strategy_path = args.strategy_path or STRATEGY_DIR
+    full_strategy = load_strategy(strategy_name, config, provider, strategy_path)
+    base = type(full_strategy)
+    # 与freqtrade一致，策略声明的时间框架优先于配置
+    timeframe = base.timeframe or timeframe
+    attrs = {} if args.lookback is None else {'tail_lookback': args.lookback}
+
+    def instance(cls, dp):
+        strategy = cls(config)
+        strategy.dp = dp
+        if hasattr(strategy, 'ft_bot_start'):
+            strategy.ft_bot_start()
+        return strategy
+
+    def make_warm(dp, checkpoint_dir):
+        """checkpoint_dir 为None时返回未装饰的策略（冷启动）"""
+        if checkpoint_dir is None:
+            return instance(base, dp)
+        cls = warm_start(type(f"{base.__name__}Warm", (base,), {}), enabled=True, live_only=False,
+                         checkpoint_dir=checkpoint_dir)
+        return instance(cls, dp)
+
+    if args.restart:
+        run_restart(args, full_strategy, make_warm, provider, pairs, timeframe)
+        return
+
+    tail_strategy = instance(tail_recompute(type(f"{base.__name__}Tail", (base,), attrs), enabled=True,
+                                            live_only=False), provider)
+
+    print(f"🔁 {strategy_name}  回放 {args.candles} 根K线  回看 {tail_lookback(tail_strategy)} 行")
+    print(f"{'交易对':<18}{'历史K线':>10}{'整段ms':>10}{'末尾ms':>10}{'加速':>8}  信号")
+    failed = False
+    for pair in pairs:
+        df = provider.get_pair_dataframe(pair, timeframe)
+        if len(df) <= args.candles:
+            print(f"⚠️  {pair}: K线不足 {args.candles} 根")
+            continue
+        result = replay_pair(full_strategy, tail_strategy, df, pair, args.candles)
+        failed |= bool(result['mismatched'])
+        status = '✅ 一致' if not result['mismatched'] else \
+            f"❌ {result['mismatched']} 根不一致，首个 {result['first_mismatch']}"
+        print(f"{pair:<18}{len(df):>10,}{result['full_ms']:>10.1f}{result['tail_ms']:>10.1f}"
+              f"{result['full_ms'] / max(result['tail_ms'], 1e-9):>7.1f}x  {status}")
+    print(f"只重算末尾 {STATS['tail']} 次, 整段计算 {STATS['full']} 次, 无新K线 {STATS['cached']} 次")
+    sys.exit(1 if failed else 0)
+
+
+def run_restart(args, full_strategy, make_warm, provider, pairs, timeframe):
+    from warm_start import STATS
+
+    print(f"♻️  重启模拟: 回放 {args.candles} 根K线, 每次输入 {args.window} 根")
+    print(f"{'交易对':<18}{'热启动首根ms':>14}{'冷启动首根ms':>14}{'热启动不一致':>14}{'冷启动不一致':>14}"
+          f"{'热启动指标偏差':>16}{'冷启动指标偏差':>16}")
+    failed = False
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        for pair in pairs:
+            df = provider.get_pair_dataframe(pair, timeframe)
+            if len(df) <= args.candles:
+                print(f"⚠️  {pair}: K线不足 {args.candles} 根")
+                continue
+            result = restart_pair(full_strategy, make_warm, provider, df, pair, args.candles, args.window,
+                                  checkpoint_dir)
+            warm, cold = result['warm'], result['cold']
+            failed |= bool(warm['mismatched'])
+            print(f"{pair:<18}{warm['first_ms']:>14.1f}{cold['first_ms']:>14.1f}"
+                  f"{warm['mismatched']:>14}{cold['mismatched']:>14}"
+                  f"{warm['deviation']:>16.2e}{cold['deviation']:>16.2e}")
+    print(f"检查点恢复 {STATS['restored']} 次, 不连续丢弃 {STATS['rejected']} 次, 接上保存的K线 {STATS['extended']} 次")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
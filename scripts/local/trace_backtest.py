@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+回测追踪
+以追踪模式运行一次完整回测，记录数据加载、逐交易对指标计算、信号生成和策略回调的时间段，
+导出为Chrome trace-event json，在 chrome://tracing 或 https://ui.perfetto.dev 中打开即可
+查看各阶段的先后顺序、停顿和串行部分（例如8PM策略7个交易对的指标是否逐个串行计算）。
+
+每个追踪段带有 strategy / pair / timeframe / rows 参数。
+
+使用示例:
+    # freqtrade完整回测
+    python scripts/local/trace_backtest.py --config config/eightpm_backtest.json \\
+        --strategy EightPMHighLowStrategy --timerange 20240101-20241231
+
+    # 不安装freqtrade时，用本地预筛选引擎跑同样的策略代码
+    python scripts/local/trace_backtest.py --engine prescreen --timerange 20240101-20241231
+"""
+
+import argparse
+import functools
+import os
+import sys
+import time
+from pathlib import Path
+
+from freqtrade_data import PROJECT_ROOT, STRATEGY_DIR, load_config
+
+
+TRACE_DIR = PROJECT_ROOT / 'user_data' / 'logs'
+
+
+def _rows_of(result):
+    """返回值中的K线行数（DataFrame或 {pair: DataFrame}）"""
+    if isinstance(result, dict):
+        return sum(len(v) for v in result.values() if hasattr(v, '__len__'))
+    return len(result) if hasattr(result, '__len__') else None
+
+
+def trace_function(tracer, owner, name, category, args_of=None):
+    """把 owner.name 替换为带追踪的版本，args_of(args, kwargs) 返回追踪参数"""
+    func = getattr(owner, name, None)
+    if func is None:
+        print(f"⚠️  未找到 {getattr(owner, '__name__', owner)}.{name}，跳过追踪")
+        return
+
+    @functools.wraps(func)
+    def traced(*args, **kwargs):
+        trace_args = args_of(args, kwargs) if args_of else {}
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            finished = time.perf_counter()
+        rows = _rows_of(result)
+        if rows is not None:
+            trace_args['rows'] = rows
+        tracer.add(name, category, started, finished, trace_args)
+        return result
+
+    setattr(owner, name, traced)
+
+
+def _history_args(args, kwargs):
+    pair = kwargs.get('pair', args[0] if args else '')
+    timeframe = kwargs.get('timeframe', args[1] if len(args) > 1 else '')
+    return {'pair': pair, 'timeframe': timeframe}
+
+
+def install_freqtrade_hooks(tracer):
+    """freqtrade回测中策略之外的阶段：数据加载、信号数组准备、逐K线回测循环"""
+    from freqtrade.data.history import history_utils
+    from freqtrade.optimize.backtesting import Backtesting
+
+    trace_function(tracer, history_utils, 'load_pair_history', 'data', _history_args)
+    trace_function(tracer, Backtesting, 'load_bt_data', 'data')
+    trace_function(tracer, Backtesting, '_get_ohlcv_as_lists', 'signals')
+    trace_function(tracer, Backtesting, 'backtest', 'backtest')
+
+
+def install_prescreen_hooks(tracer):
+    import freqtrade_data
+    from prescreen_backtest import PrescreenBacktester
+
+    trace_function(tracer, freqtrade_data, 'load_pair_history', 'data', _history_args)
+    trace_function(tracer, PrescreenBacktester, 'run', 'backtest')
+
+
+def run_freqtrade(config_path, strategy, timerange, extra_args):
+    from freqtrade.main import main as freqtrade_main
+
+    argv = ['backtesting', '--config', config_path, '--strategy', strategy]
+    if timerange:
+        argv += ['--timerange', timerange]
+    try:
+        freqtrade_main(argv + list(extra_args))
+    except SystemExit as e:
+        return e.code or 0
+    return 0
+
+
+def run_prescreen(config, strategy, timerange, pairs):
+    from prescreen_backtest import prescreen
+
+    prescreen(strategy, config, pairs or config.get('exchange', {}).get('pair_whitelist', []),
+              timerange)
+    return 0
+
+
+def summarize(events):
+    """按追踪段名汇总耗时，打印到终端"""
+    totals = {}
+    for e in events:
+        if e.get('ph') != 'X':
+            continue
+        item = totals.setdefault((e['cat'], e['name']), [0, 0.0])
+        item[0] += 1
+        item[1] += e['dur'] / 1e6
+    print(f"\n{'分类':<14}{'追踪段':<28}{'次数':>8}{'总耗时(s)':>12}")
+    for (category, name), (count, seconds) in sorted(totals.items(), key=lambda kv: -kv[1][1]):
+        print(f"{category:<14}{name:<28}{count:>8}{seconds:>12.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回测追踪（Chrome trace-event导出）')
+    parser.add_argument('--config', default='config/eightpm_backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--strategy', help='策略类名，默认使用配置中的strategy')
+    parser.add_argument('--timerange', help='时间范围 YYYYMMDD-YYYYMMDD')
+    parser.add_argument('--pairs', nargs='+', help='交易对（仅prescreen引擎），默认使用配置白名单')
+    parser.add_argument('--engine', choices=['freqtrade', 'prescreen'], default='freqtrade',
+                        help='回测引擎')
+    parser.add_argument('--output', help='追踪文件路径，默认 user_data/logs/trace-<策略>-<时间>.json')
+    args, extra = parser.parse_known_args()
+
+    config = load_config(args.config)
+    strategy = args.strategy or config['strategy']
+    output = Path(args.output) if args.output else \
+        TRACE_DIR / f"trace-{strategy}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+
+    # 必须在导入策略之前设置，策略类在导入时决定是否包装
+    os.environ['FT_STRATEGY_TRACE'] = str(output)
+    if str(STRATEGY_DIR) not in sys.path:
+        sys.path.insert(0, str(STRATEGY_DIR))
+    from strategy_metrics import TRACER
+
+    if args.engine == 'freqtrade':
+        install_freqtrade_hooks(TRACER)
+        code = run_freqtrade(args.config, strategy, args.timerange, extra)
+    else:
+        install_prescreen_hooks(TRACER)
+        code = run_prescreen(config, strategy, args.timerange, args.pairs)
+
+    TRACER.export(output)
+    summarize(TRACER.events())
+    print(f"\n追踪文件已保存: {output}")
+    print("在 chrome://tracing 或 https://ui.perfetto.dev 中打开")
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+成交记录 -> K线
+按块流式读取freqtrade的成交文件（dataformat_trades: json/.gz，以及feather/parquet），
+向量化分桶聚合为K线，内存占用只与块大小有关，可处理上千万条成交。
+json格式的耗时主要在文本解析上；feather/parquet按记录批次读取，快一个数量级。
+
+输出列: date open high low close volume trades buy_volume sell_volume vwap
+支持任意时间框架（含10s、30s等亚分钟级）和成交量K线（每根累计固定成交量）。
+
+使用示例:
+    # 1m arbitrage策略用的10秒K线，输出csv
+    python scripts/local/trades_to_ohlcv.py --config config/backtest.json --pairs ETH/USDT \\
+        --timeframe 10s --output user_data/data/okx/ETH_USDT-10s-trades.csv
+
+    # 每根50 ETH的成交量K线
+    python scripts/local/trades_to_ohlcv.py --config config/backtest.json --pairs ETH/USDT --volume-bar 50
+
+    # 生成freqtrade可直接使用的1m K线json
+    python scripts/local/trades_to_ohlcv.py --config config/backtest.json --timeframe 1m --write-json
+
+    # 自检：模拟成交分块聚合，与一次性聚合的结果比对并报告吞吐和峰值内存
+    python scripts/local/trades_to_ohlcv.py --self-check --trades 5000000
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from freqtrade_data import (
+    candle_file_candidates, candle_type_of, config_pairs, exchange_data_dir, load_config,
+    pair_to_filename, timeframe_to_ms,
+)
+
+
+# freqtrade成交列: [timestamp, id, type, side, price, amount, cost]
+TRADE_TS, TRADE_SIDE, TRADE_PRICE, TRADE_AMOUNT = 0, 3, 4, 5
+TRADE_KEYS = ['timestamp', 'id', 'type', 'side', 'price', 'amount', 'cost']
+
+BAR_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume',
+               'trades', 'buy_volume', 'sell_volume', 'vwap']
+
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+TRADE_FILE_EXTENSIONS = ('.json', '.json.gz', '.feather', '.parquet')
+
+
+def trades_file(datadir, pair, candle_type='spot'):
+    """freqtrade成交文件: <交易对>-trades[-<K线类型>].<json/json.gz/feather/parquet>"""
+    datadir = Path(datadir)
+    name = f"{pair_to_filename(pair)}-trades"
+    dirs = [datadir]
+    if candle_type and candle_type != 'spot':
+        name = f"{name}-{candle_type}"
+        dirs = [datadir / 'futures', datadir]
+    for d in dirs:
+        for ext in TRADE_FILE_EXTENSIONS:
+            if (d / f"{name}{ext}").exists():
+                return d / f"{name}{ext}"
+    return None
+
+
+def iter_trade_chunks(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    流式读取成交json数组，每次返回 (时间戳int64, 价格, 数量, 是否主动买入) 数组
+    文本按块读取，在最后一个完整元素处截断后交给json.loads解析（C实现），不逐条解析
+    兼容列表格式 [[ts, id, type, side, price, amount, cost], ...] 和旧的字典格式
+    """
+    path = Path(path)
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        buffer = f.read(chunk_bytes).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"不是json数组: {path}")
+        buffer = buffer[1:]
+        closing = None
+        while True:
+            more = f.read(chunk_bytes)
+            buffer = buffer.lstrip().lstrip(',')
+            if closing is None and buffer:
+                closing = '}' if buffer[0] == '{' else ']'
+            if not more:
+                # 最后一块：去掉外层数组的右括号
+                body = buffer.rstrip()
+                if body.endswith(']'):
+                    body = body[:-1]
+                if body.strip():
+                    yield _parse_elements(body)
+                return
+            cut = buffer.rfind(closing) if closing else -1
+            if cut >= 0:
+                yield _parse_elements(buffer[:cut + 1])
+                buffer = buffer[cut + 1:]
+            buffer += more
+
+
+def iter_arrow_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """feather/parquet成交文件按记录批次读取（需要pyarrow，freqtrade已依赖）"""
+    import pyarrow as pa
+
+    path = Path(path)
+    columns = ['timestamp', 'side', 'price', 'amount']
+    if path.suffix == '.parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(str(path)))
+        batches = (reader.get_batch(i).select(columns) for i in range(reader.num_record_batches))
+
+    for batch in batches:
+        for lo in range(0, batch.num_rows, chunk_rows):
+            part = batch.slice(lo, chunk_rows)
+            ts = part.column(0)
+            if pa.types.is_timestamp(ts.type):
+                ts = ts.cast(pa.timestamp('ms')).cast(pa.int64())
+            yield (
+                np.asarray(ts.to_numpy(zero_copy_only=False), dtype='int64'),
+                part.column(2).to_numpy(zero_copy_only=False).astype('float64', copy=False),
+                part.column(3).to_numpy(zero_copy_only=False).astype('float64', copy=False),
+                np.asarray(part.column(1).to_numpy(zero_copy_only=False)) == 'buy',
+            )
+
+
+def _parse_elements(text):
+    elements = json.loads('[' + text.strip().lstrip(',') + ']')
+    if not elements:
+        return _empty_chunk()
+    if isinstance(elements[0], dict):
+        elements = [[e.get(k) for k in TRADE_KEYS] for e in elements]
+    arr = np.array(elements, dtype=object)
+    return (
+        arr[:, TRADE_TS].astype('int64'),
+        arr[:, TRADE_PRICE].astype('float64'),
+        arr[:, TRADE_AMOUNT].astype('float64'),
+        arr[:, TRADE_SIDE] == 'buy',
+    )
+
+
+def _empty_chunk():
+    return (np.empty(0, dtype='int64'), np.empty(0), np.empty(0), np.empty(0, dtype=bool))
+
+
+def _aggregate(bar_id, ts, price, amount, is_buy):
+    """按已排序的bar_id聚合，返回 (bar_id, 每列数组字典)"""
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(bar_id)) + 1])
+    ends = np.concatenate([starts[1:], [len(bar_id)]]) - 1
+    buy_amount = np.where(is_buy, amount, 0.0)
+    return bar_id[starts], {
+        'date': ts[starts],
+        'open': price[starts],
+        'high': np.maximum.reduceat(price, starts),
+        'low': np.minimum.reduceat(price, starts),
+        'close': price[ends],
+        'volume': np.add.reduceat(amount, starts),
+        'trades': np.diff(np.concatenate([starts, [len(bar_id)]])),
+        'buy_volume': np.add.reduceat(buy_amount, starts),
+        'quote_volume': np.add.reduceat(price * amount, starts),
+    }
+
+
+class BarAggregator:
+    """
+    流式K线聚合器
+    每块内部向量化聚合；块内最后一根K线可能未结束，暂存并与下一块的第一根合并
+    timeframe: 时间K线（桶起点为date）；volume_bar: 每根累计的成交量（date为第一笔成交时间）
+    """
+
+    def __init__(self, timeframe=None, volume_bar=None):
+        if (timeframe is None) == (volume_bar is None):
+            raise ValueError("timeframe 和 volume_bar 必须且只能指定一个")
+        self.tf_ms = timeframe_to_ms(timeframe) if timeframe else None
+        self.volume_bar = volume_bar
+        self._cum_volume = 0.0
+        self._pending = None
+        self._last_ts = None
+        self._done = []
+        self.trade_count = 0
+
+    def _bar_ids(self, ts, amount):
+        if self.tf_ms:
+            return ts - ts % self.tf_ms
+        # 成交量K线：按成交前的累计成交量编号，越过阈值的那笔成交属于当前K线
+        cum_after = self._cum_volume + np.cumsum(amount)
+        cum_before = cum_after - amount
+        self._cum_volume = float(cum_after[-1])
+        return np.floor(cum_before / self.volume_bar).astype('int64')
+
+    def add(self, ts, price, amount, is_buy):
+        if len(ts) == 0:
+            return
+        if np.any(np.diff(ts) < 0):
+            order = np.argsort(ts, kind='stable')
+            ts, price, amount, is_buy = ts[order], price[order], amount[order], is_buy[order]
+        if self._last_ts is not None and ts[0] < self._last_ts:
+            raise ValueError("成交数据未按时间排序：当前块早于上一块")
+        self._last_ts = int(ts[-1])
+        self.trade_count += len(ts)
+
+        ids, bars = _aggregate(self._bar_ids(ts, amount), ts, price, amount, is_buy)
+        if self._pending is not None:
+            pid, prev = self._pending
+            if ids[0] == pid:
+                _merge_first(prev, bars)
+            else:
+                self._done.append(prev)
+        self._pending = (ids[-1], {k: v[-1:] for k, v in bars.items()})
+        if len(ids) > 1:
+            self._done.append({k: v[:-1] for k, v in bars.items()})
+
+    def result(self, include_partial=True):
+        """全部K线的DataFrame；include_partial=False 时去掉最后一根（可能尚未结束）"""
+        parts = list(self._done)
+        if self._pending is not None and include_partial:
+            parts.append(self._pending[1])
+        if not parts:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        if self.tf_ms:
+            cols['date'] = cols['date'] - cols['date'] % self.tf_ms
+        df = pd.DataFrame({
+            'date': pd.to_datetime(cols['date'], unit='ms', utc=True),
+            'open': cols['open'],
+            'high': cols['high'],
+            'low': cols['low'],
+            'close': cols['close'],
+            'volume': cols['volume'],
+            'trades': cols['trades'].astype('int64'),
+            'buy_volume': cols['buy_volume'],
+            'sell_volume': cols['volume'] - cols['buy_volume'],
+            'vwap': cols['quote_volume'] / cols['volume'],
+        })
+        return df
+
+
+def _merge_first(prev, bars):
+    """把暂存的未结束K线并入新块的第一根（原位修改bars）"""
+    bars['date'][0] = prev['date'][0]
+    bars['open'][0] = prev['open'][0]
+    bars['high'][0] = max(bars['high'][0], prev['high'][0])
+    bars['low'][0] = min(bars['low'][0], prev['low'][0])
+    for key in ('volume', 'trades', 'buy_volume', 'quote_volume'):
+        bars[key][0] += prev[key][0]
+
+
+def aggregate_file(path, timeframe=None, volume_bar=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    aggregator = BarAggregator(timeframe, volume_bar)
+    if Path(path).suffix in ('.feather', '.parquet'):
+        # 块大小按json约70字节/笔换算为行数
+        chunks = iter_arrow_chunks(path, max(chunk_bytes // 70, 1))
+    else:
+        chunks = iter_trade_chunks(path, chunk_bytes)
+    for chunk in chunks:
+        aggregator.add(*chunk)
+    return aggregator
+
+
+def write_output(df, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == '.parquet':
+        df.to_parquet(path, index=False)
+    elif path.suffix == '.feather':
+        df.to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def write_candle_json(df, datadir, pair, timeframe, candle_type='spot'):
+    """只写OHLCV六列，供freqtrade回测使用"""
+    path = candle_file_candidates(datadir, pair, timeframe, candle_type)[0]
+    ts = (df['date'] - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(milliseconds=1)
+    rows = np.column_stack([ts.to_numpy('float64'),
+                            df[['open', 'high', 'low', 'close', 'volume']].to_numpy('float64')]).tolist()
+    for row in rows:
+        row[0] = int(row[0])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(rows), encoding='utf-8')
+    return path
+
+
+def synthetic_trades(n, start_ms=1704067200000, seed=7):
+    """模拟成交：平均每秒约20笔，价格随机游走，买卖方向随机"""
+    rng = np.random.default_rng(seed)
+    ts = start_ms + np.cumsum(rng.exponential(50.0, n)).astype('int64')
+    price = np.round(2400.0 * np.exp(np.cumsum(rng.normal(0, 2e-5, n))), 2)
+    amount = np.round(rng.exponential(0.5, n), 4) + 0.0001
+    side = np.where(rng.random(n) < 0.5, 'buy', 'sell')
+    return ts, price, amount, side
+
+
+def write_synthetic_trades(path, n, batch=1_000_000):
+    """分批写出freqtrade格式的成交json，避免一次性生成大字符串"""
+    ts, price, amount, side = synthetic_trades(n)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for lo in range(0, n, batch):
+            hi = min(lo + batch, n)
+            rows = [[int(ts[i]), str(i), None, side[i], float(price[i]), float(amount[i]),
+                     float(price[i] * amount[i])] for i in range(lo, hi)]
+            text = json.dumps(rows)[1:-1]
+            f.write((',' if lo else '') + text)
+        f.write(']')
+    return ts, price, amount, side == 'buy'
+
+
+def reference_bars(ts, price, amount, is_buy, timeframe=None, volume_bar=None):
+    """一次性聚合（pandas groupby），用于自检"""
+    if timeframe:
+        tf_ms = timeframe_to_ms(timeframe)
+        key = ts - ts % tf_ms
+    else:
+        key = np.floor((np.cumsum(amount) - amount) / volume_bar).astype('int64')
+    df = pd.DataFrame({'key': key, 'ts': ts, 'price': price, 'amount': amount,
+                       'buy': np.where(is_buy, amount, 0.0), 'quote': price * amount})
+    g = df.groupby('key', sort=True)
+    out = pd.DataFrame({
+        'date': (g['key'].first() if timeframe else g['ts'].first()).to_numpy(),
+        'open': g['price'].first().to_numpy(), 'high': g['price'].max().to_numpy(),
+        'low': g['price'].min().to_numpy(), 'close': g['price'].last().to_numpy(),
+        'volume': g['amount'].sum().to_numpy(), 'trades': g.size().to_numpy(),
+        'buy_volume': g['buy'].sum().to_numpy(),
+    })
+    out['vwap'] = g['quote'].sum().to_numpy() / out['volume'].to_numpy()
+    out['date'] = pd.to_datetime(out['date'], unit='ms', utc=True)
+    return out
+
+
+def self_check(n_trades, chunk_bytes):
+    ok = True
+    with tempfile.TemporaryDirectory(prefix='trades_') as tmp:
+        path = Path(tmp) / 'ETH_USDT-trades.json'
+        print(f"生成 {n_trades:,} 条模拟成交 ...")
+        ts, price, amount, is_buy = write_synthetic_trades(path, n_trades)
+        size_mb = path.stat().st_size / 1024 / 1024
+        cases = [('10s', None), ('1m', None), (None, 50.0)]
+        for i, (timeframe, volume_bar) in enumerate(cases):
+            label = timeframe or f"成交量{volume_bar:g}"
+            started = time.perf_counter()
+            bars = aggregate_file(path, timeframe, volume_bar, chunk_bytes).result()
+            elapsed = time.perf_counter() - started
+
+            # tracemalloc会显著拖慢json解析，峰值内存单独测一次
+            memory = ''
+            if i == 0:
+                tracemalloc.start()
+                aggregate_file(path, timeframe, volume_bar, chunk_bytes)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                memory = f"  峰值内存 {peak / 1024 / 1024:.1f} MB (文件 {size_mb:.0f} MB, 块 {chunk_bytes / 1024 / 1024:.0f} MB)"
+
+            ref = reference_bars(ts, price, amount, is_buy, timeframe, volume_bar)
+            same = len(bars) == len(ref) and (bars['date'] == ref['date']).all() and all(
+                np.allclose(bars[c].to_numpy('float64'), ref[c].to_numpy('float64'), rtol=1e-9, atol=1e-9)
+                for c in ['open', 'high', 'low', 'close', 'volume', 'trades', 'buy_volume', 'vwap'])
+            ok &= bool(same)
+            print(f"{'✅' if same else '❌'} {label:<10}{len(bars):>9} 根K线  {elapsed:>7.2f}秒  "
+                  f"{n_trades / elapsed / 1e6:>6.2f} 百万笔/秒{memory}")
+    print("\n✅ 分块聚合与一次性聚合一致" if ok else "\n❌ 自检失败")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='成交记录 -> K线')
+    parser.add_argument('--config', default='config/backtest.json', help='freqtrade配置文件')
+    parser.add_argument('--pairs', nargs='+', help='交易对，默认使用配置白名单')
+    parser.add_argument('--datadir', help='数据目录，默认 user_data/data/<exchange>')
+    parser.add_argument('--timeframe', help='K线时间框架，如 10s / 1m / 5m')
+    parser.add_argument('--volume-bar', type=float, help='成交量K线：每根累计的成交量')
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_BYTES / 1024 / 1024,
+                        help='每次读取的文本块大小(MB)')
+    parser.add_argument('--output', help='输出文件(.csv/.parquet/.feather)，多个交易对时作为目录')
+    parser.add_argument('--write-json', action='store_true', help='写出freqtrade K线json（仅时间K线）')
+    parser.add_argument('--include-partial', action='store_true', help='保留最后一根可能未结束的K线')
+    parser.add_argument('--self-check', action='store_true', help='用模拟成交自检')
+    parser.add_argument('--trades', type=int, default=2_000_000, help='自检的模拟成交数')
+    args = parser.parse_args()
+    chunk_bytes = int(args.chunk_mb * 1024 * 1024)
+
+    if args.self_check:
+        sys.exit(0 if self_check(args.trades, chunk_bytes) else 1)
+    if (args.timeframe is None) == (args.volume_bar is None):
+        parser.error('需要且只能指定 --timeframe 或 --volume-bar 之一')
+    if args.write_json and not args.timeframe:
+        parser.error('--write-json 只支持时间K线')
+
+    config = load_config(args.config)
+    datadir = exchange_data_dir(config, args.datadir)
+    candle_type = candle_type_of(config)
+    pairs = args.pairs or config_pairs(config)
+    label = args.timeframe or f"vol{args.volume_bar:g}"
+
+    for pair in pairs:
+        path = trades_file(datadir, pair, candle_type)
+        if path is None:
+            print(f"⚠️  {pair}: 没有成交数据，可先运行 freqtrade download-data --dl-trades")
+            continue
+        started = time.perf_counter()
+        aggregator = aggregate_file(path, args.timeframe, args.volume_bar, chunk_bytes)
+        bars = aggregator.result(include_partial=args.include_partial)
+        elapsed = time.perf_counter() - started
+        print(f"✅ {pair}: {aggregator.trade_count:,} 笔成交 -> {len(bars):,} 根 {label} K线 ({elapsed:.1f}秒)")
+
+        if args.output:
+            output = Path(args.output)
+            if len(pairs) > 1:
+                output = output / f"{pair_to_filename(pair)}-{label}.csv"
+            print(f"   -> {write_output(bars, output)}")
+        if args.write_json:
+            print(f"   -> {write_candle_json(bars, datadir, pair, args.timeframe, candle_type)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,12 +9,18 @@
 5. 资金管理优化
 """
 
+import sys
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'user_data' / 'strategies'))
+from eightpm_signals import confirm_window, confirmation_lags, shift_rows  # noqa: E402
+
 
 class AdvancedEightPMStrategy:
     def __init__(self, initial_balance=10000, base_position_size=100):
@@ -27,6 +33,8 @@ class AdvancedEightPMStrategy:
         self.volume_threshold = 1.3  # 成交量阈值
         self.momentum_threshold = 0.0015  # 动量阈值
         self.confirmation_hours = 2  # 确认时间（小时）
+        self.confirmation_candles = 1  # 确认窗口K线数（从确认时间开始）
+        self.confirmation_mode = 'any'  # any 窗口内任一小时确认 / all 每小时都确认
         self.take_profit_ratio = 2.0  # 止盈比例（相对于止损）
         self.max_position_ratio = 0.15  # 最大仓位比例
         
@@ -194,34 +202,23 @@ class AdvancedEightPMStrategy:
             df['high_volatility']
         )
         
-        # 确认条件（需要在后续几小时内确认）
-        df['price_confirm_long'] = False
-        df['price_confirm_short'] = False
-        
-        # 计算确认信号
-        for i in range(len(df)):
-            if i < self.confirmation_hours:
-                continue
-                
-            # 做多确认：价格在确认期内开始上涨
-            if base_long_condition.iloc[i-self.confirmation_hours]:
-                entry_price = df['Close'].iloc[i-self.confirmation_hours]
-                current_price = df['Close'].iloc[i]
-                momentum_confirm = df['momentum_3h'].iloc[i] > self.momentum_threshold
-                price_confirm = current_price > entry_price * 1.002  # 0.2%确认
-                
-                if momentum_confirm and price_confirm:
-                    df.iloc[i, df.columns.get_loc('price_confirm_long')] = True
-            
-            # 做空确认：价格在确认期内开始下跌
-            if base_short_condition.iloc[i-self.confirmation_hours]:
-                entry_price = df['Close'].iloc[i-self.confirmation_hours]
-                current_price = df['Close'].iloc[i]
-                momentum_confirm = df['momentum_3h'].iloc[i] < -self.momentum_threshold
-                price_confirm = current_price < entry_price * 0.998  # 0.2%确认
-                
-                if momentum_confirm and price_confirm:
-                    df.iloc[i, df.columns.get_loc('price_confirm_short')] = True
+        # 确认条件（需要在后续几小时内确认）：动量和价格相对8点收盘价同时确认
+        # 按距离整列比较，不逐行循环（见 user_data/strategies/eightpm_signals.py）
+        close = df['Close'].to_numpy()
+        momentum = df['momentum_3h'].to_numpy()
+        lags = confirmation_lags(self.confirmation_hours, self.confirmation_candles)
+        
+        # 做多确认：价格在确认期内开始上涨
+        df['price_confirm_long'] = confirm_window(
+            base_long_condition.to_numpy(),
+            lambda lag: (momentum > self.momentum_threshold) & (close > shift_rows(close, lag) * 1.002),  # 0.2%确认
+            lags, self.confirmation_mode)
+        
+        # 做空确认：价格在确认期内开始下跌
+        df['price_confirm_short'] = confirm_window(
+            base_short_condition.to_numpy(),
+            lambda lag: (momentum < -self.momentum_threshold) & (close < shift_rows(close, lag) * 0.998),  # 0.2%确认
+            lags, self.confirmation_mode)
         
         # 市场状态过滤
         market_suitable_for_reversal = (
@@ -5,7 +5,15 @@ import freqtrade.vendor.qtpylib.indicators as qtpylib
 import pandas as pd
 import numpy as np
 
+from eightpm_signals import confirm_window, confirmation_lags
+from frame_compaction import compact_strategy
+from parallel_analysis import parallel_analysis
+from strategy_metrics import instrument_strategy, metric_section
 
+
+@parallel_analysis
+@instrument_strategy
+@compact_strategy
 class EightPMHighLowStrategy(IStrategy):
     """
     v3.2 回归优化版晚上8点高低点策略
@@ -77,6 +85,10 @@ class EightPMHighLowStrategy(IStrategy):
     
     # 回归7币种池：重新加入DOT，避免v3.1中ADA/SOL转亏问题
 
+    # 确认窗口：8点之后的K线数，any 任一根满足即确认 / all 全部满足（1根时两者相同）
+    confirmation_candles = 1
+    confirmation_mode = 'any'
+
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """
         计算技术指标
@@ -88,17 +100,18 @@ class EightPMHighLowStrategy(IStrategy):
         
         # v2.2 多时间框架趋势确认
         if self.trend_confirmation:
-            # 获取4小时数据
-            informative = self.dp.get_pair_dataframe(pair=metadata['pair'], timeframe='4h')
-            if informative is not None and len(informative) > 0:
-                informative['sma_4h'] = ta.SMA(informative, timeperiod=20)
-                informative['trend_4h'] = np.where(informative['close'] > informative['sma_4h'], 1, -1)
-                
-                # 合并到1小时数据 - 注意列名会有后缀
-                dataframe = merge_informative_pair(dataframe, informative, self.timeframe, '4h', ffill=True)
-            else:
-                # 如果没有4小时数据，创建默认值
-                dataframe['trend_4h_4h'] = 0
+            with metric_section(self, 'informative_merge', metadata['pair']):
+                # 获取4小时数据
+                informative = self.dp.get_pair_dataframe(pair=metadata['pair'], timeframe='4h')
+                if informative is not None and len(informative) > 0:
+                    informative['sma_4h'] = ta.SMA(informative, timeperiod=20)
+                    informative['trend_4h'] = np.where(informative['close'] > informative['sma_4h'], 1, -1)
+                    
+                    # 合并到1小时数据 - 注意列名会有后缀
+                    dataframe = merge_informative_pair(dataframe, informative, self.timeframe, '4h', ffill=True)
+                else:
+                    # 如果没有4小时数据，创建默认值
+                    dataframe['trend_4h_4h'] = 0
         
         # 每日统计
         daily_stats = dataframe.groupby('date_only').agg({
@@ -111,17 +124,18 @@ class EightPMHighLowStrategy(IStrategy):
         dataframe = dataframe.join(daily_stats, on='date_only')
         
         # 技术指标
-        dataframe['sma_20'] = ta.SMA(dataframe, timeperiod=20)
-        dataframe['volume_sma'] = ta.SMA(dataframe['volume'], timeperiod=20)
-        dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
-        dataframe['price_change_1h'] = dataframe['close'].pct_change(1)
-        
-        # 添加RSI指标用于超买超卖判断
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
-        
-        # 添加波动率指标
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
-        dataframe['volatility'] = dataframe['atr'] / dataframe['close']
+        with metric_section(self, 'talib_indicators', metadata['pair']):
+            dataframe['sma_20'] = ta.SMA(dataframe, timeperiod=20)
+            dataframe['volume_sma'] = ta.SMA(dataframe['volume'], timeperiod=20)
+            dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
+            dataframe['price_change_1h'] = dataframe['close'].pct_change(1)
+            
+            # 添加RSI指标用于超买超卖判断
+            dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
+            
+            # 添加波动率指标
+            dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
+            dataframe['volatility'] = dataframe['atr'] / dataframe['close']
         
         # 8点极值判断 - 统一参数，专注高表现币种
         dataframe['is_daily_high_at_8pm'] = (
@@ -193,20 +207,18 @@ class EightPMHighLowStrategy(IStrategy):
         dataframe['base_long'] = np.logical_and.reduce(base_long_conditions)
         dataframe['base_short'] = np.logical_and.reduce(base_short_conditions)
         
-        # 价格确认
-        dataframe['confirmed_long'] = False
-        dataframe['confirmed_short'] = False
-        
-        for i in range(1, len(dataframe)):
+        # 价格确认：8点之后 confirmation_candles 根K线内的1小时涨跌幅（向量化，见 eightpm_signals.py）
+        with metric_section(self, 'confirmation', pair):
+            price_change = dataframe['price_change_1h'].to_numpy()
+            lags = confirmation_lags(1, self.confirmation_candles)
             # 做多确认：价格开始反弹
-            if dataframe['base_long'].iloc[i-1]:
-                if dataframe['price_change_1h'].iloc[i] > self.confirmation_threshold:
-                    dataframe.iloc[i, dataframe.columns.get_loc('confirmed_long')] = True
-            
+            dataframe['confirmed_long'] = confirm_window(
+                dataframe['base_long'].to_numpy(), price_change > self.confirmation_threshold,
+                lags, self.confirmation_mode)
             # 做空确认：价格开始下跌
-            if dataframe['base_short'].iloc[i-1]:
-                if dataframe['price_change_1h'].iloc[i] < -self.confirmation_threshold:
-                    dataframe.iloc[i, dataframe.columns.get_loc('confirmed_short')] = True
+            dataframe['confirmed_short'] = confirm_window(
+                dataframe['base_short'].to_numpy(), price_change < -self.confirmation_threshold,
+                lags, self.confirmation_mode)
         
         # 趋势过滤：只在价格接近均线时交易
         dataframe['near_sma'] = (
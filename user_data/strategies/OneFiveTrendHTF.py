@@ -3,13 +3,24 @@ from pandas import DataFrame
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
+from frame_compaction import compact_strategy
+from parallel_analysis import parallel_analysis
+from strategy_metrics import instrument_strategy, metric_section
+from warm_start import warm_start
 
+
+@parallel_analysis
+@instrument_strategy
+@warm_start
+@compact_strategy
 class OneFiveTrendHTF(IStrategy):
 
     timeframe = "5m"
     informative_timeframe = "15m"
 
     startup_candle_count = 200
+    # 实盘保存的预热K线（startup_candles.py）：15m EMA200约890根收敛，超过实盘每次提供的K线数
+    warm_start_candles = {"5m": 222, "15m": 890}
     process_only_new_candles = True
     can_short = False
 
@@ -53,13 +64,14 @@ class OneFiveTrendHTF(IStrategy):
         inf["adx"] = ta.ADX(inf, 14)
 
         # ✅ 正确合并 HTF
-        dataframe = merge_informative_pair(
-            dataframe,
-            inf,
-            self.timeframe,
-            self.informative_timeframe,
-            ffill=True
-        )
+        with metric_section(self, "informative_merge", metadata["pair"]):
+            dataframe = merge_informative_pair(
+                dataframe,
+                inf,
+                self.timeframe,
+                self.informative_timeframe,
+                ffill=True
+            )
 
         return dataframe
 
@@ -4,6 +4,14 @@ import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
 
+from frame_compaction import compact_strategy
+from parallel_analysis import parallel_analysis
+from strategy_metrics import instrument_strategy
+
+
+@parallel_analysis
+@instrument_strategy
+@compact_strategy
 class SimplifiedArbitrage(IStrategy):
     """
     Optimized mean reversion strategy with improved filtering and exit conditions
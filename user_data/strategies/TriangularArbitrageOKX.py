@@ -5,6 +5,16 @@ import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 
 
+from frame_compaction import compact_strategy
+from parallel_analysis import parallel_analysis
+from strategy_metrics import instrument_strategy
+from tail_recompute import tail_recompute
+
+
+@parallel_analysis
+@instrument_strategy
+@tail_recompute
+@compact_strategy
 class TriangularArbitrageOKX(IStrategy):
     """
     Triangular Arbitrage for OKX (Statistical)
@@ -17,6 +27,9 @@ class TriangularArbitrageOKX(IStrategy):
 
     startup_candle_count = 200
     process_only_new_candles = True
+    # 实盘只重算末尾的回看长度：startup_candles.py 解析的预热为89根（EMA20收敛），
+    # MAD的 rolling.apply 逐窗口执行Python函数，整段重算与历史长度成正比
+    tail_lookback = 89
 
     # ========= 风控 =========
     stoploss = -0.012
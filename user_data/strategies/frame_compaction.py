@@ -0,0 +1,257 @@
+"""
+指标DataFrame压缩（按需启用）
+
+策略的派生列（volume_ratio、price_change_1h、volatility、布尔条件列、enter_* 信号等）默认都是
+float64或object，并在整个回测期间全部保留。启用后在 populate_indicators 之后：
+- 删除出入场逻辑（populate_indicators 以外的全部方法）没有引用的中间列，引用关系由源码ast分析得到
+- 派生列转换为更小的类型：只有0/1的浮点列 -> int8，整数列 -> 最小整数类型，布尔object列 -> bool（均无损）；
+  检查模式下浮点列还会 float64 -> float32
+- OHLCV列保持float64（freqtrade用于成交价格）
+populate_exit_trend 之后 enter_* / exit_* 信号列转换为int8。
+
+float32 会改变阈值比较的边界（如 rsi < 45、volume_ratio > 1.028），只在检查模式下使用:
+对每个交易对的第一次分析用float64结果计算一次信号作为基准，
+找出降精度后会改变信号的列保持float64；删除列导致信号变化或报错时不删除任何列。
+
+启用方式（环境变量，在启动freqtrade前设置）:
+    FT_STRATEGY_COMPACT=1        # 删除未引用的列 + 无损类型转换，浮点列保持float64
+    FT_STRATEGY_COMPACT=check    # 另外对浮点列降精度，并做精度检查
+
+未启用时 compact_strategy 原样返回策略类，没有额外开销。
+离线报告各交易对压缩前后的字节数: python scripts/local/compact_report.py
+"""
+
+import ast
+import functools
+import inspect
+import logging
+import os
+import textwrap
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+COMPACT_MODE = os.environ.get('FT_STRATEGY_COMPACT', '').lower()
+ENABLED = COMPACT_MODE in ('1', 'true', 'yes', 'check')
+CHECK = COMPACT_MODE == 'check'
+
+BASE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+SIGNAL_COLUMNS = ['enter_long', 'enter_short', 'exit_long', 'exit_short']
+TAG_COLUMNS = ['enter_tag', 'exit_tag']
+PROTECTED_COLUMNS = set(BASE_COLUMNS + SIGNAL_COLUMNS + TAG_COLUMNS)
+
+FLOAT32_MAX = float(np.finfo('float32').max)
+
+# (策略, 交易对) -> 最近一次压缩的报告
+REPORTS = {}
+
+
+def _fstring_value(node, cls):
+    """f-string中的 self.xxx / cls.xxx 用类属性求值，其他表达式无法静态确定，返回None"""
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(str(value.value))
+            continue
+        expr = value.value
+        if not (isinstance(expr, ast.Attribute) and isinstance(expr.value, ast.Name)
+                and expr.value.id in ('self', 'cls') and hasattr(cls, expr.attr)):
+            return None
+        attr = getattr(cls, expr.attr)
+        if value.conversion == ord('r'):
+            attr = repr(attr)
+        elif value.conversion == ord('s'):
+            attr = str(attr)
+        spec = ''
+        if value.format_spec is not None:
+            spec = _fstring_value(value.format_spec, cls)
+            if spec is None:
+                return None
+        parts.append(format(attr, spec))
+    return ''.join(parts)
+
+
+@functools.lru_cache(maxsize=None)
+def referenced_columns(cls):
+    """
+    populate_indicators 以外的方法中出现的全部字符串常量（含可求值的f-string）
+    出入场逻辑和回调只能通过这些名字读取列；存在无法求值的f-string时返回None（不删除列）
+    """
+    names = set()
+    for klass in cls.__mro__:
+        if klass is object or (klass.__module__ or '').startswith('freqtrade'):
+            continue
+        for name, member in vars(klass).items():
+            if name == 'populate_indicators' or not inspect.isfunction(member):
+                continue
+            try:
+                source = textwrap.dedent(inspect.getsource(inspect.unwrap(member)))
+            except (OSError, TypeError):
+                return None
+            for node in ast.walk(ast.parse(source)):
+                if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                    names.add(node.value)
+                elif isinstance(node, ast.JoinedStr):
+                    value = _fstring_value(node, cls)
+                    if value is None:
+                        return None
+                    names.add(value)
+    return frozenset(names)
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _downcast(series, lossy=True):
+    """降精度后的列，无法降精度时返回None；lossy=False 时不做 float64 -> float32"""
+    kind = series.dtype.kind
+    if kind == 'f':
+        values = series.to_numpy()
+        finite = values[np.isfinite(values)]
+        if series.dtype.itemsize > 1 and finite.size == values.size and finite.size \
+                and np.isin(finite, (0.0, 1.0)).all():
+            return series.astype('int8')
+        if lossy and series.dtype.itemsize > 4 and (finite.size == 0 or np.abs(finite).max() <= FLOAT32_MAX):
+            return series.astype('float32')
+    elif kind in 'iu':
+        smaller = pd.to_numeric(series, downcast='unsigned' if kind == 'u' else 'integer')
+        if smaller.dtype.itemsize < series.dtype.itemsize:
+            return smaller
+    elif kind == 'O' and len(series) and pd.api.types.infer_dtype(series, skipna=False) == 'boolean':
+        return series.astype(bool)
+    return None
+
+
+def compact_frame(df, keep=None, exact=(), lossy=True):
+    """
+    删除不在keep中的派生列（keep为None时不删除），其余派生列降精度（exact中的列除外，
+    lossy=False 时只做无损转换）
+    返回 (新DataFrame, 报告)
+    """
+    before = frame_bytes(df)
+    dropped = []
+    if keep is not None:
+        dropped = [c for c in df.columns if c not in PROTECTED_COLUMNS and str(c) not in keep]
+    out = df.drop(columns=dropped)
+    downcast = {}
+    for col in out.columns:
+        if col in BASE_COLUMNS or col in exact:
+            continue
+        smaller = _downcast(out[col], lossy)
+        if smaller is not None:
+            out[col] = smaller
+            downcast[col] = str(smaller.dtype)
+    report = {
+        'rows': len(out),
+        'bytes_before': before,
+        'bytes_after': frame_bytes(out),
+        'dropped': dropped,
+        'downcast': downcast,
+        'exact': sorted(str(c) for c in exact if c in out.columns),
+    }
+    return out, report
+
+
+def compact_signals(df):
+    """信号列 -> int8（freqtrade回测时同样把NaN当作0）"""
+    for col in SIGNAL_COLUMNS:
+        if col in df.columns and df[col].dtype != 'int8':
+            df[col] = df[col].fillna(0).astype('int8')
+    return df
+
+
+def signal_frame(df):
+    """统一格式的信号列，用于逐行对比"""
+    out = pd.DataFrame(index=df.index)
+    for col in SIGNAL_COLUMNS:
+        values = df[col] if col in df.columns else 0
+        out[col] = pd.Series(values, index=df.index).fillna(0).astype('int8')
+    for col in TAG_COLUMNS:
+        values = df[col] if col in df.columns else None
+        out[col] = pd.Series(values, index=df.index, dtype=object).fillna('').astype(str)
+    return out
+
+
+def signals_of(strategy, df, metadata):
+    """在副本上执行 入场 -> 出场，返回统一格式的信号列"""
+    df = strategy.populate_entry_trend(df.copy(), metadata)
+    df = strategy.populate_exit_trend(df, metadata)
+    return signal_frame(df)
+
+
+def plan_compaction(strategy, df, metadata, keep):
+    """
+    精度检查：以float64指标计算的信号为基准
+    返回 (保留列或None, 保持原精度的列)，按此压缩后信号与基准完全一致
+    """
+    reference = signals_of(strategy, df, metadata)
+    derived = [c for c in df.columns if c not in BASE_COLUMNS]
+
+    def unchanged(keep_, exact):
+        compacted, _ = compact_frame(df, keep_, exact)
+        try:
+            return signals_of(strategy, compacted, metadata).equals(reference)
+        except KeyError:
+            return False
+
+    # 只删除列不降精度：信号变化或报错说明ast分析漏掉了间接引用
+    if keep is not None and not unchanged(keep, derived):
+        logger.warning("%s: 删除未引用的列后信号变化，不删除列", type(strategy).__name__)
+        keep = None
+    if unchanged(keep, ()):
+        return keep, set()
+
+    # 逐列降精度，找出会改变信号的列
+    _, report = compact_frame(df, keep)
+    candidates = list(report['downcast'])
+    exact = {col for col in candidates
+             if not unchanged(keep, [c for c in derived if c != col])}
+    if not unchanged(keep, exact):
+        # 多列组合才改变信号，全部保持原精度
+        exact = set(candidates)
+    return keep, exact
+
+
+def compact_strategy(cls=None, *, enabled=None, check=None):
+    """
+    策略类装饰器：populate_indicators 后压缩DataFrame，populate_exit_trend 后信号列转int8
+    未启用时直接返回原类
+    """
+    if cls is None:
+        return functools.partial(compact_strategy, enabled=enabled, check=check)
+    if not (ENABLED if enabled is None else enabled):
+        return cls
+    check = CHECK if check is None else check
+    indicators = cls.populate_indicators
+    exit_trend = cls.populate_exit_trend
+    plans = {}
+
+    @functools.wraps(indicators)
+    def populate_indicators(self, dataframe, metadata):
+        df = indicators(self, dataframe, metadata)
+        pair = metadata.get('pair', '')
+        if pair not in plans:
+            keep = referenced_columns(cls)
+            plans[pair] = plan_compaction(self, df, metadata, keep) if check else (keep, set())
+        # 未经精度检查时不做有损的 float32 转换
+        df, report = compact_frame(df, *plans[pair], lossy=check)
+        REPORTS[(cls.__name__, pair)] = report
+        logger.info("%s %s: %.1fMB -> %.1fMB (删除%d列, 降精度%d列, 保持精度%d列)",
+                    cls.__name__, pair, report['bytes_before'] / 1e6, report['bytes_after'] / 1e6,
+                    len(report['dropped']), len(report['downcast']), len(report['exact']))
+        return df
+
+    @functools.wraps(exit_trend)
+    def populate_exit_trend(self, dataframe, metadata):
+        return compact_signals(exit_trend(self, dataframe, metadata))
+
+    # freqtrade通过参数签名判断接口版本，保持原签名
+    populate_indicators.__signature__ = inspect.signature(indicators)
+    populate_exit_trend.__signature__ = inspect.signature(exit_trend)
+    cls.populate_indicators = populate_indicators
+    cls.populate_exit_trend = populate_exit_trend
+    return cls
@@ -0,0 +1,127 @@
+"""
+按交易对并行分析（按需启用）
+
+回测和超参优化时freqtrade在 advise_all_indicators 中按交易对依次调用 populate_indicators，
+各交易对互不依赖。启用后把各交易对的分析分发到线程池或进程池，结果按输入顺序返回，与逐个计算一致：
+- threads（默认）: TA-Lib / NumPy 的计算大部分释放GIL，适合以指标计算为主的策略（OneFiveTrendHTF、EightPM）
+- processes: 以Python代码为主、持有GIL的策略可改用fork的子进程；
+  子进程继承策略实例和K线数据，只把分析结果传回。不支持fork的平台回退为线程池
+子进程中对策略实例的修改（计时统计、压缩计划）不会传回主进程，只有在多核机器上
+用 parallel_report.py 实测进程池更快时才值得使用。
+
+策略可用类属性 analysis_executor = 'threads' / 'processes' 声明默认方式，环境变量可以覆盖。
+
+启用方式（环境变量，在启动freqtrade前设置）:
+    FT_STRATEGY_PARALLEL=1            # 使用策略声明的方式（默认threads）
+    FT_STRATEGY_PARALLEL=threads      # 强制线程池
+    FT_STRATEGY_PARALLEL=processes    # 强制进程池
+    FT_STRATEGY_WORKERS=4             # 并行数，默认CPU核数
+
+未启用时 parallel_analysis 原样返回策略类，没有额外开销。
+离线对比耗时: python scripts/local/parallel_report.py
+"""
+
+import functools
+import inspect
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_MODE = os.environ.get('FT_STRATEGY_PARALLEL', '').lower()
+ENABLED = PARALLEL_MODE in ('1', 'true', 'yes', 'threads', 'processes')
+WORKERS = int(os.environ.get('FT_STRATEGY_WORKERS', '0') or 0)
+
+MODES = ('serial', 'threads', 'processes')
+DEFAULT_MODE = 'threads'
+
+# fork前设置，子进程按下标取任务: (函数, 参数列表)
+_FORKED = None
+_FORK_LOCK = threading.Lock()
+
+
+def fork_context():
+    """支持fork时返回fork上下文，否则None"""
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context('fork')
+
+
+def default_workers(tasks, workers=None):
+    workers = workers or WORKERS or os.cpu_count() or 1
+    return max(1, min(workers, tasks))
+
+
+def _run_forked(index):
+    function, items = _FORKED
+    return function(*items[index])
+
+
+def run_pairs(function, items, mode=DEFAULT_MODE, workers=None):
+    """
+    对每组参数调用 function(*args)，按items的顺序返回结果列表
+    mode: 'serial' 逐个执行, 'threads' 线程池, 'processes' fork进程池（不支持时回退为线程池）
+    """
+    if mode not in MODES:
+        raise ValueError(f"未知的并行方式: {mode}")
+    items = list(items)
+    workers = default_workers(len(items), workers)
+    if mode == 'serial' or workers <= 1:
+        return [function(*args) for args in items]
+    if mode == 'processes':
+        context = fork_context()
+        if context is not None:
+            global _FORKED
+            with _FORK_LOCK:
+                _FORKED = (function, items)
+                try:
+                    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                        return list(pool.map(_run_forked, range(len(items))))
+                finally:
+                    _FORKED = None
+        logger.info("当前平台不支持fork，按交易对并行分析回退为线程池")
+    with ThreadPoolExecutor(workers, thread_name_prefix='ft-analysis') as pool:
+        return list(pool.map(lambda args: function(*args), items))
+
+
+def analysis_mode(strategy, mode=None):
+    """环境变量指定threads/processes时优先，否则使用策略的 analysis_executor"""
+    mode = mode or PARALLEL_MODE
+    if mode in MODES:
+        return mode
+    return getattr(strategy, 'analysis_executor', DEFAULT_MODE) or DEFAULT_MODE
+
+
+def parallel_analysis(cls=None, *, enabled=None, mode=None, workers=None):
+    """
+    策略类装饰器：advise_all_indicators 按交易对并行执行 advise_indicators
+    未启用时直接返回原类
+    """
+    if cls is None:
+        return functools.partial(parallel_analysis, enabled=enabled, mode=mode, workers=workers)
+    if not (ENABLED if enabled is None else enabled):
+        return cls
+    original = getattr(cls, 'advise_all_indicators', None)
+    if original is None:
+        return cls
+
+    @functools.wraps(original)
+    def advise_all_indicators(self, data):
+        pairs = list(data)
+        chosen = analysis_mode(self, mode)
+
+        def analyze(pair, frame):
+            return self.advise_indicators(frame.copy(), {'pair': pair}).copy()
+
+        results = run_pairs(analyze, [(pair, data[pair]) for pair in pairs], chosen, workers)
+        logger.info("%s: %d 个交易对并行分析完成 (%s, %d 个并行)", cls.__name__, len(pairs), chosen,
+                    default_workers(len(pairs), workers))
+        return dict(zip(pairs, results))
+
+    advise_all_indicators.__signature__ = inspect.signature(original)
+    cls.advise_all_indicators = advise_all_indicators
+    return cls
@@ -0,0 +1,302 @@
+"""
+策略热点计时与计数（按需启用）
+
+按交易对统计 populate_indicators / populate_entry_trend / populate_exit_trend /
+custom_exit / custom_stake_amount / informative_pairs 的调用次数、总耗时和最大耗时，
+并可在方法内部用 metric_section 标记更细的代码段（TA-Lib指标、8点确认、informative合并等）。
+结果导出为Prometheus文本文件或json快照。
+追踪模式额外记录每次调用的起止时间，导出为Chrome trace-event json，可在 chrome://tracing 或 Perfetto 中查看。
+
+启用方式（环境变量，在启动freqtrade前设置）:
+    FT_STRATEGY_METRICS=1
+    FT_STRATEGY_METRICS_FILE=user_data/logs/strategy_metrics.prom   # .json 后缀导出为json
+    FT_STRATEGY_METRICS_INTERVAL=60                                 # 定期导出间隔（秒）
+    FT_STRATEGY_TRACE=user_data/logs/trace.json                     # 追踪模式输出文件
+
+未启用时 instrument_strategy 原样返回策略类、metric_section 返回空上下文，没有额外开销。
+"""
+
+import atexit
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+INSTRUMENTED_METHODS = [
+    'populate_indicators',
+    'populate_entry_trend',
+    'populate_exit_trend',
+    'custom_exit',
+    'custom_stake_amount',
+    'informative_pairs',
+]
+
+METRICS_ENABLED = os.environ.get('FT_STRATEGY_METRICS', '').lower() in ('1', 'true', 'yes')
+TRACE_PATH = os.environ.get('FT_STRATEGY_TRACE', '')
+ENABLED = METRICS_ENABLED or bool(TRACE_PATH)
+EXPORT_PATH = os.environ.get('FT_STRATEGY_METRICS_FILE', 'user_data/logs/strategy_metrics.prom')
+EXPORT_INTERVAL = float(os.environ.get('FT_STRATEGY_METRICS_INTERVAL', '60'))
+
+_NULL_SECTION = contextlib.nullcontext()
+
+
+class MetricsRegistry:
+    """线程安全的 (策略, 方法, 交易对) -> 计数/耗时 统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._last_export = time.monotonic()
+
+    def record(self, strategy, method, pair, seconds, error=False):
+        key = (strategy, method, pair)
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = [0, 0.0, 0.0, 0]
+            stat[0] += 1
+            stat[1] += seconds
+            if seconds > stat[2]:
+                stat[2] = seconds
+            if error:
+                stat[3] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        with self._lock:
+            items = sorted(self._stats.items())
+        metrics = []
+        for (strategy, method, pair), (calls, total, peak, errors) in items:
+            metrics.append({
+                'strategy': strategy,
+                'method': method,
+                'pair': pair,
+                'calls': calls,
+                'seconds_total': total,
+                'seconds_avg': total / calls if calls else 0.0,
+                'seconds_max': peak,
+                'errors': errors,
+            })
+        return {'generated': time.time(), 'metrics': metrics}
+
+    def to_prometheus(self):
+        series = [
+            ('freqtrade_strategy_calls_total', 'counter', 'Number of strategy method calls', 'calls'),
+            ('freqtrade_strategy_call_seconds_total', 'counter', 'Total seconds spent in strategy method', 'seconds_total'),
+            ('freqtrade_strategy_call_seconds_max', 'gauge', 'Slowest single strategy method call', 'seconds_max'),
+            ('freqtrade_strategy_call_errors_total', 'counter', 'Strategy method calls that raised', 'errors'),
+        ]
+        metrics = self.snapshot()['metrics']
+        lines = []
+        for name, kind, help_text, field in series:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for m in metrics:
+                labels = ','.join(
+                    f'{k}="{_escape_label(m[k])}"' for k in ('strategy', 'method', 'pair'))
+                lines.append(f"{name}{{{labels}}} {m[field]}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path=None):
+        """按后缀导出：.json 为快照，其余为Prometheus文本格式（先写临时文件再替换）"""
+        path = Path(path or EXPORT_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == '.json':
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        else:
+            content = self.to_prometheus()
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(content, encoding='utf-8')
+        os.replace(tmp, path)
+        self._last_export = time.monotonic()
+        return path
+
+    def maybe_export(self):
+        if METRICS_ENABLED and time.monotonic() - self._last_export >= EXPORT_INTERVAL:
+            try:
+                self.export()
+            except OSError:
+                pass
+
+
+class TraceRecorder:
+    """Chrome trace-event 记录器，每个调用/代码段记为一个完整事件(ph=X)"""
+
+    def __init__(self, active=False):
+        self.active = active
+        self._lock = threading.Lock()
+        self._events = []
+        self._threads = {}
+        self._origin = time.perf_counter()
+
+    def add(self, name, category, started, finished, args=None):
+        tid = threading.get_ident()
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (started - self._origin) * 1e6,
+            'dur': (finished - started) * 1e6,
+            'pid': os.getpid(),
+            'tid': tid,
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self._events.append(event)
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+
+    @contextlib.contextmanager
+    def span(self, name, category='backtest', **args):
+        """手动标记的追踪段，args中的值会显示在查看器的详情面板里"""
+        if not self.active:
+            yield args
+            return
+        started = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add(name, category, started, time.perf_counter(), args)
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._threads.clear()
+            self._origin = time.perf_counter()
+
+    def events(self):
+        with self._lock:
+            events = sorted(self._events, key=lambda e: e['ts'])
+            threads = dict(self._threads)
+        pid = os.getpid()
+        meta = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                 'args': {'name': 'freqtrade'}}]
+        for tid, thread_name in threads.items():
+            meta.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                         'args': {'name': thread_name}})
+        return meta + events
+
+    def export(self, path=None):
+        path = Path(path or TRACE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps({'traceEvents': self.events(), 'displayTimeUnit': 'ms'},
+                             ensure_ascii=False)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(content, encoding='utf-8')
+        os.replace(tmp, path)
+        return path
+
+
+REGISTRY = MetricsRegistry()
+TRACER = TraceRecorder(active=bool(TRACE_PATH))
+
+# 追踪事件分类
+_CATEGORIES = {
+    'populate_indicators': 'indicators',
+    'populate_entry_trend': 'signals',
+    'populate_exit_trend': 'signals',
+    'informative_pairs': 'informative',
+}
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _pair_of(method, args, kwargs):
+    """从调用参数中取交易对：populate_* 在metadata里，回调的第一个参数是pair"""
+    if method.startswith('populate_'):
+        metadata = args[1] if len(args) > 1 else kwargs.get('metadata') or {}
+        return metadata.get('pair', '')
+    if method == 'informative_pairs':
+        return ''
+    return args[0] if args else kwargs.get('pair', '')
+
+
+def _trace_args(strategy, method, pair, args):
+    trace_args = {'strategy': type(strategy).__name__, 'pair': pair}
+    if method.startswith('populate_'):
+        trace_args['timeframe'] = getattr(strategy, 'timeframe', '')
+        if args and hasattr(args[0], '__len__'):
+            trace_args['rows'] = len(args[0])
+    return trace_args
+
+
+def _wrap(strategy_name, method, func):
+    category = _CATEGORIES.get(method, 'callback')
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        error = False
+        try:
+            return func(self, *args, **kwargs)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            finished = time.perf_counter()
+            pair = _pair_of(method, args, kwargs)
+            REGISTRY.record(strategy_name, method, pair, finished - started, error)
+            if TRACER.active:
+                TRACER.add(method, category, started, finished, _trace_args(self, method, pair, args))
+            REGISTRY.maybe_export()
+
+    # freqtrade通过参数签名判断接口版本，保持原签名
+    wrapper.__signature__ = inspect.signature(func)
+    return wrapper
+
+
+def instrument_strategy(cls=None, *, enabled=None):
+    """
+    策略类装饰器
+    只包装策略类自身定义的方法；未启用时直接返回原类
+    """
+    if cls is None:
+        return functools.partial(instrument_strategy, enabled=enabled)
+    if not (ENABLED if enabled is None else enabled):
+        return cls
+    for method in INSTRUMENTED_METHODS:
+        func = cls.__dict__.get(method)
+        if callable(func):
+            setattr(cls, method, _wrap(cls.__name__, method, func))
+    return cls
+
+
+@contextlib.contextmanager
+def _timed_section(strategy, section, pair):
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        finished = time.perf_counter()
+        REGISTRY.record(strategy, section, pair, finished - started, error)
+        if TRACER.active:
+            TRACER.add(section, 'section', started, finished, {'strategy': strategy, 'pair': pair})
+
+
+def metric_section(strategy, section, pair=''):
+    """方法内部的细粒度计时段，例如 with metric_section(self, 'confirmation', pair):"""
+    if not ENABLED:
+        return _NULL_SECTION
+    name = strategy if isinstance(strategy, str) else type(strategy).__name__
+    return _timed_section(name, section, pair)
+
+
+if METRICS_ENABLED:
+    atexit.register(lambda: REGISTRY.export())
+if TRACE_PATH:
+    atexit.register(lambda: TRACER.export())
@@ -0,0 +1,160 @@
+"""
+实盘增量分析（只重算末尾）
+
+process_only_new_candles = True 时，每根新K线收盘后freqtrade仍把整段历史交给
+populate_indicators / populate_entry_trend / populate_exit_trend 重新计算。启用后按交易对缓存分析结果：
+- 新K线到来时只取最后 新K线数 + 回看长度 行重新计算指标和出入场信号，取新K线对应的行追加到缓存
+- 缓存只保留最近 tail_buffer_rows 行（环形缓冲），返回给freqtrade的DataFrame与输入等长，
+  更早的行只有OHLCV，指标列为空（实盘只使用最新K线的信号）
+- 缓存与输入的重叠K线不一致（数据重载、补数据）或新K线过多时回退为整段计算
+单根K线的分析耗时从与历史长度成正比降为与回看长度成正比。
+
+只对整段计算随历史长度明显变慢的策略有意义（如逐窗口执行Python函数的 rolling.apply）；
+指标都是TA-Lib/向量化运算时，实盘的K线数下分析耗时以每列的固定开销为主，只重算末尾不会更快。
+
+回看长度应取策略实际需要的预热K线数（scripts/local/startup_candles.py 的结果），用类属性 tail_lookback
+声明，未声明时取 startup_candle_count；回看长度接近实盘K线数时没有收益。tail_buffer_rows 覆盖缓存行数。
+回测、超参优化不受影响，只在 live / dry_run 下生效。
+重启后的预热历史和检查点见 warm_start.py（与本装饰器叠加时放在外层）。
+
+启用方式（环境变量，在启动freqtrade前设置）:
+    FT_STRATEGY_TAIL=1        # 只重算末尾
+    FT_STRATEGY_TAIL=check    # 同时整段计算并对比新K线的信号，不一致时记录警告
+
+未启用时 tail_recompute 原样返回策略类，没有额外开销。
+离线回放对比: python scripts/local/tail_replay.py
+"""
+
+import functools
+import inspect
+import logging
+import os
+
+import pandas as pd
+
+from warm_start import CandleBuffer, is_live
+
+
+logger = logging.getLogger(__name__)
+
+TAIL_MODE = os.environ.get('FT_STRATEGY_TAIL', '').lower()
+ENABLED = TAIL_MODE in ('1', 'true', 'yes', 'check')
+CHECK = TAIL_MODE == 'check'
+SIGNAL_COLUMNS = ['enter_long', 'enter_short', 'exit_long', 'exit_short', 'enter_tag', 'exit_tag']
+
+MIN_BUFFER_ROWS = 1000
+
+# 计数: 'tail' 只重算末尾, 'full' 整段计算, 'cached' 没有新K线, 'mismatch' 检查模式下信号不一致
+STATS = {'tail': 0, 'full': 0, 'cached': 0, 'mismatch': 0}
+
+
+def tail_lookback(strategy):
+    lookback = getattr(strategy, 'tail_lookback', None)
+    if lookback is None:
+        lookback = int(getattr(strategy, 'startup_candle_count', 0) or 0)
+    return max(int(lookback), 1)
+
+
+def tail_buffer_rows(strategy):
+    rows = getattr(strategy, 'tail_buffer_rows', None)
+    return int(rows) if rows else max(MIN_BUFFER_ROWS, tail_lookback(strategy))
+
+
+class TailState(CandleBuffer):
+    """单个交易对的分析缓存：最近若干行的完整分析结果（含信号列）"""
+
+    def append(self, fresh):
+        frame = pd.concat([self.frame, fresh], ignore_index=True)
+        self.frame = frame.iloc[-self.max_rows:].reset_index(drop=True)
+
+    def aligned(self, dataframe):
+        """与输入等长的DataFrame：缓存覆盖的末尾行使用分析结果，更早的行只有输入列"""
+        n = len(dataframe)
+        rows = min(len(self.frame), n)
+        tail = self.frame.iloc[len(self.frame) - rows:].set_axis(dataframe.index[n - rows:])
+        return pd.concat([dataframe.iloc[:n - rows], tail])
+
+
+def _compare(fresh, full, pair, name):
+    """检查模式：新K线的信号与整段计算一致"""
+    columns = [c for c in SIGNAL_COLUMNS if c in fresh.columns or c in full.columns]
+    a = fresh.reindex(columns=columns).reset_index(drop=True)
+    b = full.iloc[-len(fresh):].reindex(columns=columns).reset_index(drop=True)
+    a = a.fillna(0).astype(str)
+    b = b.fillna(0).astype(str)
+    if not a.equals(b):
+        STATS['mismatch'] += 1
+        logger.warning("%s %s: 只重算末尾的信号与整段计算不一致，可增大 tail_lookback", name, pair)
+
+
+def tail_recompute(cls=None, *, enabled=None, check=None, live_only=True):
+    """
+    策略类装饰器：populate_indicators 中完成只重算末尾的指标和信号，
+    随后的 populate_entry_trend / populate_exit_trend 直接返回（信号已在缓存中）
+    未启用时直接返回原类
+    """
+    if cls is None:
+        return functools.partial(tail_recompute, enabled=enabled, check=check, live_only=live_only)
+    if not (ENABLED if enabled is None else enabled):
+        return cls
+    check = CHECK if check is None else check
+    indicators = cls.populate_indicators
+    entry_trend = cls.populate_entry_trend
+    exit_trend = cls.populate_exit_trend
+
+    def analyze(self, dataframe, metadata):
+        df = indicators(self, dataframe, metadata)
+        df = entry_trend(self, df, metadata)
+        return exit_trend(self, df, metadata)
+
+    @functools.wraps(indicators)
+    def populate_indicators(self, dataframe, metadata):
+        if live_only and not is_live(self):
+            return indicators(self, dataframe, metadata)
+        pair = metadata.get('pair', '')
+        states = self.__dict__.setdefault('_tail_states', {})
+        served = self.__dict__.setdefault('_tail_served', set())
+        lookback = tail_lookback(self)
+        state = states.get(pair)
+        position = state.continuity(dataframe) if state is not None else None
+        new = position[0] if position is not None else None
+
+        if new is None or new > lookback:
+            df = analyze(self, dataframe, metadata)
+            states[pair] = TailState(df, tail_buffer_rows(self))
+            STATS['full'] += 1
+            served.add(pair)
+            return df
+
+        if new:
+            # 保留原索引：informative列按索引对齐赋值（dataframe["x"] = other["close"]）
+            window = dataframe.iloc[max(0, len(dataframe) - new - lookback):]
+            fresh = analyze(self, window.copy(), metadata).iloc[-new:]
+            if check:
+                _compare(fresh, analyze(self, dataframe.copy(), metadata), pair, cls.__name__)
+            state.append(fresh)
+            STATS['tail'] += 1
+        else:
+            STATS['cached'] += 1
+        served.add(pair)
+        return state.aligned(dataframe)
+
+    def _passthrough(method, func):
+        @functools.wraps(func)
+        def wrapper(self, dataframe, metadata):
+            served = self.__dict__.get('_tail_served', ())
+            if metadata.get('pair', '') in served:
+                if method == 'populate_exit_trend':
+                    served.discard(metadata.get('pair', ''))
+                return dataframe
+            return func(self, dataframe, metadata)
+
+        wrapper.__signature__ = inspect.signature(func)
+        return wrapper
+
+    # freqtrade通过参数签名判断接口版本，保持原签名
+    populate_indicators.__signature__ = inspect.signature(indicators)
+    cls.populate_indicators = populate_indicators
+    cls.populate_entry_trend = _passthrough('populate_entry_trend', entry_trend)
+    cls.populate_exit_trend = _passthrough('populate_exit_trend', exit_trend)
+    return cls
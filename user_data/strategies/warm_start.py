@@ -0,0 +1,293 @@
+"""
+实盘预热历史与重启热启动
+
+实盘每次交给策略的K线数有上限（交易所单次返回的K线数、startup_candle_count），informative时间框架也一样；
+指标的预热超过这个长度时（如OneFiveTrendHTF的15m EMA200需要约890根15m K线收敛），每次分析的递归指标都从
+冷启动开始，与完整历史的结果不同。启用后按 (交易对, 时间框架) 保存最近的K线:
+- 主时间框架: populate_indicators 的输入
+- informative时间框架: 通过 self.dp.get_pair_dataframe 取得的K线（策略的 dp 被替换为转发的代理）
+输入比预热需要的短时，保存的更早K线接在输入前面再分析，主时间框架的输出只保留输入对应的行。
+保存的K线数按时间框架声明（类属性 warm_start_candles，scripts/local/startup_candles.py 的结果），
+未声明的informative时间框架按与主时间框架相同的时长折算，主时间框架未声明时取 startup_candle_count。
+
+检查点：保存的K线定期写入本地磁盘，重启后按序列恢复。接到输入前之前校验连续性——保存的最后一根K线
+在输入中，且重叠时间上OHLCV逐根一致（没有缺口、没有数据重载）；不连续时丢弃，以输入为准重新积累。
+检查点只有K线，不含指标，策略源码变化不影响恢复。
+
+启用方式（环境变量，在启动freqtrade前设置）:
+    FT_STRATEGY_CHECKPOINT_DIR=user_data/state     # 检查点目录，不设置时不启用
+    FT_STRATEGY_CHECKPOINT_INTERVAL=300            # 每个序列的写入间隔（秒），退出时总会写入
+
+只在 live / dry_run 下生效；未启用时 warm_start 原样返回策略类，没有额外开销。
+重启对比: python scripts/local/tail_replay.py --strategy OneFiveTrendHTF --restart
+"""
+
+import atexit
+import functools
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = os.environ.get('FT_STRATEGY_CHECKPOINT_DIR', '')
+CHECKPOINT_INTERVAL = float(os.environ.get('FT_STRATEGY_CHECKPOINT_INTERVAL', '300'))
+CHECKPOINT_VERSION = 2
+
+LIVE_RUNMODES = ('live', 'dry_run')
+OHLCV_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+TIMEFRAME_UNITS = {'m': 1, 'h': 60, 'd': 1440, 'w': 10080}
+
+# 计数: 'extended' 输入前接了保存的K线, 'restored' 从检查点恢复, 'rejected' 保存的K线不连续被丢弃
+STATS = {'extended': 0, 'restored': 0, 'rejected': 0}
+
+
+def is_live(strategy):
+    runmode = getattr(getattr(strategy, 'dp', None), 'runmode', None)
+    return getattr(runmode, 'value', runmode) in LIVE_RUNMODES
+
+
+def timeframe_minutes(timeframe):
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+
+
+def warm_start_rows(strategy, timeframe):
+    """时间框架需要保存的K线数"""
+    declared = dict(getattr(strategy, 'warm_start_candles', None) or {})
+    if timeframe in declared:
+        return int(declared[timeframe])
+    main = int(declared.get(strategy.timeframe, getattr(strategy, 'startup_candle_count', 0) or 0))
+    if timeframe == strategy.timeframe:
+        return max(main, 1)
+    return max(math.ceil(main * timeframe_minutes(strategy.timeframe) / timeframe_minutes(timeframe)), 1)
+
+
+class CandleBuffer:
+    """单个序列最近若干根K线（按时间升序）"""
+
+    def __init__(self, frame, max_rows):
+        self.max_rows = max_rows
+        self.frame = frame.iloc[-max_rows:].reset_index(drop=True)
+
+    @property
+    def last_date(self):
+        return self.frame['date'].iloc[-1]
+
+    def continuity(self, dataframe):
+        """
+        校验缓存与输入的连续性，返回 (输入中缓存之后的新K线数, 缓存中早于输入的行数)
+        缓存最后一根K线不在输入中，或重叠部分的OHLCV不一致时返回None
+        """
+        dates = dataframe['date']
+        end = int(dates.searchsorted(self.last_date, 'right'))
+        if end == 0 or dates.iloc[end - 1] != self.last_date:
+            return None
+        prefix = int(self.frame['date'].searchsorted(dates.iloc[0], 'left'))
+        overlap = min(len(self.frame) - prefix, end)
+        cached = self.frame[OHLCV_COLUMNS].iloc[len(self.frame) - overlap:].reset_index(drop=True)
+        current = dataframe[OHLCV_COLUMNS].iloc[end - overlap:end].reset_index(drop=True)
+        if not cached.equals(current):
+            return None
+        return len(dataframe) - end, prefix
+
+    def extended(self, dataframe, prefix):
+        """缓存中早于输入的K线接在输入前面（索引接在输入索引之前）"""
+        if not prefix:
+            return dataframe
+        start = dataframe.index[0] if pd.api.types.is_integer_dtype(dataframe.index) else 0
+        head = self.frame[OHLCV_COLUMNS].iloc[:prefix].set_axis(pd.RangeIndex(start - prefix, start))
+        return pd.concat([head, dataframe])
+
+
+def checkpoint_path(directory, strategy_name, pair, timeframe):
+    name = pair.replace('/', '_').replace(':', '_')
+    return Path(directory) / strategy_name / f"{name}-{timeframe}.pkl"
+
+
+class Checkpointer:
+    """检查点写入：同一文件按间隔写入，进程退出时写入全部未保存的状态"""
+
+    def __init__(self, interval=CHECKPOINT_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._written = {}
+
+    def save(self, path, frame, meta, force=False):
+        with self._lock:
+            self._pending[path] = (frame, meta)
+            due = time.monotonic() - self._written.get(path, float('-inf')) >= self.interval
+        if force or due:
+            self._write(path)
+
+    def _write(self, path):
+        with self._lock:
+            item = self._pending.pop(path, None)
+            if item is None:
+                return
+            frame, meta = item
+            payload = {'version': CHECKPOINT_VERSION, 'meta': dict(meta, saved=time.time()), 'frame': frame}
+            self._written[path] = time.monotonic()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + '.tmp')
+            pd.to_pickle(payload, tmp)
+            tmp.replace(path)
+        except OSError as e:
+            logger.warning("检查点写入失败 %s: %s", path, e)
+
+    def flush(self):
+        for path in list(self._pending):
+            self._write(path)
+
+
+CHECKPOINTS = Checkpointer()
+
+
+def load_checkpoint(path, meta, max_rows):
+    """读取检查点；版本或序列不同时返回None"""
+    if not path.exists():
+        return None
+    try:
+        payload = pd.read_pickle(path)
+    except Exception as e:
+        logger.warning("检查点读取失败 %s: %s", path, e)
+        return None
+    saved = payload.get('meta', {})
+    if payload.get('version') != CHECKPOINT_VERSION or \
+            (saved.get('pair'), saved.get('timeframe')) != (meta['pair'], meta['timeframe']):
+        return None
+    return CandleBuffer(payload['frame'][OHLCV_COLUMNS], max_rows)
+
+
+class WarmStore:
+    """策略实例的全部序列：恢复、校验连续性、接上更早的K线并更新保存的K线"""
+
+    def __init__(self, strategy, name, checkpoint_dir):
+        self.strategy = strategy
+        self.name = name
+        self.checkpoint_dir = checkpoint_dir
+        self._lock = threading.Lock()
+        self._buffers = {}
+
+    def extend(self, pair, timeframe, dataframe):
+        """返回 (接上更早K线后的DataFrame, 接上的行数)"""
+        if dataframe is None or dataframe.empty:
+            return dataframe, 0
+        key = (pair, timeframe)
+        rows = warm_start_rows(self.strategy, timeframe)
+        path = meta = None
+        if self.checkpoint_dir:
+            path = checkpoint_path(self.checkpoint_dir, self.name, pair, timeframe)
+            meta = {'strategy': self.name, 'pair': pair, 'timeframe': timeframe}
+        with self._lock:
+            buffer = self._buffers.get(key)
+            restored = buffer is None and path is not None
+            if restored:
+                buffer = load_checkpoint(path, meta, rows)
+            position = buffer.continuity(dataframe) if buffer is not None else None
+            if buffer is not None:
+                if restored:
+                    STATS['restored' if position is not None else 'rejected'] += 1
+                    logger.info("%s %s %s: 检查点%s", self.name, pair, timeframe,
+                                f"恢复 {len(buffer.frame)} 根K线 (截至 {buffer.last_date})"
+                                if position is not None else "与当前K线不连续，已丢弃")
+                elif position is None:
+                    STATS['rejected'] += 1
+                    logger.info("%s %s %s: 保存的K线与输入不连续，重新积累", self.name, pair, timeframe)
+            prefix = position[1] if position is not None else 0
+            history = buffer.extended(dataframe, prefix) if prefix else dataframe
+            if prefix:
+                STATS['extended'] += 1
+            changed = position is None or position[0] > 0
+            self._buffers[key] = CandleBuffer(history[OHLCV_COLUMNS], rows) if changed else buffer
+        if path is not None and changed:
+            CHECKPOINTS.save(path, self._buffers[key].frame, meta)
+        return history, prefix
+
+
+class WarmDataProvider:
+    """freqtrade DataProvider 的代理：get_pair_dataframe 返回接上保存K线的informative数据，其余接口原样转发"""
+
+    def __init__(self, dp, store):
+        self._dp = dp
+        self._store = store
+
+    def get_pair_dataframe(self, pair, timeframe=None, *args, **kwargs):
+        df = self._dp.get_pair_dataframe(pair, timeframe, *args, **kwargs)
+        timeframe = timeframe or self._store.strategy.timeframe
+        return self._store.extend(pair, timeframe, df)[0]
+
+    def __getattr__(self, name):
+        return getattr(self._dp, name)
+
+
+def warm_start(cls=None, *, enabled=None, live_only=True, checkpoint_dir=None):
+    """
+    策略类装饰器：输入短于预热需要时接上保存的K线再分析（指标、入场、出场在 populate_indicators 中完成，
+    随后的 populate_entry_trend / populate_exit_trend 直接返回），并定期写入检查点
+    checkpoint_dir 为检查点目录（默认取 FT_STRATEGY_CHECKPOINT_DIR，为空时只在内存中保存）
+    未启用时直接返回原类
+    """
+    if cls is None:
+        return functools.partial(warm_start, enabled=enabled, live_only=live_only, checkpoint_dir=checkpoint_dir)
+    checkpoint_dir = CHECKPOINT_DIR if checkpoint_dir is None else checkpoint_dir
+    if not (bool(checkpoint_dir) if enabled is None else enabled):
+        return cls
+    indicators = cls.populate_indicators
+    entry_trend = cls.populate_entry_trend
+    exit_trend = cls.populate_exit_trend
+
+    def store_of(self):
+        store = self.__dict__.get('_warm_store')
+        if store is None:
+            store = self.__dict__.setdefault('_warm_store', WarmStore(self, cls.__name__, checkpoint_dir))
+        if not isinstance(self.dp, WarmDataProvider):
+            self.dp = WarmDataProvider(self.dp, store)
+        return store
+
+    @functools.wraps(indicators)
+    def populate_indicators(self, dataframe, metadata):
+        if live_only and not is_live(self):
+            return indicators(self, dataframe, metadata)
+        pair = metadata.get('pair', '')
+        history, prefix = store_of(self).extend(pair, self.timeframe, dataframe)
+        if not prefix:
+            return indicators(self, dataframe, metadata)
+        # 保存的K线接在输入前面一起分析（平移、交叉需要前一行），输出只保留输入对应的行
+        df = indicators(self, history, metadata)
+        df = entry_trend(self, df, metadata)
+        df = exit_trend(self, df, metadata)
+        self.__dict__.setdefault('_warm_served', set()).add(pair)
+        return df.iloc[prefix:].set_axis(dataframe.index)
+
+    def _passthrough(method, func):
+        @functools.wraps(func)
+        def wrapper(self, dataframe, metadata):
+            served = self.__dict__.get('_warm_served', ())
+            if metadata.get('pair', '') in served:
+                if method == 'populate_exit_trend':
+                    served.discard(metadata.get('pair', ''))
+                return dataframe
+            return func(self, dataframe, metadata)
+
+        wrapper.__signature__ = inspect.signature(func)
+        return wrapper
+
+    # freqtrade通过参数签名判断接口版本，保持原签名
+    populate_indicators.__signature__ = inspect.signature(indicators)
+    cls.populate_indicators = populate_indicators
+    cls.populate_entry_trend = _passthrough('populate_entry_trend', entry_trend)
+    cls.populate_exit_trend = _passthrough('populate_exit_trend', exit_trend)
+    return cls
+
+
+if CHECKPOINT_DIR:
+    atexit.register(CHECKPOINTS.flush)